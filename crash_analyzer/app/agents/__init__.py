@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+
+from crash_analyzer.app.models import EngineID, LangID
+
+from .abstract import ICrashParser
+from .errors import ParserError, UnsupportedEngineError
+from .registry import get_parser, is_supported, register_parser
+
+
+def parse_crash(engine: EngineID, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
+
+    """Parses crash of any supported engine. Returns brief and unique hash.
+    Must stay a module-level function: it's pickled to worker processes"""
+
+    return get_parser(engine).parse_crash(lang, crash_dict)
+
+
+def parse_stacktrace(engine: EngineID, lang: LangID, stacktrace: str) -> Tuple[Optional[str], str]:
+
+    """Same as `parse_crash` for stacktrace read from stored
+    output by reader of engine parser beforehand"""
+
+    return get_parser(engine).parse_stacktrace(lang, stacktrace)
+
+
+__all__ = [
+    "parse_crash",
+    "parse_stacktrace",
+    "get_parser",
+    "is_supported",
+    "register_parser",
+    "ICrashParser",
+    "ParserError",
+    "UnsupportedEngineError",
+]
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from abc import abstractmethod, ABCMeta
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from crash_analyzer.app.models import LangID
+
+if TYPE_CHECKING:
+    from .libfuzzer import StacktraceReader
+
+
+class ICrashParser(metaclass=ABCMeta):
+
+    """Parses crashes of one fuzzer engine. Created once per
+    process by registry and shared by all calls: must be stateless"""
+
+    reads_output: bool = True
+    """ Result depends on output only, so it may be memoized by output """
+
+    @abstractmethod
+    def parse_crash(self, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
+        """Returns brief (if found) and unique hash of crash"""
+
+    def stacktrace_reader(self) -> Optional[StacktraceReader]:
+        """Reader of output stored in object storage. None, if output isn't read"""
+        return None
+
+    @abstractmethod
+    def parse_stacktrace(self, lang: LangID, stacktrace: str) -> Tuple[Optional[str], str]:
+        """Same as `parse_crash` for stacktrace read by `stacktrace_reader`"""
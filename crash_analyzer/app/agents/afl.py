@@ -1,8 +1,20 @@
 from __future__ import annotations
 from typing import Optional, Tuple
-from crash_analyzer.app.models import AflCrash, LangID, EngineID
+from crash_analyzer.app.models import AflCrash, LangID
 
+from .abstract import ICrashParser
+from .errors import ParserError
 
-def parse_crash(engine: EngineID, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
-    crash = AflCrash(**crash_dict)
-    return None, crash.showmap_hash
+
+class AflParser(ICrashParser):
+
+    """Afl crashes are hashed by coverage map, output isn't read"""
+
+    reads_output = False
+
+    def parse_crash(self, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
+        crash = AflCrash(**crash_dict)
+        return None, crash.showmap_hash
+
+    def parse_stacktrace(self, lang: LangID, stacktrace: str) -> Tuple[Optional[str], str]:
+        raise ParserError("Afl crashes are not parsed by stacktrace")
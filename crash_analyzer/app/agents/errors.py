@@ -0,0 +1,6 @@
+class ParserError(Exception):
+    pass
+
+
+class UnsupportedEngineError(ParserError):
+    pass
@@ -1,10 +1,14 @@
 from __future__ import annotations
-from typing import Optional, Tuple
+from typing import List, Optional, Pattern, Tuple
 from hashlib import sha256
 
+import codecs
 import re
 from crash_analyzer.app.util import find_end
-from crash_analyzer.app.models import EngineID, LangID, LibfuzzerCrash
+from crash_analyzer.app.models import LangID, LibfuzzerCrash
+from crash_analyzer.app.agents.normalizer import NormalizationRule, OutputNormalizer
+
+from .abstract import ICrashParser
 
 
 def truncate_llvm_log(text: str) -> str:
@@ -23,45 +27,22 @@ def truncate_llvm_log(text: str) -> str:
     text = text[start:end]
     return text
 
-# TODO: debug jazzer and swift output
-def parse_crash(engine: EngineID, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
-
-    if engine not in {
-        EngineID.libfuzzer,
-        EngineID.jazzer, # TODO: remove todo when brief done
-        EngineID.atheris,
-        EngineID.cargo_fuzz,
-        EngineID.go_fuzz_libfuzzer,
-    }:
-        raise NotImplementedError(f'Not implemented engine {engine} for libfuzzer!')
-
-    crash = LibfuzzerCrash(**crash_dict)
-    stacktrace = _read_stacktrace(crash.output, engine, lang)
-    brief = _read_brief(stacktrace, engine, lang)
-
-    if engine == EngineID.atheris:
-        stacktrace = _clean_atheris_output(stacktrace)
-    else:
-        stacktrace = _clean_generic_output(stacktrace)
-
-    stacktrace_hash = sha256(stacktrace.encode()).hexdigest()
-    return brief, stacktrace_hash
+generic_normalizer = OutputNormalizer(
+    [
+        # ==X== -> ==??==
+        NormalizationRule("=", r"(?<==)=\d+==", "==??=="),
+        # hex numbers -> 0x?? (only if not preceded by word char or '+')
+        NormalizationRule("0", r"(?<=[^\w+]0)[xX][0-9a-fA-F]+", "0x??"),
+        # decimal numbers preceded by whitespace -> ??
+        NormalizationRule(r"\d", r"(?<=\s[^\D0])\d*|(?<=\s0)(?![xX])\d*", "??"),
+        # thread T0 -> thread T?
+        NormalizationRule("tT", r"(?<=[tT])[hH][rR][eE][aA][dD] [tT]\d+", "thread T?"),
+    ]
+)
 
 
 def _clean_generic_output(output: str) -> str:
-    tc_null = "==??=="
-    hex_null = "0x??"
-    dec_null = "??"
-    thread_null = "thread T?"
-
-    # TODO: re.compile?
-    cleaned = truncate_llvm_log(output)
-    cleaned = re.sub(r"==\d+==", tc_null, cleaned, flags=re.IGNORECASE) # remove ==X==
-    cleaned = re.sub(r"([^\w+])0x[0-9a-f]+", r"\g<1>" + hex_null, cleaned, flags=re.IGNORECASE) # remove hex numbers
-    cleaned = re.sub(r"(\s)(?!0x)\d+", r"\g<1>" + dec_null, cleaned, flags=re.IGNORECASE) # remove decimal numbers
-    cleaned = re.sub(r"thread T\d+", thread_null, cleaned, flags=re.IGNORECASE) # remove T0
-
-    return cleaned
+    return generic_normalizer.normalize(truncate_llvm_log(output))
 
 
 clean_numbers = re.compile(r"0x[0-9a-f]+|[0-9]+")
@@ -89,145 +70,438 @@ def _clean_atheris_output(text: str) -> str:
     return "\n".join(map(_clean, text.splitlines()))
 
 
-def _read_brief(stacktrace: str, engine: EngineID, lang: LangID) -> Optional[str]:
-    match = None
-    if engine == EngineID.go_fuzz_libfuzzer:
-        """
-            panic: runtime error: integer divide by zero
-            panic: kek
-        """
-        match = re.search(r"^panic: (.+)$", stacktrace, re.MULTILINE)
-    
-    elif engine == EngineID.cargo_fuzz:
-        """
-            writeln!(err, "thread '{name}' panicked at '{msg}', {location}");
-            thread '<unnamed>' panicked at 'attempt to subtract with overflow', src/main.rs:10:21
-        """
-        match = re.search(r"^thread '.+' panicked at '(.+)', ", stacktrace, re.MULTILINE)
-
-    elif engine == EngineID.atheris:
-        """
-            === Uncaught Python exception: ===
-            ZeroDivisionError: division by zero
-            Traceback (most recent call last):
-        """
-        match = re.search(
-            r"=== Uncaught Python exception: ===\s+" # === Uncaught Python exception: ===
-            r"([^\r\n]+)\s+"                         # ZeroDivisionError: division by zero
-            r"Traceback \(most recent call last\):", # Traceback (most recent call last):
-            stacktrace,
-            re.MULTILINE
-        )
-
-    elif engine == EngineID.jazzer:
-        """
-            == Java Exception: java.lang.ArithmeticException: / by zero
-        """
-        match = re.search(r"^== Java Exception: (.+)$", stacktrace, re.MULTILINE)
-
-    if match is None:
-        match = re.search(r"^SUMMARY: (.+)$", stacktrace, re.MULTILINE)
-
-    if match is not None:
-        return match[1].strip()
-    
-    return None
+# Reports are found by searching literal part of their header and
+# checking the rest in place. Only report is split into lines, while
+# output (megabytes of fuzzing progress) is searched as a whole.
+# Line boundaries are the same as of str.splitlines, and report lines
+# are joined the way line-by-line readers did: "\n".join(lines_with_ends)
 
+LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+line_end_re = re.compile(r"\r\n|[%s]" % LINE_BREAKS)
+line_char = r"[^%s]" % LINE_BREAKS
 
-def _read_stacktrace(output: str, engine: EngineID, lang: LangID) -> str:
-    if engine == EngineID.libfuzzer:
-        return _read_libfuzzer_stacktrace(output)
-    if engine == EngineID.go_fuzz_libfuzzer:
-        return _read_go_fuzz_stacktrace(output)
-    if engine == EngineID.cargo_fuzz:
-        return _read_cargo_fuzz_stacktrace(output)
-    if engine == EngineID.atheris:
-        return _read_atheris_stacktrace(output)
-    if engine == EngineID.jazzer:
-        return _read_jazzer_stacktrace(output)
+libfuzzer_header_re = re.compile(r"==[0-9]+==ERROR: ")
+cargo_fuzz_header_re = re.compile(r"thread '%s*' panicked at '%s*', " % (line_char, line_char))
+
+
+def _is_line_start(text: str, pos: int) -> bool:
+    return pos == 0 or text[pos - 1] in LINE_BREAKS
+
+
+def _line_end(text: str, pos: int) -> int:
+    match = line_end_re.search(text, pos)
+    return match.end() if match else len(text)
+
+
+def _line_start(text: str, pos: int, lo: int) -> int:
+    """Start of line containing pos. Line starts at lo or later"""
+    return max(lo, max(text.rfind(c, lo, pos) for c in LINE_BREAKS) + 1)
+
+
+# Prefix found mostly not at line start (e.g. in repeated
+# stack frames) is searched together with preceding line break
+MAX_LINE_MISSES = 16
+
+
+def _find_line(text: str, prefix: str, start: int = 0) -> int:
+
+    """Finds line starting with prefix"""
+
+    pos = text.find(prefix, start)
+    for _ in range(MAX_LINE_MISSES):
+        if pos == -1 or _is_line_start(text, pos):
+            return pos
+        pos = text.find(prefix, pos + 1)
+
+    if pos == -1:
+        return -1
+
+    found = [text.find(c + prefix, pos - 1) for c in LINE_BREAKS]
+    found = [p + 1 for p in found if p != -1]
+    return min(found) if found else -1
+
+
+def _rfind_line(text: str, prefix: str) -> int:
+
+    """Finds last line starting with prefix"""
+
+    pos = text.rfind(prefix)
+    for _ in range(MAX_LINE_MISSES):
+        if pos == -1 or _is_line_start(text, pos):
+            return pos
+        pos = text.rfind(prefix, 0, pos)
+
+    if pos == -1:
+        return -1
+
+    found = max(text.rfind(c + prefix, 0, pos + len(prefix)) for c in LINE_BREAKS)
+    if found != -1:
+        return found + 1
+
+    return 0 if text.startswith(prefix) else -1
+
+
+def _find_marked_line(text: str, start: int) -> int:
+    """Finds start of line containing one of the report end markers"""
+    found = [p for p in (text.find("=========", start), text.find("== ERROR: ", start)) if p != -1]
+    return _line_start(text, min(found), start) if found else len(text)
+
+
+def _join_lines(report: str) -> str:
+    return "\n".join(report.splitlines(True))
+
+
+def _find_libfuzzer_header(output: str) -> int:
+
+    pos = output.find("==ERROR: ")
+    while pos != -1:
+        start = pos
+        while start > 0 and "0" <= output[start - 1] <= "9":
+            start -= 1
 
-    raise NotImplementedError(f"Unknown engine: {engine}")
+        start -= 2
+        if start < pos - 2 and start >= 0 and _is_line_start(output, start):
+            if libfuzzer_header_re.match(output, start):
+                return start
+
+        pos = output.find("==ERROR: ", pos + 1)
+
+    return -1
 
 
 def _read_libfuzzer_stacktrace(output: str):
-    header_re = re.compile(r"^==[0-9]+==ERROR: .*$")
-    in_stacktrace = False
-    res = []
-    for line in output.splitlines(True):
-        if not in_stacktrace:
-            if header_re.match(line):
-                in_stacktrace = True
-                res.append(line)
-        else:
-            res.append(line)
-            if line.startswith("SUMMARY: "):
-                break
 
-    return "\n".join(res)
+    start = _find_libfuzzer_header(output)
+    if start == -1:
+        return ""
+
+    summary = _find_line(output, "SUMMARY: ", _line_end(output, start))
+    end = _line_end(output, summary) if summary != -1 else len(output)
+    return _join_lines(output[start:end])
 
 
 def _read_jazzer_stacktrace(output: str):
-    header_re = re.compile(r"^== Java Exception: .*$")
-    in_stacktrace = False
-    res = []
-    for line in output.splitlines(True):
-        if not in_stacktrace:
-            if header_re.match(line):
-                in_stacktrace = True
-                res.append(line)
-        else:
-            if line.startswith("DEDUP_TOKEN:"): # or line.startswith("== ")
-                break
-            res.append(line)
-    
-    return "\n".join(res)
+
+    start = _find_line(output, "== Java Exception: ")
+    if start == -1:
+        return ""
+
+    end = _find_line(output, "DEDUP_TOKEN:", _line_end(output, start))
+    if end == -1:
+        end = len(output)
+
+    return _join_lines(output[start:end])
+
+
+def _find_cargo_fuzz_header(output: str) -> int:
+
+    start = _find_line(output, "thread '")
+    while start != -1 and not cargo_fuzz_header_re.match(output, start):
+        start = _find_line(output, "thread '", start + 1)
+
+    return start
 
 
 def _read_cargo_fuzz_stacktrace(output: str):
-    header_re = re.compile(r"^thread '.*' panicked at '.*', .*$")
-    in_stacktrace = False
-    res = []
-    for line in output.splitlines(True):
-        if not in_stacktrace:
-            if header_re.match(line):
-                in_stacktrace = True
-                res.append(line)
-        else:
-            if '=========' in line or '== ERROR: ' in line:
-                break
-            res.append(line)
-    
-    return "\n".join(res)
+
+    start = _find_cargo_fuzz_header(output)
+    if start == -1:
+        return ""
+
+    end = _find_marked_line(output, _line_end(output, start))
+    return _join_lines(output[start:end])
+
+
+def _find_atheris_header(output: str) -> int:
+
+    header = "=== Uncaught Python exception: ==="
+    pos = output.find(header)
+
+    while pos != -1:
+        start = pos
+        while start > 0 and output[start - 1].isspace() and output[start - 1] not in LINE_BREAKS:
+            start -= 1
+
+        # Header is followed by "\n" or by the end of output
+        after = pos + len(header)
+        if _is_line_start(output, start) and output[after : after + 1] in ("", "\n"):
+            return start
+
+        pos = output.find(header, pos + 1)
+
+    return -1
 
 
 def _read_atheris_stacktrace(output: str):
-    header_re = re.compile(r"^\s*=== Uncaught Python exception: ===$")
-    in_stacktrace = False
-    res = []
-    for line in output.splitlines(True):
-        if not in_stacktrace:
-            if header_re.match(line):
-                in_stacktrace = True
-                res.append(line)
-        else:
-            if '=========' in line or '== ERROR: ' in line:
-                break
-            res.append(line)
 
-    return "\n".join(res)
+    start = _find_atheris_header(output)
+    if start == -1:
+        return ""
+
+    end = _find_marked_line(output, _line_end(output, start))
+    return _join_lines(output[start:end])
 
 
 def _read_go_fuzz_stacktrace(output: str):
-    res = []
-    for line in output.splitlines(True):
-        if line.startswith("panic: "):
-            res = [line]
+
+    # The last panic is reported. Without panic whole output is read
+    start = max(_rfind_line(output, "panic: "), 0)
+    end = _find_marked_line(output, start)
+    return _join_lines(output[start:end])
+
+
+def _find_marked_end(block: str, start: int) -> int:
+    end = _find_marked_line(block, start)
+    return end if end < len(block) else -1
+
+
+summary_re = re.compile(r"^SUMMARY: (.+)$", re.MULTILINE)
+
+
+# TODO: debug jazzer and swift output
+class LibfuzzerParser(ICrashParser):
+
+    """
+    Reads report of libFuzzer with sanitizers: from "==PID==ERROR: "
+    line to "SUMMARY: " line. Parsers of other libFuzzer-based engines
+    differ by report boundaries, brief and cleaning of report
+    """
+
+    brief_re: Optional[Pattern] = None
+    """ Brief specific to engine. Otherwise, brief is read from summary """
+
+    def parse_crash(self, lang: LangID, crash_dict: dict) -> Tuple[Optional[str], str]:
+
+        crash = LibfuzzerCrash(**crash_dict)
+        if crash.output is None:
+            raise ValueError("Stored output must be read by StacktraceReader")
+
+        return self.parse_stacktrace(lang, self.read_stacktrace(crash.output))
+
+    def parse_stacktrace(self, lang: LangID, stacktrace: str) -> Tuple[Optional[str], str]:
+        brief = self.read_brief(stacktrace)
+        stacktrace_hash = sha256(self.clean(stacktrace).encode()).hexdigest()
+        return brief, stacktrace_hash
+
+    def stacktrace_reader(self) -> StacktraceReader:
+        return StacktraceReader(self)
+
+    def read_brief(self, stacktrace: str) -> Optional[str]:
+
+        match = None
+        if self.brief_re is not None:
+            match = self.brief_re.search(stacktrace)
+
+        if match is None:
+            match = summary_re.search(stacktrace)
+
+        if match is not None:
+            return match[1].strip()
+
+        return None
+
+    def clean(self, stacktrace: str) -> str:
+        return _clean_generic_output(stacktrace)
+
+    def read_stacktrace(self, output: str) -> str:
+        return _read_libfuzzer_stacktrace(output)
+
+    def find_header(self, block: str) -> int:
+        return _find_libfuzzer_header(block)
+
+    def find_end(self, block: str, start: int) -> int:
+
+        """Finds end of report. Returns -1, if report continues after block"""
+
+        summary = _find_line(block, "SUMMARY: ", start)
+        return _line_end(block, summary) if summary != -1 else -1
+
+
+class JazzerParser(LibfuzzerParser):
+
+    """
+        == Java Exception: java.lang.ArithmeticException: / by zero
+    """
+
+    brief_re = re.compile(r"^== Java Exception: (.+)$", re.MULTILINE)
+
+    def read_stacktrace(self, output: str) -> str:
+        return _read_jazzer_stacktrace(output)
+
+    def find_header(self, block: str) -> int:
+        return _find_line(block, "== Java Exception: ")
+
+    def find_end(self, block: str, start: int) -> int:
+        return _find_line(block, "DEDUP_TOKEN:", start)
+
+
+class CargoFuzzParser(LibfuzzerParser):
+
+    """
+        writeln!(err, "thread '{name}' panicked at '{msg}', {location}");
+        thread '<unnamed>' panicked at 'attempt to subtract with overflow', src/main.rs:10:21
+    """
+
+    brief_re = re.compile(r"^thread '.+' panicked at '(.+)', ", re.MULTILINE)
+
+    def read_stacktrace(self, output: str) -> str:
+        return _read_cargo_fuzz_stacktrace(output)
+
+    def find_header(self, block: str) -> int:
+        return _find_cargo_fuzz_header(block)
+
+    def find_end(self, block: str, start: int) -> int:
+        return _find_marked_end(block, start)
+
+
+class AtherisParser(LibfuzzerParser):
+
+    """
+        === Uncaught Python exception: ===
+        ZeroDivisionError: division by zero
+        Traceback (most recent call last):
+    """
+
+    brief_re = re.compile(
+        r"=== Uncaught Python exception: ===\s+" # === Uncaught Python exception: ===
+        r"([^\r\n]+)\s+"                         # ZeroDivisionError: division by zero
+        r"Traceback \(most recent call last\):", # Traceback (most recent call last):
+        re.MULTILINE
+    )
+
+    def clean(self, stacktrace: str) -> str:
+        return _clean_atheris_output(stacktrace)
+
+    def read_stacktrace(self, output: str) -> str:
+        return _read_atheris_stacktrace(output)
+
+    def find_header(self, block: str) -> int:
+        return _find_atheris_header(block)
+
+    def find_end(self, block: str, start: int) -> int:
+        return _find_marked_end(block, start)
+
+
+class GoFuzzParser(LibfuzzerParser):
+
+    """
+        panic: runtime error: integer divide by zero
+        panic: kek
+    """
+
+    brief_re = re.compile(r"^panic: (.+)$", re.MULTILINE)
+
+    def read_stacktrace(self, output: str) -> str:
+        return _read_go_fuzz_stacktrace(output)
+
+    def stacktrace_reader(self) -> StacktraceReader:
+        return GoFuzzStacktraceReader(self)
+
+
+class StacktraceReader:
+
+    """
+    Reads stacktrace from output fed chunk by chunk, like
+    `read_stacktrace` of parser does from the whole output. Output
+    is split into blocks of complete lines, which are searched for
+    report as whole outputs are. Only report and incomplete last line
+    are kept in memory. SHA-256 of the whole output is computed on the way.
+    Bytes are decoded as UTF-8, invalid sequences are replaced.
+    """
+
+    SEEK, READ, DONE = range(3)
+
+    def __init__(self, parser: LibfuzzerParser):
+
+        self._parser = parser
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self._sha256 = sha256()
+        self._size = 0
+
+        self._pending = ""
+        self._report: List[str] = []
+        self._state = self.SEEK
+
+    @property
+    def hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def feed(self, chunk: bytes):
+
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+        if self._state == self.DONE:
+            return
+
+        text = self._pending + self._decoder.decode(chunk)
+
+        # "\r" may be the first half of "\r\n"
+        limit = len(text) - 1 if text.endswith("\r") else len(text)
+        end = max(text.rfind(c, 0, limit) for c in LINE_BREAKS) + 1
+
+        self._pending = text[end:]
+        if end > 0:
+            self._feed_lines(text[:end])
+
+    def stacktrace(self) -> str:
+
+        """Reads the rest of output. Must be called once after all chunks are fed"""
+
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+
+        if text and self._state != self.DONE:
+            self._feed_lines(text)
+
+        return _join_lines("".join(self._report))
+
+    def _feed_lines(self, block: str):
+
+        start = search_from = 0
+        if self._state == self.SEEK:
+            start = self._parser.find_header(block)
+            if start == -1:
+                return
+
+            # Header line itself is never an end of report
+            search_from = _line_end(block, start)
+            self._state = self.READ
+
+        end = self._parser.find_end(block, search_from)
+        if end == -1:
+            end = len(block)
+        else:
+            self._state = self.DONE
+
+        self._report.append(block[start:end])
+
+
+class GoFuzzStacktraceReader(StacktraceReader):
+
+    """The last panic is reported. Without panic whole output is read"""
+
+    def __init__(self, parser: LibfuzzerParser):
+        super().__init__(parser)
+        self._state = self.READ
+
+    def _feed_lines(self, block: str):
+
+        # Each panic starts report anew
+        start = _rfind_line(block, "panic: ")
+        if start != -1:
+            self._report = []
+            self._state = self.READ
+        elif self._state == self.READ:
+            start = 0
         else:
-            res.append(line)
+            return
 
-    for i in range(len(res)):
-        if '=========' in res[i] or '== ERROR: ' in res[i]:
-            res = res[0:i]
-            break
+        end = _find_marked_line(block, start)
+        if end < len(block):
+            self._state = self.SEEK
 
-    return "\n".join(res)
+        self._report.append(block[start:end])
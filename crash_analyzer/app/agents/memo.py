@@ -0,0 +1,97 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from collections import OrderedDict
+from hashlib import blake2b
+import sys
+
+from crash_analyzer.app.models import EngineID, LangID
+from crash_analyzer.app.metrics import (
+    PARSE_MEMO_EVICTIONS,
+    PARSE_MEMO_HITS,
+    PARSE_MEMO_MISSES,
+    PARSE_MEMO_SIZE_BYTES,
+)
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import ParseMemoSettings
+
+MemoKey = Tuple[EngineID, LangID, str]
+ParseResult = Tuple[Optional[str], str]
+
+# Outputs up to this size are hashed in tens of microseconds:
+# faster than handing them over to another thread
+LOOP_DIGEST_MAX_SIZE = 16 * 1024
+
+
+def output_digest(output: str) -> str:
+
+    """Digest of output sent inline. Stored outputs are
+    identified by SHA-256 computed while they are read"""
+
+    data = output.encode(errors="surrogatepass")
+    return blake2b(data, digest_size=16).hexdigest()
+
+
+def _entry_size(key: MemoKey, result: ParseResult) -> int:
+    brief, unique_hash = result
+    strings = [key[2], brief or "", unique_hash]
+    return sum(map(sys.getsizeof, strings)) + sys.getsizeof(key) + sys.getsizeof(result)
+
+
+class ParseMemo:
+
+    """
+    LRU memo of parse results (brief and unique hash) keyed by
+    engine, language and digest of output. Byte-identical outputs,
+    e.g. of redelivered messages or re-reproduced inputs, are parsed
+    once. Bounded both by number of entries and by estimated memory
+    """
+
+    _max_entries: int
+    _max_bytes: int
+    _entries: OrderedDict  # MemoKey -> (ParseResult, size)
+    _size: int
+
+    def __init__(self, settings: ParseMemoSettings):
+        self._max_entries = settings.max_entries
+        self._max_bytes = settings.max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: MemoKey) -> Optional[ParseResult]:
+
+        entry = self._entries.get(key)
+        if entry is None:
+            PARSE_MEMO_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        PARSE_MEMO_HITS.inc()
+        return entry[0]
+
+    def put(self, key: MemoKey, result: ParseResult):
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= old[1]
+
+        size = _entry_size(key, result)
+        self._entries[key] = (result, size)
+        self._size += size
+
+        while self._entries and (
+            len(self._entries) > self._max_entries or self._size > self._max_bytes
+        ):
+            _, (_, lru_size) = self._entries.popitem(last=False)
+            self._size -= lru_size
+            PARSE_MEMO_EVICTIONS.inc()
+
+        PARSE_MEMO_SIZE_BYTES.set(self._size)
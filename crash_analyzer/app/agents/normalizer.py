@@ -0,0 +1,49 @@
+from __future__ import annotations
+from typing import Match, NamedTuple, Sequence
+
+import re
+
+
+class NormalizationRule(NamedTuple):
+
+    lead: str
+    """ Character class (without brackets) of the first matched character """
+
+    pattern: str
+    """ Rest of the match. May look behind to inspect the lead character """
+
+    replacement: str
+    """ Text which replaces the whole match """
+
+
+class OutputNormalizer:
+
+    """
+    Rewrites volatile tokens (addresses, pids, thread ids, etc.)
+    of crash output in a single scan.
+
+    All rules are compiled once into one regex of the form
+    `[<leads>](?:(<pattern1>)|(<pattern2>)|...)`. Starting with a
+    character class lets `re` skip uninteresting characters in C,
+    which is what makes one scan cheaper than a pass per rule.
+    Rules are tried in order at each position and must not
+    contain capturing groups.
+    """
+
+    _regex: re.Pattern
+    _replacements: tuple
+
+    def __init__(self, rules: Sequence[NormalizationRule], flags: int = 0):
+        leads = "".join(rule.lead for rule in rules)
+        branches = "|".join(f"({rule.pattern})" for rule in rules)
+        self._regex = re.compile(f"[{leads}](?:{branches})", flags)
+        self._replacements = (None, *[rule.replacement for rule in rules])
+
+        if self._regex.groups != len(rules):
+            raise ValueError("Normalization rules must not contain capturing groups")
+
+    def _replace(self, match: Match) -> str:
+        return self._replacements[match.lastindex]
+
+    def normalize(self, text: str) -> str:
+        return self._regex.sub(self._replace, text)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+from typing import Dict
+
+import importlib
+
+from crash_analyzer.app.models import EngineID
+
+from .abstract import ICrashParser
+from .errors import UnsupportedEngineError
+
+# Parser classes as "module:Class" paths. Module of engine is
+# imported, and its parser created, when engine is met first time
+_paths: Dict[EngineID, str] = {}
+_parsers: Dict[EngineID, ICrashParser] = {}
+
+
+def register_parser(engine: EngineID, path: str):
+    _paths[engine] = path
+    _parsers.pop(engine, None)
+
+
+def is_supported(engine: EngineID) -> bool:
+    return engine in _paths
+
+
+def get_parser(engine: EngineID) -> ICrashParser:
+
+    parser = _parsers.get(engine)
+    if parser is not None:
+        return parser
+
+    try:
+        module_name, class_name = _paths[engine].split(":")
+    except KeyError:
+        raise UnsupportedEngineError(f"Unsupported fuzzer engine: {engine}") from None
+
+    module = importlib.import_module(module_name, __package__)
+    parser = _parsers[engine] = getattr(module, class_name)()
+    return parser
+
+
+register_parser(EngineID.afl, ".afl:AflParser")
+register_parser(EngineID.afl_rs, ".afl:AflParser")
+register_parser(EngineID.sharpfuzz_afl, ".afl:AflParser")
+
+register_parser(EngineID.libfuzzer, ".libfuzzer:LibfuzzerParser")
+register_parser(EngineID.jazzer, ".libfuzzer:JazzerParser") # TODO: remove todo when brief done
+register_parser(EngineID.atheris, ".libfuzzer:AtherisParser")
+register_parser(EngineID.cargo_fuzz, ".libfuzzer:CargoFuzzParser")
+register_parser(EngineID.go_fuzz_libfuzzer, ".libfuzzer:GoFuzzParser")
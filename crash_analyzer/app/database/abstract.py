@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Dict, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 from abc import abstractmethod, ABCMeta
 from ..util import testing_only
@@ -8,6 +8,12 @@ if TYPE_CHECKING:
     from ..settings import AppSettings
     from .orm import ORMCrashInfo
 
+HashKey = Tuple[str, str, str]
+""" (fuzzer_id, fuzzer_rev, unique_hash) """
+
+InputKey = Tuple[str, str, str]
+""" (fuzzer_id, fuzzer_rev, input_hash) """
+
 
 class IDBCrashIterator(metaclass=ABCMeta):
     @abstractmethod
@@ -33,10 +39,29 @@ class ICrashes(metaclass=ABCMeta):
     ) -> Optional[ORMCrashInfo]:
         pass
 
+    @abstractmethod
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+        """Finds crashes by single request. Keys of crashes
+        which are not found are missing in result"""
+
     @abstractmethod
     async def insert(self, crash: ORMCrashInfo) -> None:
         pass
 
+    @abstractmethod
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+        """Inserts crashes by single request. Crashes rejected, because
+        the same crash (or crash with the same key) already exists,
+        are returned. Other errors are raised after the rest is inserted"""
+
+    @abstractmethod
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+        """Atomically finds crash with the same fuzzer_id, fuzzer_rev
+        and unique_hash or inserts the given one if there's no such crash.
+        Returns stored crash and True if it had already existed"""
+
     @abstractmethod
     async def update(self, crash: ORMCrashInfo) -> None:
         pass
@@ -84,6 +109,10 @@ class IDatabase(metaclass=ABCMeta):
     def unsent_mq(self) -> IUnsentMessages:
         pass
 
+    @abstractmethod
+    async def flush(self) -> None:
+        """Writes crashes buffered in memory (if any) to database"""
+
     @abstractmethod
     @testing_only
     async def truncate_all_collections(self) -> None:
@@ -8,6 +8,10 @@ from .initializer import ArangoDBInitializer
 from .interfaces.unsent_mq import DBUnsentMessages
 from .interfaces.crashes import DBCrashes
 from ..abstract import IDatabase
+from ..cache import CachedCrashes
+from ..input_index import InputIndexCrashes
+from ..single_flight import SingleFlightCrashes
+from ..write_behind import WriteBehindCrashes
 
 
 if TYPE_CHECKING:
@@ -21,6 +25,7 @@ class ArangoDB(IDatabase):
 
     _db_crashes: ICrashes
     _db_unsent_mq: IUnsentMessages
+    _write_behind: Optional[WriteBehindCrashes]
 
     _logger: logging.Logger
     _collections: CollectionSettings
@@ -50,6 +55,22 @@ class ArangoDB(IDatabase):
         collections = db_initializer.collections
 
         self._db_crashes = DBCrashes(self, collections)
+
+        self._write_behind = None
+        if settings.write_behind.enabled and settings.write_behind.max_pending > 0:
+            self._write_behind = WriteBehindCrashes(self._db_crashes, settings.write_behind)
+            self._db_crashes = self._write_behind
+
+        if settings.dedup_cache.max_entries > 0:
+            self._db_crashes = CachedCrashes(self._db_crashes, settings.dedup_cache)
+
+        # Concurrent misses of the same crash share single query
+        self._db_crashes = SingleFlightCrashes(self._db_crashes)
+
+        # Above single flight: inputs of calls sharing a query are indexed too
+        if settings.input_index.enabled:
+            self._db_crashes = InputIndexCrashes(self._db_crashes, settings.input_index)
+
         self._db_unsent_mq = DBUnsentMessages(self, collections)
 
         self._is_closed = False
@@ -69,10 +90,18 @@ class ArangoDB(IDatabase):
             for col_name in [col["name"] for col in await self._db.collections()]:
                 await db.collection(col_name).truncate()
 
+    async def flush(self):
+        if self._write_behind is not None:
+            await self._write_behind.flush()
+
     async def close(self):
         
         assert not self._is_closed, "Database connection has been already closed"
 
+        if self._write_behind is not None and self._write_behind.pending:
+            count = self._write_behind.pending
+            self._logger.error(f"{count} buffered crashes have not been written")
+
         if self._client:
             await self._client.close()
             self._client = None
@@ -1,9 +1,30 @@
 from crash_analyzer.app.settings import AppSettings, CollectionSettings
 from aioarangodb.database import StandardDatabase
+from aioarangodb.errno import UNIQUE_CONSTRAINT_VIOLATED
+from aioarangodb.exceptions import IndexCreateError
 from aioarangodb import ArangoClient
 
+from .interfaces.crashes import (
+    QUERY_CRASH_BY_HASH,
+    QUERY_GET_OR_INSERT_CRASH,
+    QUERY_CRASHES_BY_HASHES,
+    QUERY_REVISION_CRASHES,
+)
 from ..errors import DatabaseError
 import logging
+import json
+
+# Groups of documents which prevent unique index creation
+QUERY_DUPLICATES = """
+    LET groups = (
+        FOR doc IN @@collection
+            LET key = (FOR field IN @fields RETURN doc[field])
+            COLLECT group = key WITH COUNT INTO count
+            FILTER count > 1
+            RETURN { key: group, count }
+    )
+    RETURN { total: LENGTH(groups), sample: SLICE(groups, 0, @sample) }
+"""
 
 ########################################
 # ArangoDB Base Initializer
@@ -14,6 +35,7 @@ class ArangoDBBaseInitializer:
 
     _client: ArangoClient
     _db: StandardDatabase
+    _rebuild_drifted_indexes: bool
 
     @staticmethod
     def get_logger():
@@ -55,6 +77,141 @@ class ArangoDBBaseInitializer:
 
         await batch_db.commit()
 
+    @staticmethod
+    def _index_drift(declared: dict, existing: dict):
+
+        drift = []
+        for prop in ["type", "fields", "unique", "sparse"]:
+            if existing.get(prop) != declared[prop]:
+                drift.append(f"{prop}: {existing.get(prop)} != {declared[prop]}")
+
+        return drift
+
+    async def _create_index(self, collection, index: dict):
+        try:
+            await collection.add_persistent_index(
+                index["fields"],
+                unique=index["unique"],
+                sparse=index["sparse"],
+                name=index["name"],
+                in_background=True,
+            )
+        except IndexCreateError as e:
+            if index["unique"] and e.error_code == UNIQUE_CONSTRAINT_VIOLATED:
+                msg = await self._duplicates_message(collection, index)
+            else:
+                msg = f"Failed to create index '{index['name']}'. Reason - {e}"
+            raise DatabaseError(msg) from e
+
+    async def _duplicates_message(self, collection, index: dict):
+
+        variables = {
+            "@collection": collection.name,
+            "fields": index["fields"],
+            "sample": 5,
+        }
+
+        cursor = await self._db.aql.execute(QUERY_DUPLICATES, bind_vars=variables)
+        duplicates = cursor.pop()
+
+        sample = ", ".join(
+            f"{group['key']} x{group['count']}" for group in duplicates["sample"]
+        )
+
+        return (
+            f"Failed to create unique index '{index['name']}': "
+            f"collection '{collection.name}' has {duplicates['total']} groups "
+            f"of documents with the same {index['fields']} (e.g. {sample}). "
+            f"Remove duplicates keeping one document per group, then restart"
+        )
+
+    async def _create_indexes(self, col_name: str, indexes: list):
+
+        """Creates declared persistent indexes, fails on the ones which
+        definition has drifted unless rebuild is allowed explicitly
+        and reports unmanaged indexes"""
+
+        logger = self.get_logger()
+        collection = self._db[col_name]
+
+        existent = {}
+        for index in await collection.indexes():
+            if index["type"] != "primary":
+                existent[index["name"]] = index
+
+        for declared in indexes:
+            declared = {"type": "persistent", "sparse": False, **declared}
+            index_name = declared["name"]
+            index = existent.pop(index_name, None)
+
+            # Same index may have been created without name
+            if index is None:
+                for other in existent.values():
+                    if not self._index_drift(declared, other):
+                        index = existent.pop(other["name"])
+                        break
+
+                if index is not None:
+                    logger.info("Index '%s' already exists as '%s'", index_name, index["name"])
+                    continue
+
+            if index is None:
+                logger.info("Index '%s' does not exist. Creating...", index_name)
+                await self._create_index(collection, declared)
+                continue
+
+            drift = self._index_drift(declared, index)
+            if not drift:
+                logger.info("Index '%s' already exists", index_name)
+                continue
+
+            logger.warning("Index '%s' has drifted: %s", index_name, ", ".join(drift))
+            if not self._rebuild_drifted_indexes:
+                msg = (
+                    f"Index '{index_name}' of '{col_name}' has drifted. "
+                    f"Rebuild it manually or set DB_REBUILD_DRIFTED_INDEXES=true"
+                )
+                raise DatabaseError(msg)
+
+            logger.warning("Index '%s' will be recreated...", index_name)
+            await collection.delete_index(index["id"])
+            await self._create_index(collection, declared)
+
+        for index_name, index in existent.items():
+            logger.warning(
+                "Index '%s' on %s of '%s' is not managed by service",
+                index_name,
+                index["fields"],
+                col_name,
+            )
+
+    async def _explain_query(self, name: str, query: str, variables: dict):
+
+        """Logs indexes used by query. Warns about full collection scans"""
+
+        # Driver can't pass bind parameters to explain, so put them inline
+        for var, value in variables.items():
+            literal = f"`{value}`" if var.startswith("@") else json.dumps(value)
+            query = query.replace(f"@{var}", literal)
+
+        logger = self.get_logger()
+        plan = await self._db.aql.explain(query)
+
+        indexes = []
+        full_scan = False
+        for node in plan["nodes"]:
+            if node["type"] == "IndexNode":
+                indexes.extend(index["name"] for index in node["indexes"])
+            elif node["type"] == "EnumerateCollectionNode":
+                full_scan = True
+
+        if full_scan:
+            logger.warning("Query '%s' performs full collection scan", name)
+        else:
+            logger.info("Query '%s' uses indexes: %s", name, indexes)
+
+        logger.debug("Query '%s' plan: %s", name, json.dumps(plan["nodes"]))
+
     def get_init_tasks(self):
         yield "Authentication", self._verify_auth()
         yield "Check permissions", self._check_user_permissions()
@@ -64,6 +221,7 @@ class ArangoDBBaseInitializer:
         db_name = settings.database.name
         username = settings.database.username
         password = settings.database.password
+        self._rebuild_drifted_indexes = settings.database.rebuild_drifted_indexes
 
         self._client = ArangoClient(settings.database.url)
         self._db = await self._client.db(db_name, username, password)
@@ -127,12 +285,51 @@ class ArangoDBInitializer(ArangoDBBaseInitializer):
         )
 
     async def _add_indexes(self):
-        pass
+
+        # Unique index makes DBCrashes.get_or_insert safe
+        # against concurrent inserts of the same crash. Its prefix
+        # (fuzzer_id, fuzzer_rev) also serves revision crash lookups
+        await self._create_indexes(
+            self._collections.crashes,
+            [
+                {
+                    "name": "crashes_unique_hash",
+                    "fields": ["fuzzer_id", "fuzzer_rev", "unique_hash"],
+                    "unique": True,
+                },
+            ],
+        )
+
+    async def _explain_queries(self):
+
+        variables = {
+            "@collection": self._collections.crashes,
+            "fuzzer_id": "fuzzer_id",
+            "fuzzer_rev": "fuzzer_rev",
+            "unique_hash": "unique_hash",
+        }
+
+        await self._explain_query("crash by hash", QUERY_CRASH_BY_HASH, variables)
+
+        insert = {**variables, "crash": {}}
+        await self._explain_query("get or insert crash", QUERY_GET_OR_INSERT_CRASH, insert)
+
+        lookups = {
+            "@collection": self._collections.crashes,
+            "lookups": [
+                {"fuzzer_id": "fuzzer_id", "fuzzer_rev": "fuzzer_rev", "unique_hash": "unique_hash"},
+            ],
+        }
+        await self._explain_query("crashes by hashes", QUERY_CRASHES_BY_HASHES, lookups)
+
+        del variables["unique_hash"]
+        await self._explain_query("revision crashes", QUERY_REVISION_CRASHES, variables)
 
     def get_init_tasks(self):
         yield from super().get_init_tasks()
         yield "Create collections", self._create_all_collections()
         yield "Add collection indexes", self._add_indexes()
+        yield "Explain queries", self._explain_queries()
 
     @property
     def collections(self):
@@ -1,9 +1,12 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from aioarangodb.errno import UNIQUE_CONSTRAINT_VIOLATED
+from aioarangodb.exceptions import AQLQueryExecuteError, DocumentInsertError
 
 from crash_analyzer.app.database.arangodb.interfaces.base import DBBase
 from crash_analyzer.app.database.orm import ORMCrashInfo
-from crash_analyzer.app.database.abstract import ICrashes, IDBCrashIterator
+from crash_analyzer.app.database.abstract import ICrashes, IDBCrashIterator, HashKey
 from .util import (
     maybe_already_exists,
     maybe_not_found,
@@ -17,6 +20,54 @@ if TYPE_CHECKING:
     from aioarangodb.cursor import Cursor
 
 
+# Queries are explained on startup to verify they use indexes
+
+QUERY_CRASH_BY_HASH = """
+    FOR crash IN @@collection
+        FILTER crash.fuzzer_id == @fuzzer_id
+        FILTER crash.fuzzer_rev == @fuzzer_rev
+        FILTER crash.unique_hash == @unique_hash
+        LIMIT 1
+        RETURN crash
+"""
+
+# Indexed read, insert only on miss: unlike UPSERT, duplicates
+# found don't write a new document revision. Single round trip
+QUERY_GET_OR_INSERT_CRASH = """
+    LET existing = FIRST(
+        FOR crash IN @@collection
+            FILTER crash.fuzzer_id == @fuzzer_id
+            FILTER crash.fuzzer_rev == @fuzzer_rev
+            FILTER crash.unique_hash == @unique_hash
+            LIMIT 1
+            RETURN crash
+    )
+    LET inserted = (
+        FILTER existing == null
+        INSERT @crash INTO @@collection
+        RETURN NEW
+    )
+    RETURN { doc: existing || inserted[0], existed: existing != null }
+"""
+
+# Unique index guarantees at most one crash per lookup
+QUERY_CRASHES_BY_HASHES = """
+    FOR lookup IN @lookups
+        FOR crash IN @@collection
+            FILTER crash.fuzzer_id == lookup.fuzzer_id
+            FILTER crash.fuzzer_rev == lookup.fuzzer_rev
+            FILTER crash.unique_hash == lookup.unique_hash
+            RETURN crash
+"""
+
+QUERY_REVISION_CRASHES = """
+    FOR crash IN @@collection
+        FILTER crash.fuzzer_id == @fuzzer_id
+        FILTER crash.fuzzer_rev == @fuzzer_rev
+        RETURN crash
+"""
+
+
 class DBArangoCrashIterator(IDBCrashIterator):
     _cursor: Cursor
 
@@ -60,12 +111,16 @@ class DBCrashes(DBBase, ICrashes):
         unique_hash: str,
     ) -> Optional[ORMCrashInfo]:
 
-        filters = {
+        variables = {
+            "@collection": self._col_crashes.name,
             "fuzzer_id": fuzzer_id,
             "fuzzer_rev": fuzzer_rev,
             "unique_hash": unique_hash,
         }
-        cursor: Cursor = await self._col_crashes.find(filters, limit=1)
+
+        cursor: Cursor = await self._db._db.aql.execute(
+            QUERY_CRASH_BY_HASH, bind_vars=variables
+        )
 
         if cursor.empty():
             return None
@@ -73,11 +128,100 @@ class DBCrashes(DBBase, ICrashes):
         crash_dict["key"] = crash_dict["_key"]
         return ORMCrashInfo(**crash_dict)
 
+    @maybe_unknown_error
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+
+        lookups = [
+            {"fuzzer_id": fuzzer_id, "fuzzer_rev": fuzzer_rev, "unique_hash": unique_hash}
+            for fuzzer_id, fuzzer_rev, unique_hash in set(keys)
+        ]
+
+        if not lookups:
+            return {}
+
+        variables = {
+            "@collection": self._col_crashes.name,
+            "lookups": lookups,
+        }
+
+        cursor: Cursor = await self._db._db.aql.execute(
+            QUERY_CRASHES_BY_HASHES, bind_vars=variables, batch_size=len(lookups)
+        )
+
+        found = {}
+        async for crash_dict in cursor:
+            crash_dict["key"] = crash_dict["_key"]
+            crash = ORMCrashInfo.from_dict(crash_dict)
+            found[(crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash)] = crash
+
+        return found
+
     @maybe_unknown_error
     async def insert(self, crash: ORMCrashInfo) -> None:
         res = await self._col_crashes.insert(crash.dict(exclude={"key"}))
         crash.key = res["_key"]
 
+    @maybe_unknown_error
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+
+        docs = []
+        for crash in crashes:
+            doc = crash.dict(exclude={"key"})
+            if crash.key is not None:
+                doc["_key"] = crash.key
+            docs.append(doc)
+
+        rejected = []
+        error = None
+
+        for crash, res in zip(crashes, await self._col_crashes.insert_many(docs)):
+            if not isinstance(res, DocumentInsertError):
+                crash.key = res["_key"]
+            elif res.error_code == UNIQUE_CONSTRAINT_VIOLATED:
+                rejected.append(crash)
+            elif error is None:
+                error = res
+
+        if error is not None:
+            raise error
+
+        return rejected
+
+    async def _get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        variables = {
+            "@collection": self._col_crashes.name,
+            "fuzzer_id": crash.fuzzer_id,
+            "fuzzer_rev": crash.fuzzer_rev,
+            "unique_hash": crash.unique_hash,
+            "crash": crash.dict(exclude={"key"}),
+        }
+
+        cursor: Cursor = await self._db._db.aql.execute(
+            QUERY_GET_OR_INSERT_CRASH, bind_vars=variables
+        )
+        res = cursor.pop()
+
+        crash_dict = res["doc"]
+        crash_dict["key"] = crash_dict["_key"]
+        return ORMCrashInfo.from_dict(crash_dict), res["existed"]
+
+    @maybe_unknown_error
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        # Read and insert are not atomic. When two replicas insert
+        # the same crash at the same time, unique index rejects one
+        # of them. Its single retry finds the crash inserted
+        try:
+            return await self._get_or_insert(crash)
+        except AQLQueryExecuteError as e:
+            if e.error_code != UNIQUE_CONSTRAINT_VIOLATED:
+                raise
+
+        return await self._get_or_insert(crash)
+
     @maybe_unknown_error
     async def update(self, crash: ORMCrashInfo) -> None:
         crash_dict = crash.dict(exclude={"key"})
@@ -88,7 +232,13 @@ class DBCrashes(DBBase, ICrashes):
     async def get_revision_crashes(
         self, fuzzer_id: str, revision: str
     ) -> IDBCrashIterator:
-        cursor: Cursor = await self._col_crashes.find(
-            {"fuzzer_id": fuzzer_id, "fuzzer_rev": revision}
+        variables = {
+            "@collection": self._col_crashes.name,
+            "fuzzer_id": fuzzer_id,
+            "fuzzer_rev": revision,
+        }
+
+        cursor: Cursor = await self._db._db.aql.execute(
+            QUERY_REVISION_CRASHES, bind_vars=variables
         )
         return DBArangoCrashIterator(cursor)
@@ -0,0 +1,196 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from collections import OrderedDict
+import time
+import sys
+
+from .abstract import ICrashes
+from crash_analyzer.app.metrics import (
+    DEDUP_CACHE_EVICTIONS,
+    DEDUP_CACHE_HITS,
+    DEDUP_CACHE_MISSES,
+    DEDUP_CACHE_SIZE_BYTES,
+)
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import DedupCacheSettings
+    from .abstract import IDBCrashIterator, HashKey
+    from .orm import ORMCrashInfo
+
+CacheKey = Tuple[str, str, str]
+
+
+def _cache_key(crash: ORMCrashInfo) -> CacheKey:
+    return crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash
+
+
+def _entry_size(crash: ORMCrashInfo) -> int:
+    strings = [crash.key or "", crash.fuzzer_id, crash.fuzzer_rev]
+    strings.extend([crash.input_hash, crash.unique_hash])
+    return sum(map(sys.getsizeof, strings)) + sys.getsizeof(crash)
+
+
+class CachedCrashes(ICrashes):
+
+    """
+    LRU cache of crashes found by hash in front of any ICrashes.
+    Bounded both by number of entries and by estimated memory.
+    Inserted and updated crashes are written through to the cache.
+    Only existing crashes are cached: a miss always goes to database.
+    Entries are keyed by fuzzer revision, so a new revision never sees
+    crashes of previous one. Those are left to LRU eviction and TTL.
+    """
+
+    _crashes: ICrashes
+    _max_entries: int
+    _max_bytes: int
+    _ttl: float
+
+    _entries: OrderedDict  # CacheKey -> (ORMCrashInfo, size, expires)
+    _size: int
+
+    def __init__(self, crashes: ICrashes, settings: DedupCacheSettings):
+        self._crashes = crashes
+        self._max_entries = settings.max_entries
+        self._max_bytes = settings.max_bytes
+        self._ttl = settings.ttl
+
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _remove(self, key: CacheKey, reason: Optional[str]):
+
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+        if reason is not None:
+            DEDUP_CACHE_EVICTIONS.labels(reason).inc()
+
+    def _lookup(self, key: CacheKey) -> Optional[ORMCrashInfo]:
+
+        entry = self._entries.get(key)
+        if entry is None:
+            DEDUP_CACHE_MISSES.inc()
+            return None
+
+        crash, _, expires = entry
+        if expires and expires < time.monotonic():
+            self._remove(key, "ttl")
+            DEDUP_CACHE_SIZE_BYTES.set(self._size)
+            DEDUP_CACHE_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        DEDUP_CACHE_HITS.inc()
+        return crash
+
+    def _store(self, crash: ORMCrashInfo):
+
+        key = _cache_key(crash)
+        if key in self._entries:
+            self._remove(key, None)
+
+        size = _entry_size(crash)
+        expires = time.monotonic() + self._ttl if self._ttl else 0
+        self._entries[key] = (crash, size, expires)
+        self._size += size
+
+        while self._entries and (
+            len(self._entries) > self._max_entries or self._size > self._max_bytes
+        ):
+            lru_key = next(iter(self._entries))
+            self._remove(lru_key, "size")
+
+        DEDUP_CACHE_SIZE_BYTES.set(self._size)
+
+    async def get(self, key: str) -> Optional[ORMCrashInfo]:
+        return await self._crashes.get(key)
+
+    async def get_by_hash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        unique_hash: str,
+    ) -> Optional[ORMCrashInfo]:
+
+        crash = self._lookup((fuzzer_id, fuzzer_rev, unique_hash))
+        if crash is not None:
+            return crash
+
+        crash = await self._crashes.get_by_hash(fuzzer_id, fuzzer_rev, unique_hash)
+        if crash is not None:
+            self._store(crash)
+
+        return crash
+
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+
+        found = {}
+        missing = []
+
+        for key in set(keys):
+            crash = self._lookup(key)
+            if crash is not None:
+                found[key] = crash
+            else:
+                missing.append(key)
+
+        if missing:
+            stored = await self._crashes.get_many_by_hash(missing)
+            for key, crash in stored.items():
+                self._store(crash)
+                found[key] = crash
+
+        return found
+
+    async def insert(self, crash: ORMCrashInfo) -> None:
+        await self._crashes.insert(crash)
+        self._store(crash)
+
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+
+        rejected = await self._crashes.insert_many(crashes)
+        rejected_ids = set(map(id, rejected))
+
+        for crash in crashes:
+            if id(crash) not in rejected_ids:
+                self._store(crash)
+
+        return rejected
+
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        cached = self._lookup(_cache_key(crash))
+        if cached is not None:
+            return cached, True
+
+        stored, existed = await self._crashes.get_or_insert(crash)
+        self._store(stored)
+
+        return stored, existed
+
+    async def update(self, crash: ORMCrashInfo) -> None:
+
+        await self._crashes.update(crash)
+
+        # Hash might have been changed. Drop entry cached under old one
+        for key, (cached, _, _) in list(self._entries.items()):
+            if cached.key == crash.key:
+                self._remove(key, None)
+
+        self._store(crash)
+
+    async def get_revision_crashes(
+        self, fuzzer_id: str, revision: str
+    ) -> IDBCrashIterator:
+        return await self._crashes.get_revision_crashes(fuzzer_id, revision)
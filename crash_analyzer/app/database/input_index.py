@@ -0,0 +1,111 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from collections import OrderedDict
+
+from .abstract import ICrashes, InputKey
+from crash_analyzer.app.metrics import (
+    INPUT_INDEX_ENTRIES,
+    INPUT_INDEX_HITS,
+    INPUT_INDEX_MISSES,
+)
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import InputIndexSettings
+    from .abstract import IDBCrashIterator, HashKey
+    from .orm import ORMCrashInfo
+
+
+class InputIndexCrashes(ICrashes):
+
+    """
+    Process-local LRU cache of classified inputs in front of any ICrashes.
+    Every input passed through `get_or_insert` is remembered as the
+    crash it was classified as, duplicates included. Nothing is persisted:
+    inputs seen by other replicas or before restart are analyzed again.
+    """
+
+    _crashes: ICrashes
+    _max_entries: int
+    _entries: OrderedDict  # InputKey -> ORMCrashInfo
+
+    def __init__(self, crashes: ICrashes, settings: InputIndexSettings):
+        self._crashes = crashes
+        self._max_entries = settings.max_entries
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key: InputKey, crash: ORMCrashInfo):
+
+        self._entries[key] = crash
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+        INPUT_INDEX_ENTRIES.set(len(self._entries))
+
+    async def get(self, key: str) -> Optional[ORMCrashInfo]:
+        return await self._crashes.get(key)
+
+    async def get_by_hash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        unique_hash: str,
+    ) -> Optional[ORMCrashInfo]:
+        return await self._crashes.get_by_hash(fuzzer_id, fuzzer_rev, unique_hash)
+
+    async def get_by_input_hash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        input_hash: str,
+    ) -> Optional[ORMCrashInfo]:
+
+        """Finds crash which input with the given hash was classified as"""
+
+        key = (fuzzer_id, fuzzer_rev, input_hash)
+        crash = self._entries.get(key)
+        if crash is None:
+            INPUT_INDEX_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        INPUT_INDEX_HITS.inc()
+        return crash
+
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+        return await self._crashes.get_many_by_hash(keys)
+
+    async def insert(self, crash: ORMCrashInfo) -> None:
+        await self._crashes.insert(crash)
+
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+        return await self._crashes.insert_many(crashes)
+
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        stored, existed = await self._crashes.get_or_insert(crash)
+
+        # Input of duplicate is remembered as input of stored crash
+        self._store((crash.fuzzer_id, crash.fuzzer_rev, crash.input_hash), stored)
+        return stored, existed
+
+    async def update(self, crash: ORMCrashInfo) -> None:
+
+        await self._crashes.update(crash)
+
+        # Entries must not hold stale copy of updated crash
+        for key, indexed in self._entries.items():
+            if indexed.key == crash.key:
+                self._entries[key] = crash
+
+    async def get_revision_crashes(
+        self, fuzzer_id: str, revision: str
+    ) -> IDBCrashIterator:
+        return await self._crashes.get_revision_crashes(fuzzer_id, revision)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+import asyncio
+
+from .abstract import ICrashes
+from crash_analyzer.app.metrics import DEDUP_SINGLE_FLIGHT_SHARED
+
+if TYPE_CHECKING:
+    from .abstract import IDBCrashIterator, HashKey
+    from .orm import ORMCrashInfo
+
+FlightKey = Tuple[str, str, str]
+
+
+class SingleFlightCrashes(ICrashes):
+
+    """
+    Coalesces concurrent lookups of the same crash in front of any ICrashes.
+    While lookup of (fuzzer_id, fuzzer_rev, unique_hash) is in progress,
+    the same lookups await its result instead of querying database.
+    For `get_or_insert` only the first caller may get `existed=False`,
+    so a burst of the same crash yields exactly one unique crash.
+    Cancellation of a caller doesn't cancel lookup awaited by others.
+    """
+
+    _crashes: ICrashes
+    _get_flights: Dict[FlightKey, asyncio.Future]
+    _insert_flights: Dict[FlightKey, asyncio.Future]
+
+    def __init__(self, crashes: ICrashes):
+        self._crashes = crashes
+        self._get_flights = {}
+        self._insert_flights = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._get_flights) + len(self._insert_flights)
+
+    @staticmethod
+    def _start(
+        flights: Dict[FlightKey, asyncio.Future],
+        key: FlightKey,
+        lookup: Awaitable,
+    ) -> asyncio.Future:
+
+        flight = asyncio.ensure_future(lookup)
+        flights[key] = flight
+
+        def on_done(_):
+            if flights.get(key) is flight:
+                del flights[key]
+
+        flight.add_done_callback(on_done)
+        return flight
+
+    async def get(self, key: str) -> Optional[ORMCrashInfo]:
+        return await self._crashes.get(key)
+
+    async def get_by_hash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        unique_hash: str,
+    ) -> Optional[ORMCrashInfo]:
+
+        key = (fuzzer_id, fuzzer_rev, unique_hash)
+        flight = self._get_flights.get(key)
+
+        if flight is None:
+            lookup = self._crashes.get_by_hash(fuzzer_id, fuzzer_rev, unique_hash)
+            flight = self._start(self._get_flights, key, lookup)
+        else:
+            DEDUP_SINGLE_FLIGHT_SHARED.labels("get_by_hash").inc()
+
+        return await asyncio.shield(flight)
+
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+        return await self._crashes.get_many_by_hash(keys)
+
+    async def insert(self, crash: ORMCrashInfo) -> None:
+        await self._crashes.insert(crash)
+
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+        return await self._crashes.insert_many(crashes)
+
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        key = (crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash)
+        flight = self._insert_flights.get(key)
+
+        if flight is None:
+            lookup = self._crashes.get_or_insert(crash)
+            flight = self._start(self._insert_flights, key, lookup)
+            return await asyncio.shield(flight)
+
+        # Crash is either found or inserted by the first caller
+        DEDUP_SINGLE_FLIGHT_SHARED.labels("get_or_insert").inc()
+        stored, _ = await asyncio.shield(flight)
+        return stored, True
+
+    async def update(self, crash: ORMCrashInfo) -> None:
+        await self._crashes.update(crash)
+
+    async def get_revision_crashes(
+        self, fuzzer_id: str, revision: str
+    ) -> IDBCrashIterator:
+        return await self._crashes.get_revision_crashes(fuzzer_id, revision)
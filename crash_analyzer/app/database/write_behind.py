@@ -0,0 +1,218 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from uuid import uuid4
+import logging
+import asyncio
+
+from .abstract import ICrashes, HashKey
+from crash_analyzer.app.metrics import (
+    WRITE_BEHIND_PENDING,
+    WRITE_BEHIND_REJECTED,
+    WRITE_BEHIND_WRITTEN,
+)
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import WriteBehindSettings
+    from .abstract import IDBCrashIterator
+    from .orm import ORMCrashInfo
+
+
+def _hash_key(crash: ORMCrashInfo) -> HashKey:
+    return crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash
+
+
+class WriteBehindCrashes(ICrashes):
+
+    """
+    Buffers new crashes in memory and writes them to database
+    by `insert_many` when `max_pending` crashes are buffered
+    or `linger` seconds after the first of them was buffered.
+    Keys of buffered crashes are generated here, so they're known
+    before crash is written. Lookups see buffered crashes, so
+    their duplicates are found before they're written.
+
+    Failed writes are retried: crashes stay buffered until written.
+    Crash rejected by database, because another replica has inserted
+    the same crash in the meantime, is dropped with warning.
+
+    Unlike `get_or_insert` of database, lookup and buffered insert are
+    not atomic across replicas: both of them may report the same crash
+    as unique. So it's disabled by default (WRITE_BEHIND_ENABLED)
+
+    Message of buffered crash is acknowledged before the crash is written.
+    Buffer is flushed when database is closed on shutdown, but crashes
+    buffered by a killed process are lost: writes are at most once.
+    Lost crash is not redelivered, its next duplicate is reported unique
+    """
+
+    _crashes: ICrashes
+    _max_pending: int
+    _linger: float
+
+    _pending: Dict[HashKey, ORMCrashInfo]
+    _by_key: Dict[str, ORMCrashInfo]
+    _lock: asyncio.Lock
+    _flush_handle: Optional[asyncio.TimerHandle]
+    _flush_task: Optional[asyncio.Future]
+
+    def __init__(self, crashes: ICrashes, settings: WriteBehindSettings):
+        self._crashes = crashes
+        self._max_pending = settings.max_pending
+        self._linger = settings.linger_ms / 1000
+
+        self._pending = {}
+        self._by_key = {}
+        self._lock = asyncio.Lock()
+        self._flush_handle = None
+        self._flush_task = None
+        self._logger = logging.getLogger("db.write_behind")
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _add(self, crash: ORMCrashInfo):
+
+        self._pending[_hash_key(crash)] = crash
+        self._by_key[crash.key] = crash
+        WRITE_BEHIND_PENDING.set(len(self._pending))
+
+        if len(self._pending) >= self._max_pending:
+            self._start_flush()
+
+        elif self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self._linger, self._start_flush)
+
+    def _start_flush(self):
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_logged())
+
+    async def _flush_logged(self):
+
+        try:
+            await self.flush()
+        except Exception:
+            self._logger.exception("Failed to write %d crashes", len(self._pending))
+        finally:
+            self._flush_task = None
+
+        # Retry later or write crashes buffered in the meantime
+        if self._pending and self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self._linger, self._start_flush)
+
+    async def flush(self):
+
+        """Writes all buffered crashes. Raises error if write fails"""
+
+        async with self._lock:
+            while self._pending:
+
+                # Crashes stay visible to lookups while they're written
+                batch = list(self._pending.values())[: self._max_pending]
+                rejected = await self._crashes.insert_many(batch)
+
+                for crash in batch:
+                    del self._pending[_hash_key(crash)]
+                    del self._by_key[crash.key]
+
+                WRITE_BEHIND_PENDING.set(len(self._pending))
+                WRITE_BEHIND_WRITTEN.inc(len(batch) - len(rejected))
+                WRITE_BEHIND_REJECTED.inc(len(rejected))
+
+                for crash in rejected:
+                    self._logger.warning(
+                        "Crash %s is already stored, it was reported unique twice",
+                        crash.unique_hash,
+                    )
+
+    async def get(self, key: str) -> Optional[ORMCrashInfo]:
+
+        crash = self._by_key.get(key)
+        if crash is not None:
+            return crash
+
+        return await self._crashes.get(key)
+
+    async def get_by_hash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        unique_hash: str,
+    ) -> Optional[ORMCrashInfo]:
+
+        crash = self._pending.get((fuzzer_id, fuzzer_rev, unique_hash))
+        if crash is not None:
+            return crash
+
+        return await self._crashes.get_by_hash(fuzzer_id, fuzzer_rev, unique_hash)
+
+    async def get_many_by_hash(
+        self, keys: Iterable[HashKey]
+    ) -> Dict[HashKey, ORMCrashInfo]:
+
+        found = {}
+        missing = []
+
+        for key in set(keys):
+            crash = self._pending.get(key)
+            if crash is not None:
+                found[key] = crash
+            else:
+                missing.append(key)
+
+        if missing:
+            found.update(await self._crashes.get_many_by_hash(missing))
+
+        return found
+
+    async def insert(self, crash: ORMCrashInfo) -> None:
+
+        if crash.key is None:
+            crash.key = uuid4().hex
+
+        self._add(crash)
+
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+        await self.flush()
+        return await self._crashes.insert_many(crashes)
+
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+
+        key = _hash_key(crash)
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending, True
+
+        stored = await self._crashes.get_by_hash(*key)
+        if stored is not None:
+            return stored, True
+
+        # The same crash might have been buffered during lookup
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending, True
+
+        crash = crash.copy()
+        await self.insert(crash)
+        return crash, False
+
+    async def update(self, crash: ORMCrashInfo) -> None:
+
+        if crash.key in self._by_key:
+            await self.flush()
+
+        await self._crashes.update(crash)
+
+    async def get_revision_crashes(
+        self, fuzzer_id: str, revision: str
+    ) -> IDBCrashIterator:
+        await self.flush()
+        return await self._crashes.get_revision_crashes(fuzzer_id, revision)
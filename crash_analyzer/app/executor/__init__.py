@@ -0,0 +1,5 @@
+from .instance import executor_init
+from .abstract import IExecutor
+from .errors import ExecutorError
+
+__all__ = ["executor_init", "IExecutor", "ExecutorError"]
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from abc import abstractmethod, ABCMeta
+from typing import Any, Callable
+
+
+class IExecutor(metaclass=ABCMeta):
+
+    """Runs CPU-bound functions (crash parsing) off the event loop"""
+
+    @abstractmethod
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Runs func(*args) and returns its result. Waits
+        if too many calls are pending. In process mode func
+        and args must be picklable"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,195 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Optional, Set
+
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import asyncio
+import logging
+
+from .abstract import IExecutor
+from .errors import ExecutorError
+
+if TYPE_CHECKING:
+    from multiprocessing.pool import Pool
+    from crash_analyzer.app.settings import ExecutorSettings
+
+
+class ExecutorBase(IExecutor):
+
+    _logger: logging.Logger
+    _pending: asyncio.Semaphore
+    _is_closed: bool
+
+    def __init__(self, max_pending: int):
+        self._logger = logging.getLogger("executor")
+        self._pending = asyncio.Semaphore(max_pending)
+        self._is_closed = False
+
+    @abstractmethod
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        pass
+
+    async def _close(self):
+        pass
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+
+        if self._is_closed:
+            raise ExecutorError("Executor has been already closed")
+
+        async with self._pending:
+            return await self._run(func, *args)
+
+    async def close(self):
+
+        assert not self._is_closed, "Executor has been already closed"
+
+        self._is_closed = True
+        await self._close()
+
+
+class SyncExecutor(ExecutorBase):
+
+    """Runs functions inline, blocking event loop. Used for tests"""
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        return func(*args)
+
+
+class ThreadExecutor(ExecutorBase):
+
+    """Runs functions in thread pool. Keeps event loop responsive,
+    but CPU-bound functions still contend for GIL"""
+
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, max_pending: int, workers: int):
+        super().__init__(max_pending)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="parser")
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _close(self):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+
+
+class ProcessExecutor(ExecutorBase):
+
+    """Runs functions in process pool. Each worker process
+    is replaced after running `max_tasks_per_worker` tasks
+    to get rid of memory leaked by huge outputs.
+
+    Pool never reports task of worker killed by OOM or signal.
+    So task not finished in `timeout` seconds fails, and pool
+    is replaced failing other tasks running in it."""
+
+    _pool: Optional[Pool]
+    _workers: int
+    _max_tasks_per_worker: int
+    _timeout: float
+    _futures: Set[asyncio.Future]
+
+    def __init__(
+        self,
+        max_pending: int,
+        workers: int,
+        max_tasks_per_worker: int,
+        timeout: float,
+    ):
+        super().__init__(max_pending)
+        self._workers = workers
+        self._max_tasks_per_worker = max_tasks_per_worker
+        self._timeout = timeout
+        self._futures = set()
+        self._pool = self._create_pool()
+
+    def _create_pool(self) -> Pool:
+        return multiprocessing.get_context("spawn").Pool(
+            processes=self._workers,
+            maxtasksperchild=self._max_tasks_per_worker or None,
+        )
+
+    def _restart(self, pool: Pool):
+
+        # Other tasks timed out on the same pool may have restarted it
+        if pool is not self._pool:
+            return
+
+        self._logger.warning("Task timed out, restarting process pool...")
+        self._pool = self._create_pool()
+
+        futures, self._futures = self._futures, set()
+        for future in futures:
+            self._set_exception(future, ExecutorError("Process pool has been restarted"))
+
+        # Terminating waits for worker processes to exit
+        loop = asyncio.get_event_loop()
+        loop.run_in_executor(None, pool.terminate)
+
+    @staticmethod
+    def _set_result(future: asyncio.Future, result: Any):
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future: asyncio.Future, exc: BaseException):
+        if not future.done():
+            future.set_exception(exc)
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        # Callbacks are called in pool result handler thread
+        def on_result(result):
+            loop.call_soon_threadsafe(self._set_result, future, result)
+
+        def on_error(exc):
+            loop.call_soon_threadsafe(self._set_exception, future, exc)
+
+        pool = self._pool
+        pool.apply_async(func, args, callback=on_result, error_callback=on_error)
+        self._futures.add(future)
+
+        try:
+            return await asyncio.wait_for(future, self._timeout)
+        except asyncio.TimeoutError:
+            self._restart(pool)
+            raise ExecutorError(f"Task has not finished in {self._timeout}s") from None
+        finally:
+            self._futures.discard(future)
+
+    async def _close(self):
+        loop = asyncio.get_event_loop()
+        self._pool.close()
+        await loop.run_in_executor(None, self._pool.join)
+        self._pool = None
+
+
+def create_executor(settings: ExecutorSettings) -> IExecutor:
+
+    mode = settings.mode.lower()
+
+    if mode == "process":
+        return ProcessExecutor(
+            max_pending=settings.max_pending,
+            workers=settings.workers,
+            max_tasks_per_worker=settings.max_tasks_per_worker,
+            timeout=settings.timeout_ms / 1000,
+        )
+
+    if mode == "thread":
+        return ThreadExecutor(
+            max_pending=settings.max_pending,
+            workers=settings.workers,
+        )
+
+    if mode == "sync":
+        return SyncExecutor(max_pending=settings.max_pending)
+
+    raise ValueError(f"Unsupported executor mode: {mode}")
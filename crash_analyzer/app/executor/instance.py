@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from .executors import create_executor
+import logging
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import AppSettings
+    from .abstract import IExecutor
+
+
+async def executor_init(settings: AppSettings) -> IExecutor:
+
+    logger = logging.getLogger("executor")
+    executor_settings = settings.executor
+
+    logger.info(
+        "Using %s executor (workers=%d, max_pending=%d, max_tasks_per_worker=%d, timeout_ms=%d)",
+        executor_settings.mode,
+        executor_settings.workers,
+        executor_settings.max_pending,
+        executor_settings.max_tasks_per_worker,
+        executor_settings.timeout_ms,
+    )
+
+    return create_executor(executor_settings)
@@ -0,0 +1,45 @@
+from typing import NamedTuple
+from hashlib import sha256
+
+
+class StoredInputDigest(NamedTuple):
+
+    """Digest of crash input which hash is known from
+    object storage, so input itself wasn't downloaded"""
+
+    hash: str
+    preview: bytes
+    size: int
+
+
+class InputDigest:
+
+    """Hashes crash input chunk by chunk keeping only preview
+    of it. Memory used doesn't depend on size of input"""
+
+    def __init__(self, preview_max_size: int):
+        self._sha256 = sha256()
+        self._preview = bytearray()
+        self._preview_max_size = preview_max_size
+        self._size = 0
+
+    def update(self, chunk: bytes):
+
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+
+        missing = self._preview_max_size - len(self._preview)
+        if missing > 0:
+            self._preview += chunk[:missing]
+
+    @property
+    def hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def preview(self) -> bytes:
+        return bytes(self._preview)
+
+    @property
+    def size(self) -> int:
+        return self._size
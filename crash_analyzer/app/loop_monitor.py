@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Optional
+
+from contextlib import contextmanager
+import traceback
+import threading
+import logging
+import asyncio
+import time
+import sys
+
+from .metrics import LOOP_LAG, LOOP_LAG_DISTRIBUTION, SLOW_CALLBACKS
+
+if TYPE_CHECKING:
+    from .settings import LoopMonitorSettings
+
+# Read by watchdog thread. Plain dict operations are atomic
+_task_annotations: Dict[asyncio.Task, dict] = {}
+
+
+@contextmanager
+def annotate_task(**fields):
+
+    """Attaches fields to current task. They are logged
+    if task blocks event loop for too long"""
+
+    task = asyncio.current_task()
+    _task_annotations[task] = fields
+    try:
+        yield
+    finally:
+        _task_annotations.pop(task, None)
+
+
+class LoopMonitor:
+
+    """
+    Samples event loop lag: how late a sleeping coroutine is woken up.
+    Watchdog thread detects callbacks which block loop longer than threshold
+    and logs stack of blocking code along with annotations of its task
+    """
+
+    _loop: asyncio.AbstractEventLoop
+    _interval: float
+    _threshold: float
+    _sampler: Optional[asyncio.Task]
+    _watchdog: Optional[threading.Thread]
+    _stopped: threading.Event
+    _heartbeat: float
+
+    def __init__(self, settings: LoopMonitorSettings):
+        self._interval = settings.interval_ms / 1000
+        self._threshold = settings.slow_callback_ms / 1000
+        self._logger = logging.getLogger("loop")
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._watchdog = None
+
+    def start(self):
+
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._sampler = asyncio.ensure_future(self._sample())
+
+        if self._threshold > 0:
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                name="loop-watchdog",
+                daemon=True,
+            )
+            self._watchdog.start()
+
+    async def stop(self):
+
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+        self._sampler.cancel()
+        try:
+            await self._sampler
+        except asyncio.CancelledError:
+            pass
+
+    async def _sample(self):
+
+        while True:
+            started = self._loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, self._loop.time() - started - self._interval)
+
+            LOOP_LAG.set(lag)
+            LOOP_LAG_DISTRIBUTION.observe(lag)
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+
+        reported = None
+        period = min(self._interval, self._threshold) / 2
+
+        while not self._stopped.wait(period):
+
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self._interval
+            if blocked < self._threshold or heartbeat == reported:
+                continue
+
+            # Report each blocking once
+            reported = heartbeat
+            SLOW_CALLBACKS.inc()
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            task = asyncio.current_task(self._loop)
+            fields = _task_annotations.get(task, {})
+
+            # Task names appeared in Python 3.8
+            name = getattr(task, "get_name", lambda: repr(task))()
+
+            self._logger.warning(
+                "Event loop blocked for %.3fs by task %s %s\n%s",
+                blocked,
+                name,
+                " ".join(f"{k}={v}" for k, v in fields.items()),
+                stack,
+            )
@@ -1,21 +1,36 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, List, Tuple, Union
 
 from crash_analyzer.app.models import CrashBase, LangID, EngineID
 from crash_analyzer.app.database.orm import ORMCrashInfo
+from crash_analyzer.app.inputs import InputDigest, StoredInputDigest
 
 from mqtransport.participants import Consumer
 from pydantic import BaseModel, validator
 from typing import Optional
 
+import asyncio
 import base64
-from hashlib import sha256
 
-import crash_analyzer.app.agents.libfuzzer as libfuzzer
-import crash_analyzer.app.agents.afl as afl
+from crash_analyzer.app.agents import (
+    get_parser,
+    is_supported,
+    parse_crash,
+    parse_stacktrace,
+)
+from crash_analyzer.app.agents.memo import LOOP_DIGEST_MAX_SIZE, output_digest
+from crash_analyzer.app.loop_monitor import annotate_task
+from crash_analyzer.app.metrics import (
+    BYTES_PROCESSED,
+    CRASHES_ANALYZED,
+    measure_stage,
+)
+from .batching import BatchProcessor
 
 if TYPE_CHECKING:
     from mqtransport import MQApp
+    from crash_analyzer.app.agents.libfuzzer import StacktraceReader
+    from crash_analyzer.app.database.abstract import HashKey
     from crash_analyzer.app.message_queue.state import MQAppState
 
 
@@ -56,26 +71,126 @@ class MC_NewCrash(Consumer):
             raise ValueError("Not a valid rfc3339 time")
         return value
 
+    _batcher: Optional[BatchProcessor[Model]]
+    _lookup_batcher: Optional[BatchProcessor[HashKey]]
+
+    def __init__(self):
+        super().__init__()
+        self._batcher = None
+        self._lookup_batcher = None
+
+    def _get_batcher(self, app: MQApp) -> BatchProcessor[Model]:
+
+        if self._batcher is None:
+            settings = app.state.settings.crash_analyzer
+
+            async def handle_batch(batch: List[MC_NewCrash.Model]):
+                return await asyncio.gather(
+                    *[self.process(msg, app) for msg in batch],
+                    return_exceptions=True,
+                )
+
+            self._batcher = BatchProcessor(
+                handle_batch,
+                batch_size=settings.batch_size,
+                max_in_flight=settings.max_in_flight,
+                linger=settings.batch_linger_ms / 1000,
+            )
+
+        return self._batcher
+
+    def _get_lookup_batcher(self, app: MQApp) -> BatchProcessor[HashKey]:
+
+        if self._lookup_batcher is None:
+            state: MQAppState = app.state
+            settings = state.settings.crash_analyzer
+
+            async def lookup_batch(keys: List[HashKey]):
+                found = await state.db.crashes.get_many_by_hash(keys)
+                return [found.get(key) for key in keys]
+
+            self._lookup_batcher = BatchProcessor(
+                lookup_batch,
+                batch_size=settings.batch_size,
+                max_in_flight=settings.max_in_flight,
+                linger=settings.batch_linger_ms / 1000,
+            )
+
+        return self._lookup_batcher
+
+    @staticmethod
+    def get_tenant(msg: Model, tenant: str) -> str:
+        if tenant == "pool":
+            return msg.pool_id
+        if tenant == "project":
+            return msg.project_id
+        return msg.user_id
+
     async def consume(self, msg: Model, app: MQApp):
         state: MQAppState = app.state
         settings = state.settings.crash_analyzer
+        tenant = self.get_tenant(msg, state.settings.fair_scheduler.tenant)
+
+        # Tenants take turns, so crash storm of one doesn't delay others
+        async with state.scheduler.slot(tenant):
+
+            # Batch mode: messages are processed concurrently,
+            # but each call still waits for its own message
+            if settings.batch_size > 1:
+                await self._get_batcher(app).submit(msg)
+            else:
+                await self.process(msg, app)
+
+    async def process(self, msg: Model, app: MQApp):
+
+        # Identifies message if its processing blocks event loop
+        with annotate_task(fuzzer_id=msg.fuzzer_id, engine=msg.fuzzer_engine.value):
+            await self._process(msg, app)
+
+    async def _process(self, msg: Model, app: MQApp):
+        state: MQAppState = app.state
         crash_base = CrashBase(**msg.crash)
+        labels = (msg.fuzzer_engine.value, msg.fuzzer_lang.value)
 
-        input_data = await self.get_input_data(
-            state=state,
-            fuzzer_id=msg.fuzzer_id,
-            fuzzer_rev=msg.fuzzer_rev,
-            crash_base=crash_base,
-        )
-        input_hash = sha256(input_data).hexdigest()
+        with measure_stage("input", *labels):
+            input_digest = await self.get_input_digest(
+                state=state,
+                fuzzer_id=msg.fuzzer_id,
+                fuzzer_rev=msg.fuzzer_rev,
+                crash_base=crash_base,
+            )
+
+        BYTES_PROCESSED.labels("input", *labels).inc(input_digest.size)
+        if crash_base.output is not None:
+            BYTES_PROCESSED.labels("output", *labels).inc(len(crash_base.output))
+
+        input_hash = input_digest.hash
         brief = None
         duplicate_of = None
         unique_hash = None
+        outcome = "unique"
 
-        if crash_base.reproduced:
-            (duplicate_of, brief, unique_hash) = await self.handle_crash(
-                msg, app, input_hash
-            )
+        # Crash of unsupported engine can't be deduplicated, but
+        # still reported: retries would fail the same way
+        if crash_base.reproduced and not is_supported(msg.fuzzer_engine):
+            self._logger.warning(f"Unsupported engine {msg.fuzzer_engine}, crash is not parsed")
+            outcome = "unsupported"
+
+        elif crash_base.reproduced:
+            if state.settings.input_index.enabled:
+                # Input classified before by this process:
+                # output is neither read nor parsed
+                with measure_stage("input_index", *labels):
+                    duplicate_of = await state.db.crashes.get_by_input_hash(
+                        msg.fuzzer_id, msg.fuzzer_rev, input_hash
+                    )
+
+            if duplicate_of is None:
+                (duplicate_of, brief, unique_hash) = await self.handle_crash(
+                    msg, app, input_hash
+                )
+            else:
+                unique_hash = duplicate_of.unique_hash
         
         if brief is None:
             brief = f"{crash_base.type}: UNKNOWN"
@@ -83,62 +198,95 @@ class MC_NewCrash(Consumer):
         # unique crash
         if duplicate_of is None:
             self._logger.info(f"Found unique crash brief: {brief}, unique_hash: {unique_hash}")
-            preview = input_data
-            if len(preview) > settings.preview_max_size:
-                preview = preview[:settings.preview_max_size]
-
-            await state.producers.unique_crash.produce(
-                created=msg.created,
-                fuzzer_id=msg.fuzzer_id,
-                fuzzer_rev=msg.fuzzer_rev,
-                preview=base64.b64encode(preview).decode(),
-                input_id=crash_base.input_id,
-                input_hash=input_hash, # TODO:
-                output=crash_base.output,
-                brief=brief,
-                reproduced=crash_base.reproduced,
-                type=crash_base.type,
-            )
+            CRASHES_ANALYZED.labels(outcome, *labels).inc()
+            with measure_stage("produce", *labels):
+                await state.producers.unique_crash.produce(
+                    created=msg.created,
+                    fuzzer_id=msg.fuzzer_id,
+                    fuzzer_rev=msg.fuzzer_rev,
+                    preview=base64.b64encode(input_digest.preview).decode(),
+                    input_id=crash_base.input_id,
+                    input_hash=input_hash, # TODO:
+                    output_id=crash_base.output_id,
+                    output=crash_base.output,
+                    brief=brief,
+                    reproduced=crash_base.reproduced,
+                    type=crash_base.type,
+                )
 
         # duplicate
         else:
             self._logger.info(f"Found duplicate crash brief: {brief}, unique_hash: {unique_hash}")
-            await state.producers.duplicated_crash.produce(
-                fuzzer_id=msg.fuzzer_id,
-                fuzzer_rev=msg.fuzzer_rev,
-                input_hash=duplicate_of.input_hash, # TODO:
-            )
+            CRASHES_ANALYZED.labels("duplicate", *labels).inc()
+            with measure_stage("produce", *labels):
+                await state.duplicates.add(
+                    fuzzer_id=msg.fuzzer_id,
+                    fuzzer_rev=msg.fuzzer_rev,
+                    input_hash=duplicate_of.input_hash, # TODO:
+                    seen=msg.created,
+                )
 
     async def handle_crash(self, msg: Model, app: MQApp, input_hash: str) -> Tuple[Optional[ORMCrashInfo], Optional[str], str]:
         state: MQAppState = app.state
-        
-        if EngineID.is_libfuzzer(msg.fuzzer_engine):
-            brief, unique_hash = libfuzzer.parse_crash(
-                msg.fuzzer_engine,
-                msg.fuzzer_lang,
-                msg.crash,
-            )
+        labels = (msg.fuzzer_engine.value, msg.fuzzer_lang.value)
 
-        elif EngineID.is_afl(msg.fuzzer_engine):
-            brief, unique_hash = afl.parse_crash(
-                msg.fuzzer_engine,
-                msg.fuzzer_lang,
-                msg.crash,
-            )
+        parser = get_parser(msg.fuzzer_engine)
+        output = msg.crash.get("output")
+        reader = None
+        if output is None:
+            reader = parser.stacktrace_reader()
+
+        digest = None
+        if reader is not None:
+            with measure_stage("output", *labels):
+                stacktrace = await self.read_stored_stacktrace(state, msg, reader)
+            digest = reader.hash
+            parse, parse_arg = parse_stacktrace, stacktrace
 
         else:
-            raise NotImplementedError(
-                f"Unknown fuzzer engine: {msg.fuzzer_engine}"
-            )
+            # Large outputs are hashed outside of event loop. Thread is
+            # enough: passing output to worker process costs more
+            if output is not None and parser.reads_output:
+                if len(output) > LOOP_DIGEST_MAX_SIZE:
+                    loop = asyncio.get_event_loop()
+                    digest = await loop.run_in_executor(None, output_digest, output)
+                else:
+                    digest = output_digest(output)
+            parse, parse_arg = parse_crash, msg.crash
 
-        duplicate_of = await state.db.crashes.get_by_hash(
-            fuzzer_id=msg.fuzzer_id,
-            fuzzer_rev=msg.fuzzer_rev,
-            unique_hash=unique_hash,
-        )
-            
-        if duplicate_of is None:
-            await state.db.crashes.insert(
+        # Identical outputs (redeliveries, re-reproduced inputs) are parsed once
+        memo_key = (msg.fuzzer_engine, msg.fuzzer_lang, digest)
+        result = state.parse_memo.get(memo_key) if digest is not None else None
+
+        if result is None:
+            with measure_stage("parse", *labels):
+                result = await state.executor.run(
+                    parse,
+                    msg.fuzzer_engine,
+                    msg.fuzzer_lang,
+                    parse_arg,
+                )
+
+            if digest is not None:
+                state.parse_memo.put(memo_key, result)
+
+        brief, unique_hash = result
+
+        # Batch mode: crashes of concurrent messages are looked up by
+        # single query. Found ones get into dedup cache, so get_or_insert
+        # of duplicates is answered without querying database again
+        if (
+            state.settings.crash_analyzer.batch_size > 1
+            and state.settings.dedup_cache.max_entries > 0
+        ):
+            with measure_stage("lookup", *labels):
+                await self._get_lookup_batcher(app).submit(
+                    (msg.fuzzer_id, msg.fuzzer_rev, unique_hash)
+                )
+
+        # Lookup and insert are done by single query
+        with measure_stage("get_or_insert", *labels):
+            crash, existed = await state.db.crashes.get_or_insert(
                 ORMCrashInfo(
                     fuzzer_id=msg.fuzzer_id,
                     fuzzer_rev=msg.fuzzer_rev,
@@ -146,20 +294,68 @@ class MC_NewCrash(Consumer):
                     unique_hash=unique_hash,
                 )
             )
-        
+
+        duplicate_of = crash if existed else None
         return (duplicate_of, brief, unique_hash)
 
 
-    async def get_input_data(self, state: MQAppState, fuzzer_id: str, fuzzer_rev: str, crash_base: CrashBase) -> bytes:
+    async def read_stored_stacktrace(self, state: MQAppState, msg: Model, reader: StacktraceReader) -> str:
+
+        stream = await state.s3.download_crash_output(
+            msg.fuzzer_id, msg.fuzzer_rev, msg.crash["output_id"]
+        )
+
+        # Only report region of output is kept in memory
+        buffer = bytearray(state.settings.object_storage.chunk_sizes.outputs)
+        view = memoryview(buffer)
+
+        while True:
+            size = await stream.readinto(buffer)
+            if size == 0:
+                break
+            reader.feed(view[:size])
+
+        labels = (msg.fuzzer_engine.value, msg.fuzzer_lang.value)
+        BYTES_PROCESSED.labels("output", *labels).inc(reader.size)
+        return reader.stacktrace()
+
+    async def get_input_digest(self, state: MQAppState, fuzzer_id: str, fuzzer_rev: str, crash_base: CrashBase) -> Union[InputDigest, StoredInputDigest]:
+        settings = state.settings.crash_analyzer
+        digest = InputDigest(settings.preview_max_size)
+
         if crash_base.input is not None:
-            return base64.b64decode(crash_base.input)
+            digest.update(base64.b64decode(crash_base.input))
         
         else:
-            data = b''
+            # Trust checksum stored by uploader: only preview is downloaded.
+            # It comes with metadata of input, so no separate HEAD request
+            head = await state.s3.download_crash_head(
+                fuzzer_id,
+                fuzzer_rev,
+                crash_base.input_id,
+                max(settings.preview_max_size, 1),
+            )
+            preview = head.data[: settings.preview_max_size]
+            if head.info.sha256 is not None:
+                return StoredInputDigest(head.info.sha256, preview, head.info.size)
+
+            # Small input has been downloaded entirely
+            if len(head.data) == head.info.size:
+                digest.update(head.data)
+                return digest
 
             stream = await state.s3.download_crash(
                 fuzzer_id, fuzzer_rev, crash_base.input_id
             )
-            async for chunk in stream:
-                data += chunk
-            return data
+
+            # Same buffer is reused for all chunks of input
+            buffer = bytearray(state.settings.object_storage.chunk_sizes.crashes)
+            view = memoryview(buffer)
+
+            while True:
+                size = await stream.readinto(buffer)
+                if size == 0:
+                    break
+                digest.update(view[:size])
+
+        return digest
@@ -30,8 +30,11 @@ class MP_UniqueCrashFound(Producer):
         input_hash: str
         """ Unique hash of crash input """
 
-        output: str
-        """ Crash output (long multiline text) """
+        output_id: Optional[str]
+        """ Identifies crash output in object storage """
+
+        output: Optional[str]
+        """ Crash output (long multiline text). Not set if output is stored """
 
         brief: str
         """ Short description for crash """
@@ -60,4 +63,13 @@ class MP_DuplicateCrashFound(Producer):
         """ Id of revision which crash belongs to """
 
         input_hash: str
-        """ Unique hash of crash input """
\ No newline at end of file
+        """ Unique hash of crash input """
+
+        count: int
+        """ Number of duplicates found from first_seen to last_seen """
+
+        first_seen: str
+        """ Time, when first of duplicates found(rfc3339) """
+
+        last_seen: str
+        """ Time, when last of duplicates found(rfc3339) """
\ No newline at end of file
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+import asyncio
+
+T = TypeVar("T")
+BatchHandler = Callable[[List[T]], Awaitable[List[Any]]]
+
+
+class BatchProcessor(Generic[T]):
+
+    """
+    Groups submitted items into batches of up to `batch_size` and passes
+    them to handler. At most `max_in_flight` items are handled at a time.
+    Batch is dispatched when enough items are pending to fill it
+    (or all free slots) or after `linger` seconds since first pending item.
+
+    Handler must return a result or an exception for each item of batch
+    (like `asyncio.gather(..., return_exceptions=True)` does).
+    Each submitter receives the result of its own item.
+    """
+
+    _handler: BatchHandler
+    _batch_size: int
+    _max_in_flight: int
+    _linger: float
+
+    _pending: List[Tuple[T, asyncio.Future]]
+    _in_flight: int
+    _flush_handle: Optional[asyncio.TimerHandle]
+
+    def __init__(
+        self,
+        handler: BatchHandler,
+        batch_size: int,
+        max_in_flight: int,
+        linger: float,
+    ):
+        self._handler = handler
+        self._batch_size = batch_size
+        self._max_in_flight = max_in_flight
+        self._linger = linger
+
+        self._pending = []
+        self._in_flight = 0
+        self._flush_handle = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, item: T) -> Any:
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((item, future))
+        self._schedule_flush()
+        return await future
+
+    def _schedule_flush(self):
+
+        free_slots = self._max_in_flight - self._in_flight
+        if free_slots <= 0 or not self._pending:
+            return
+
+        if len(self._pending) >= min(self._batch_size, free_slots):
+            self._flush()
+
+        elif self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self._linger, self._flush)
+
+    def _flush(self):
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        # Submitters may have been cancelled while waiting
+        self._pending = [(i, f) for i, f in self._pending if not f.done()]
+
+        free_slots = self._max_in_flight - self._in_flight
+        count = min(self._batch_size, free_slots, len(self._pending))
+        if count <= 0:
+            return
+
+        batch = self._pending[:count]
+        self._pending = self._pending[count:]
+        self._in_flight += count
+
+        asyncio.ensure_future(self._handle(batch))
+        self._schedule_flush()
+
+    async def _handle(self, batch: List[Tuple[T, asyncio.Future]]):
+
+        try:
+            results = await self._handler([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._in_flight -= len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._schedule_flush()
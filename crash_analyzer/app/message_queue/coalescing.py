@@ -0,0 +1,153 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+from datetime import datetime
+import logging
+import asyncio
+import re
+
+from crash_analyzer.app.metrics import DUPLICATES_COALESCED
+
+if TYPE_CHECKING:
+    from .api_gateway import MP_DuplicateCrashFound
+
+DuplicateKey = Tuple[str, str, str]
+
+
+_RFC3339 = re.compile(
+    r"(\d{4}-\d{2}-\d{2}[Tt]\d{2}:\d{2}:\d{2})(?:\.(\d+))?([Zz]|[+-]\d{2}:?\d{2})"
+)
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+
+    """Parses rfc3339 time of any fraction precision
+    and offset format. Returns None if time is malformed"""
+
+    match = _RFC3339.fullmatch(value)
+    if match is None:
+        return None
+
+    time, fraction, offset = match.groups()
+    fraction = (fraction or "").ljust(6, "0")[:6]
+    offset = "+0000" if offset.upper() == "Z" else offset.replace(":", "")
+
+    try:
+        return datetime.strptime(
+            f"{time.upper()}.{fraction}{offset}", "%Y-%m-%dT%H:%M:%S.%f%z"
+        )
+    except ValueError:
+        return None
+
+
+class _Duplicates:
+
+    """Duplicates of one crash found during window"""
+
+    def __init__(self, seen: str):
+        self.count = 0
+        self.first_seen = self.last_seen = seen
+        self._first = self._last = _parse_time(seen)
+        self.timer = None
+
+    def add(self, seen: str):
+
+        self.count += 1
+        time = _parse_time(seen)
+
+        # Malformed time can't be ordered: range keeps valid ones
+        if time is None:
+            return
+
+        if self._first is None or time < self._first:
+            self._first, self.first_seen = time, seen
+
+        if self._last is None or time > self._last:
+            self._last, self.last_seen = time, seen
+
+
+class DuplicateCoalescer:
+
+    """
+    Aggregates duplicates of the same (fuzzer_id, fuzzer_rev, input_hash)
+    found during `window` seconds since the first of them into single
+    message with count and time range. After `flush()` is called on shutdown,
+    each duplicate is sent immediately, so nothing is lost
+    """
+
+    _producer: MP_DuplicateCrashFound
+    _window: float
+    _pending: Dict[DuplicateKey, _Duplicates]
+    _sending: Set[asyncio.Future]
+    _closed: bool
+
+    def __init__(self, producer: MP_DuplicateCrashFound, window: float):
+        self._producer = producer
+        self._window = window
+        self._pending = {}
+        self._sending = set()
+        self._closed = False
+        self._logger = logging.getLogger("mq.duplicates")
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def add(self, fuzzer_id: str, fuzzer_rev: str, input_hash: str, seen: str):
+
+        key = (fuzzer_id, fuzzer_rev, input_hash)
+
+        if self._closed or self._window <= 0:
+            duplicates = _Duplicates(seen)
+            duplicates.add(seen)
+            await self._produce(key, duplicates)
+            return
+
+        duplicates = self._pending.get(key)
+        if duplicates is None:
+            duplicates = self._pending[key] = _Duplicates(seen)
+            loop = asyncio.get_event_loop()
+            duplicates.timer = loop.call_later(self._window, self._on_window_end, key)
+        else:
+            DUPLICATES_COALESCED.inc()
+
+        duplicates.add(seen)
+
+    def _on_window_end(self, key: DuplicateKey):
+        duplicates = self._pending.pop(key)
+        task = asyncio.ensure_future(self._produce_logged(key, duplicates))
+        task.add_done_callback(self._sending.discard)
+        self._sending.add(task)
+
+    async def _produce(self, key: DuplicateKey, duplicates: _Duplicates):
+
+        fuzzer_id, fuzzer_rev, input_hash = key
+        await self._producer.produce(
+            fuzzer_id=fuzzer_id,
+            fuzzer_rev=fuzzer_rev,
+            input_hash=input_hash,
+            count=duplicates.count,
+            first_seen=duplicates.first_seen,
+            last_seen=duplicates.last_seen,
+        )
+
+    async def _produce_logged(self, key: DuplicateKey, duplicates: _Duplicates):
+        try:
+            await self._produce(key, duplicates)
+        except Exception:
+            self._logger.exception("Failed to send %d duplicates of %s", duplicates.count, key)
+
+    async def flush(self):
+
+        """Sends all pending duplicates and waits for ones being
+        sent after their window ended. Later ones are sent without delay"""
+
+        self._closed = True
+        pending, self._pending = self._pending, {}
+
+        for key, duplicates in pending.items():
+            duplicates.timer.cancel()
+            await self._produce_logged(key, duplicates)
+
+        if self._sending:
+            await asyncio.wait(list(self._sending))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Tuple
+
+from contextlib import asynccontextmanager
+from collections import deque
+import asyncio
+import time
+
+from crash_analyzer.app.metrics import (
+    TENANT_IN_FLIGHT,
+    TENANT_QUEUE_DEPTH,
+    TENANT_WAIT_TIME,
+)
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import FairSchedulerSettings
+
+
+class _Tenant:
+
+    """Waiters of one tenant ordered by arrival"""
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.waiters: Deque[Tuple[float, float, asyncio.Future]] = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+        self.idle_since: Optional[float] = None
+
+    def update_metrics(self):
+        TENANT_QUEUE_DEPTH.labels(self.name).set(len(self.waiters))
+        TENANT_IN_FLIGHT.labels(self.name).set(self.in_flight)
+
+    def remove_metrics(self):
+
+        """Drops series of tenant, so labels of gone tenants don't pile up"""
+
+        for metric in [TENANT_QUEUE_DEPTH, TENANT_IN_FLIGHT, TENANT_WAIT_TIME]:
+            try:
+                metric.remove(self.name)
+            except KeyError:
+                pass
+
+
+class FairScheduler:
+
+    """
+    Weighted fair queueing of message processing between tenants.
+    At most `max_in_flight` messages are processed at a time, at most
+    `tenant_max_in_flight` of them belong to the same tenant.
+
+    Each waiting message gets virtual finish time: the finish time of
+    previous message of its tenant (or current virtual time, if tenant
+    was idle) plus 1/weight. Free slot is given to the message with the
+    least finish time, so busy tenants share slots in proportion to
+    their weights and an idle tenant can't bank credit for later.
+
+    Tenant idle for `tenant_idle_ttl` seconds is forgotten with its
+    metric series, once its last finish time is behind virtual time:
+    it would start from virtual time anyway, so fairness is not reset.
+    """
+
+    _max_in_flight: int
+    _tenant_max_in_flight: int
+    _default_weight: float
+    _weights: Dict[str, float]
+    _tenant_idle_ttl: float
+
+    _tenants: Dict[str, _Tenant]
+    _in_flight: int
+    _vtime: float
+
+    def __init__(self, settings: FairSchedulerSettings):
+        self._max_in_flight = settings.max_in_flight
+        self._tenant_max_in_flight = settings.tenant_max_in_flight
+        self._default_weight = settings.default_weight
+        self._weights = settings.weights
+        self._tenant_idle_ttl = settings.tenant_idle_ttl
+
+        self._tenants = {}
+        self._in_flight = 0
+        self._vtime = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def pending(self) -> int:
+        return sum(len(t.waiters) for t in self._tenants.values())
+
+    def _get_tenant(self, name: str) -> _Tenant:
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            weight = self._weights.get(name, self._default_weight)
+            tenant = self._tenants[name] = _Tenant(name, weight)
+        return tenant
+
+    def _dispatch(self):
+
+        while self._in_flight < self._max_in_flight:
+
+            best = None
+            for tenant in self._tenants.values():
+                if not tenant.waiters:
+                    continue
+                if tenant.in_flight >= self._tenant_max_in_flight:
+                    continue
+                if best is None or tenant.waiters[0][0] < best.waiters[0][0]:
+                    best = tenant
+
+            if best is None:
+                break
+
+            finish, enqueued, future = best.waiters.popleft()
+            self._vtime = max(self._vtime, finish)
+            self._in_flight += 1
+            best.in_flight += 1
+
+            TENANT_WAIT_TIME.labels(best.name).observe(time.monotonic() - enqueued)
+            best.update_metrics()
+            future.set_result(None)
+
+        self._forget_idle()
+
+    def _forget_idle(self):
+
+        """Forgets long idle tenants to keep memory and metrics bounded"""
+
+        now = time.monotonic()
+        expired = []
+
+        for name, tenant in self._tenants.items():
+            if tenant.waiters or tenant.in_flight:
+                tenant.idle_since = None
+            elif tenant.idle_since is None:
+                tenant.idle_since = now
+            elif (
+                now - tenant.idle_since >= self._tenant_idle_ttl
+                and tenant.last_finish <= self._vtime
+            ):
+                expired.append(name)
+
+        for name in expired:
+            self._tenants.pop(name).remove_metrics()
+
+    async def acquire(self, name: str):
+
+        tenant = self._get_tenant(name)
+        finish = max(self._vtime, tenant.last_finish) + 1 / tenant.weight
+        tenant.last_finish = finish
+
+        future = asyncio.get_event_loop().create_future()
+        waiter = (finish, time.monotonic(), future)
+        tenant.waiters.append(waiter)
+        tenant.update_metrics()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was given right before cancellation
+                self.release(name)
+            else:
+                future.cancel()
+                tenant.waiters.remove(waiter)
+                tenant.update_metrics()
+            raise
+
+    def release(self, name: str):
+
+        tenant = self._tenants[name]
+        tenant.in_flight -= 1
+        self._in_flight -= 1
+
+        tenant.update_metrics()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, name: str):
+
+        """Waits for turn of tenant and holds processing slot"""
+
+        await self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
@@ -6,10 +6,18 @@ if TYPE_CHECKING:
     from crash_analyzer.app.message_queue.instance import Producers
     from crash_analyzer.app.database.abstract import IDatabase
     from crash_analyzer.app.object_storage.abstract import IObjectStorage
+    from crash_analyzer.app.executor.abstract import IExecutor
+    from crash_analyzer.app.agents.memo import ParseMemo
+    from .coalescing import DuplicateCoalescer
+    from .scheduling import FairScheduler
 
 
 class MQAppState:
     producers: Producers
+    duplicates: DuplicateCoalescer
+    scheduler: FairScheduler
     db: IDatabase
     s3: IObjectStorage
+    executor: IExecutor
+    parse_memo: ParseMemo
     settings: AppSettings
@@ -0,0 +1,229 @@
+"""
+Service metrics. Registered in the default registry,
+which is served by `/metrics` endpoint
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+from contextlib import contextmanager
+import time
+
+########################################
+# Deduplication cache
+########################################
+
+DEDUP_CACHE_HITS = Counter(
+    "crash_analyzer_dedup_cache_hits",
+    "Crash lookups answered by deduplication cache",
+)
+
+DEDUP_CACHE_MISSES = Counter(
+    "crash_analyzer_dedup_cache_misses",
+    "Crash lookups passed to database by deduplication cache",
+)
+
+DEDUP_CACHE_EVICTIONS = Counter(
+    "crash_analyzer_dedup_cache_evictions",
+    "Crashes evicted from deduplication cache",
+    ["reason"],
+)
+
+DEDUP_CACHE_SIZE_BYTES = Gauge(
+    "crash_analyzer_dedup_cache_size_bytes",
+    "Estimated memory used by deduplication cache",
+)
+
+DEDUP_SINGLE_FLIGHT_SHARED = Counter(
+    "crash_analyzer_dedup_single_flight_shared",
+    "Crash lookups answered by concurrent lookup of the same crash",
+    ["method"],
+)
+
+########################################
+# Index of classified inputs
+########################################
+
+INPUT_INDEX_HITS = Counter(
+    "crash_analyzer_input_index_hits",
+    "Inputs classified before, found in memory",
+)
+
+INPUT_INDEX_MISSES = Counter(
+    "crash_analyzer_input_index_misses",
+    "Inputs not classified before: crash is analyzed",
+)
+
+INPUT_INDEX_ENTRIES = Gauge(
+    "crash_analyzer_input_index_entries",
+    "Classified inputs kept in memory",
+)
+
+########################################
+# Memo of parse results
+########################################
+
+PARSE_MEMO_HITS = Counter(
+    "crash_analyzer_parse_memo_hits",
+    "Crash outputs not parsed: result of identical output memoized",
+)
+
+PARSE_MEMO_MISSES = Counter(
+    "crash_analyzer_parse_memo_misses",
+    "Crash outputs parsed: result not memoized",
+)
+
+PARSE_MEMO_EVICTIONS = Counter(
+    "crash_analyzer_parse_memo_evictions",
+    "Parse results evicted from memo",
+)
+
+PARSE_MEMO_SIZE_BYTES = Gauge(
+    "crash_analyzer_parse_memo_size_bytes",
+    "Estimated memory used by memo of parse results",
+)
+
+########################################
+# Write-behind of new crashes
+########################################
+
+WRITE_BEHIND_PENDING = Gauge(
+    "crash_analyzer_write_behind_pending",
+    "New crashes buffered in memory, not written to database yet",
+)
+
+WRITE_BEHIND_WRITTEN = Counter(
+    "crash_analyzer_write_behind_written",
+    "Buffered crashes written to database",
+)
+
+WRITE_BEHIND_REJECTED = Counter(
+    "crash_analyzer_write_behind_rejected",
+    "Buffered crashes rejected by database as already stored",
+)
+
+########################################
+# Crash input disk cache
+########################################
+
+INPUT_CACHE_HITS = Counter(
+    "crash_analyzer_input_cache_hits",
+    "Crash input downloads served from disk cache",
+)
+
+INPUT_CACHE_MISSES = Counter(
+    "crash_analyzer_input_cache_misses",
+    "Crash input downloads fetched from object storage",
+)
+
+INPUT_CACHE_BYTES_SAVED = Counter(
+    "crash_analyzer_input_cache_bytes_saved",
+    "Bytes of crash inputs read from disk cache instead of object storage",
+)
+
+INPUT_CACHE_EVICTED_BYTES = Counter(
+    "crash_analyzer_input_cache_evicted_bytes",
+    "Bytes removed from disk cache to stay within budget",
+)
+
+########################################
+# Crash analysis pipeline
+########################################
+
+# Engine and language labels take values of EngineID and LangID
+# enums only, so number of series stays bounded
+
+STAGE_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_DURATION = Histogram(
+    "crash_analyzer_stage_duration_seconds",
+    "Time spent in stage of crash analysis",
+    ["stage", "engine", "lang"],
+    buckets=STAGE_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "crash_analyzer_stage_errors",
+    "Stages of crash analysis failed with error",
+    ["stage", "engine", "lang"],
+)
+
+DUPLICATES_COALESCED = Counter(
+    "crash_analyzer_duplicates_coalesced",
+    "Duplicates merged into pending notification instead of sent",
+)
+
+CRASHES_ANALYZED = Counter(
+    "crash_analyzer_crashes_analyzed",
+    "Crashes analyzed by outcome: unique, duplicate or unsupported (engine)",
+    ["outcome", "engine", "lang"],
+)
+
+BYTES_PROCESSED = Counter(
+    "crash_analyzer_processed_bytes",
+    "Size of crash inputs and fuzzer outputs analyzed",
+    ["kind", "engine", "lang"],
+)
+
+
+@contextmanager
+def measure_stage(stage: str, engine: str, lang: str):
+
+    """Observes duration of stage. Failed stages are counted too"""
+
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage, engine, lang).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.labels(stage, engine, lang).observe(elapsed)
+
+########################################
+# Fair scheduling
+########################################
+
+# Tenant is pool, project or user, depending on settings.
+# Series of idle tenants stay at zero
+
+TENANT_QUEUE_DEPTH = Gauge(
+    "crash_analyzer_tenant_queue_depth",
+    "Messages of tenant waiting for processing slot",
+    ["tenant"],
+)
+
+TENANT_IN_FLIGHT = Gauge(
+    "crash_analyzer_tenant_in_flight",
+    "Messages of tenant being processed",
+    ["tenant"],
+)
+
+TENANT_WAIT_TIME = Histogram(
+    "crash_analyzer_tenant_wait_seconds",
+    "Time message of tenant waited for processing slot",
+    ["tenant"],
+    buckets=STAGE_BUCKETS,
+)
+
+########################################
+# Event loop
+########################################
+
+LOOP_LAG = Gauge(
+    "crash_analyzer_event_loop_lag_seconds",
+    "Last measured delay of event loop in waking up sleeping coroutine",
+)
+
+LOOP_LAG_DISTRIBUTION = Histogram(
+    "crash_analyzer_event_loop_lag_distribution_seconds",
+    "Delay of event loop in waking up sleeping coroutine",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+SLOW_CALLBACKS = Counter(
+    "crash_analyzer_slow_callbacks",
+    "Callbacks which have blocked event loop longer than threshold",
+)
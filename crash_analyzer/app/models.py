@@ -69,7 +69,10 @@ class CrashBase(BaseModel):
     input: Optional[str]
     """ Crash input (base64-encoded). Used if crash file is not too large """
 
-    output: str
+    output_id: Optional[str]
+    """ Id (key) of uploaded to object storage crash output. Used if output is too large """
+
+    output: Optional[str]
     """ Crash output (long multiline text) """
 
     reproduced: bool
@@ -87,6 +90,18 @@ class CrashBase(BaseModel):
 
         raise ValueError("input_id or input must be set")
 
+    @root_validator
+    def output_id_or_output(cls, data: dict):
+
+        if isinstance(data.get("output_id"), str):
+            if len(data["output_id"]) > 0:
+                return data
+
+        if isinstance(data.get("output"), str):
+            return data
+
+        raise ValueError("output_id or output must be set")
+
 
 class LibfuzzerCrash(CrashBase):
     pass
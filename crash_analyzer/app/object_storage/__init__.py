@@ -1,5 +1,5 @@
 from .instance import s3_init
-from .abstract import IObjectStorage
+from .abstract import IObjectStorage, ObjectHead, ObjectInfo
 from .errors import (
     ObjectStorageError,
     ObjectNotFoundError,
@@ -10,6 +10,8 @@ from .errors import (
 __all__ = [
     "s3_init",
     "IObjectStorage",
+    "ObjectHead",
+    "ObjectInfo",
     "ObjectStorageError",
     "ObjectNotFoundError",
     "ObjectStorageError",
@@ -1,7 +1,26 @@
 from __future__ import annotations
 
 from abc import abstractmethod, ABCMeta
-from typing import BinaryIO, Optional
+from typing import BinaryIO, NamedTuple, Optional
+
+
+class ObjectInfo(NamedTuple):
+
+    """Object metadata got without downloading it"""
+
+    size: int
+    etag: str
+
+    sha256: Optional[str]
+    """ Hex SHA-256 of object, if uploader has stored it """
+
+
+class ObjectHead(NamedTuple):
+
+    """First bytes of object got along with its metadata"""
+
+    data: bytes
+    info: ObjectInfo
 
 
 class IStreamingDownload(metaclass=ABCMeta):
@@ -16,6 +35,15 @@ class IStreamingDownload(metaclass=ABCMeta):
     async def __anext__(self) -> bytes:
         pass
 
+    @abstractmethod
+    async def readinto(self, buffer: bytearray) -> int:
+
+        """
+        Reads next chunk of file into preallocated buffer
+        (bytearray or writable memoryview), so it can be reused
+        between reads. Returns number of bytes read, 0 at end of file
+        """
+
 
 class IObjectStorage(metaclass=ABCMeta):
 
@@ -72,6 +100,21 @@ class IObjectStorage(metaclass=ABCMeta):
     ) -> IStreamingDownload:
         pass
 
+    @abstractmethod
+    async def download_crash_head(
+        self, fuzzer_id: str, fuzzer_rev: str, crash_id: str, size: int
+    ) -> ObjectHead:
+
+        """Downloads only first `size` bytes of crash input
+        together with its size and checksum, if it's stored"""
+
+    @abstractmethod
+    async def download_crash_output(
+        self, fuzzer_id: str, fuzzer_rev: str, output_id: str
+    ) -> IStreamingDownload:
+
+        """Downloads crash output, which was too large to send in message"""
+
     @abstractmethod
     async def close(self) -> None:
         pass
@@ -0,0 +1,330 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, BinaryIO, NamedTuple, Optional
+
+from hashlib import sha256
+import contextlib
+import tempfile
+import asyncio
+import logging
+import json
+import time
+import os
+
+from crash_analyzer.app.metrics import INPUT_CACHE_EVICTED_BYTES
+from .abstract import IStreamingDownload
+
+if TYPE_CHECKING:
+    from crash_analyzer.app.settings import InputCacheSettings
+
+# Temporary files older than this were left by crashed writers
+STALE_TMP_AGE = 3600
+
+# Eviction frees space down to this share of budget
+LOW_WATERMARK = 0.9
+
+
+class CachedObject(NamedTuple):
+    etag: str
+    file: BinaryIO
+    size: int
+
+
+class DiskCache:
+
+    """
+    Content-addressed cache of objects on local disk.
+    Content is stored once in 'blobs/<sha256 of content>' and referenced
+    by 'keys/<sha256 of bucket/key>' files, which also hold object ETag.
+    Files are written to 'tmp' and renamed, so several worker processes
+    can share the directory. Least recently used files are removed
+    when cache grows over its byte budget.
+    Methods do blocking disk IO: call them outside of event loop.
+    """
+
+    _max_bytes: int
+    _blobs_dir: str
+    _keys_dir: str
+    _tmp_dir: str
+    _size: int
+
+    def __init__(self, settings: InputCacheSettings):
+
+        self._max_bytes = settings.max_bytes
+        self._blobs_dir = os.path.join(settings.path, "blobs")
+        self._keys_dir = os.path.join(settings.path, "keys")
+        self._tmp_dir = os.path.join(settings.path, "tmp")
+        self._logger = logging.getLogger("s3.cache")
+
+        for directory in [self._blobs_dir, self._keys_dir, self._tmp_dir]:
+            os.makedirs(directory, exist_ok=True)
+
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Estimated size of cache. Other processes may have changed it"""
+        return self._size
+
+    def _key_path(self, bucket: str, key: str):
+        name = sha256(f"{bucket}/{key}".encode()).hexdigest()
+        return os.path.join(self._keys_dir, name)
+
+    def open(self, bucket: str, key: str) -> Optional[CachedObject]:
+
+        """Opens cached object. File stays readable even if evicted later"""
+
+        key_path = self._key_path(bucket, key)
+
+        try:
+            with open(key_path, "rb") as f:
+                ref = json.load(f)
+            file = open(os.path.join(self._blobs_dir, ref["blob"]), "rb")
+        except (OSError, ValueError, KeyError):
+            return None
+
+        now = time.time()
+        for path in [key_path, file.name]:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+        return CachedObject(ref["etag"], file, os.fstat(file.fileno()).st_size)
+
+    def writer(self, bucket: str, key: str, etag: str) -> CacheWriter:
+        return CacheWriter(self, bucket, key, etag)
+
+    def _write_atomic(self, path: str, data: bytes):
+
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+    def _commit(self, tmp_path: str, digest: str, size: int, key_path: str, etag: str):
+
+        blob_path = os.path.join(self._blobs_dir, digest)
+
+        # Same content may have been cached under another key
+        if os.path.exists(blob_path):
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, blob_path)
+            self._size += size
+
+        ref = json.dumps({"etag": etag, "blob": digest}).encode()
+        self._write_atomic(key_path, ref)
+        self._size += len(ref)
+
+        if self._size > self._max_bytes:
+            self.evict()
+
+    def evict(self):
+
+        """Removes least recently used files if cache is over budget"""
+
+        now = time.time()
+        files = []
+        total = 0
+
+        for entry in os.scandir(self._tmp_dir):
+            try:
+                if now - entry.stat().st_mtime > STALE_TMP_AGE:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+        for directory in [self._blobs_dir, self._keys_dir]:
+            for entry in os.scandir(directory):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        evicted = 0
+        if total > self._max_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self._max_bytes * LOW_WATERMARK:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += size
+
+            self._logger.info("Evicted %d bytes from input cache", evicted)
+            INPUT_CACHE_EVICTED_BYTES.inc(evicted)
+
+        self._size = total
+
+
+class CacheWriter:
+
+    """Writes object to cache chunk by chunk. Object
+    becomes visible to readers only when committed"""
+
+    def __init__(self, cache: DiskCache, bucket: str, key: str, etag: str):
+
+        self._cache = cache
+        self._key_path = cache._key_path(bucket, key)
+        self._etag = etag
+        self._sha256 = sha256()
+        self._size = 0
+
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache._tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+
+    def commit(self):
+        self._file.close()
+        digest = self._sha256.hexdigest()
+        self._cache._commit(self._tmp_path, digest, self._size, self._key_path, self._etag)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class FileDownload(IStreamingDownload):
+
+    """Streams object from cache file. Reads leave event
+    loop, as cache directory may be on slow or busy disk"""
+
+    _file: BinaryIO
+    _chunk_size: int
+
+    def __init__(self, file: BinaryIO, chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+
+    def __aiter__(self) -> IStreamingDownload:
+        return self
+
+    async def __anext__(self) -> bytes:
+
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(None, self._file.read, self._chunk_size)
+
+        if not data:
+            self._file.close()
+            raise StopAsyncIteration()
+
+        return data
+
+    async def readinto(self, buffer: bytearray) -> int:
+
+        loop = asyncio.get_event_loop()
+        size = await loop.run_in_executor(None, self._file.readinto, buffer)
+
+        if size == 0:
+            self._file.close()
+
+        return size
+
+
+class CachingDownload(IStreamingDownload):
+
+    """
+    Passes object from storage through, writing it to cache.
+    Object is cached only if it has been read till the end.
+    Cache errors (e.g. full disk) don't interrupt download.
+    Writes and commit, which may evict, leave event loop
+    """
+
+    _stream: IStreamingDownload
+    _writer: Optional[CacheWriter]
+
+    def __init__(self, stream: IStreamingDownload, writer: CacheWriter):
+        self._stream = stream
+        self._writer = writer
+        self._logger = logging.getLogger("s3.cache")
+
+    def __del__(self):
+        self._abort()
+
+    async def _write(self, chunk: bytes):
+
+        writer = self._writer
+        if writer is None:
+            return
+
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, writer.write, chunk)
+        except OSError as e:
+            self._logger.warning("Failed to write input cache: %s", e)
+            self._abort()
+        except BaseException:
+            self._abort()
+            raise
+
+    async def _commit(self):
+
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, writer.commit)
+        except OSError as e:
+            self._logger.warning("Failed to write input cache: %s", e)
+
+    def _abort(self):
+
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+
+        try:
+            writer.abort()
+        except OSError as e:
+            self._logger.warning("Failed to write input cache: %s", e)
+
+    def __aiter__(self) -> IStreamingDownload:
+        return self
+
+    async def __anext__(self) -> bytes:
+
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            await self._commit()
+            raise
+        except BaseException:
+            self._abort()
+            raise
+
+        await self._write(chunk)
+        return chunk
+
+    async def readinto(self, buffer: bytearray) -> int:
+
+        try:
+            size = await self._stream.readinto(buffer)
+        except BaseException:
+            self._abort()
+            raise
+
+        if size == 0:
+            await self._commit()
+        else:
+            await self._write(memoryview(buffer)[:size])
+
+        return size
@@ -55,6 +55,12 @@ class BucketData:
             self._get_data(fuzzer_id, fuzzer_rev, "crashes", input_id),
         )
 
+    def crash_output(self, fuzzer_id, fuzzer_rev, output_id):
+        return (
+            self.name,
+            self._get_data(fuzzer_id, fuzzer_rev, "outputs", output_id),
+        )
+
     def logs_grouped_daily(self, fuzzer_id, fuzzer_rev, date, ext=".tar.gz"):
         return (
             self.name,
@@ -3,9 +3,20 @@ from contextlib import AsyncExitStack
 from asyncio import CancelledError
 from typing import BinaryIO, Union
 from io import BytesIO
+import asyncio
 import logging
-
-from .abstract import IObjectStorage, IStreamingDownload
+import re
+
+from botocore.exceptions import ClientError
+
+from crash_analyzer.app.metrics import (
+    INPUT_CACHE_BYTES_SAVED,
+    INPUT_CACHE_HITS,
+    INPUT_CACHE_MISSES,
+)
+from crash_analyzer.app.settings import S3ChunkSizes
+from .abstract import IObjectStorage, IStreamingDownload, ObjectHead, ObjectInfo
+from .disk_cache import CachingDownload, DiskCache, FileDownload
 from .initializer import ObjectStorageInitializer
 from .paths import BucketFuzzers, BucketData
 
@@ -46,19 +57,59 @@ class UploadLimitTracker:
         return self._total > self._limit
 
 
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+def stored_sha256(head: dict) -> Optional[str]:
+
+    """
+    Extracts SHA-256 of object from response of HEAD or GET request.
+    Uploader puts it in user metadata ('x-amz-meta-sha256', hex).
+    Checksums computed by storage are not requested: pinned
+    botocore does not support 'ChecksumMode' parameter
+    """
+
+    sha256 = head.get("Metadata", {}).get("sha256", "").lower()
+    if _SHA256_HEX.fullmatch(sha256):
+        return sha256
+
+    return None
+
+
+def is_not_modified(e: ClientError):
+    return e.response["ResponseMetadata"]["HTTPStatusCode"] == 304
+
+
+def is_range_not_satisfiable(e: ClientError):
+    return e.response["ResponseMetadata"]["HTTPStatusCode"] == 416
+
+
+def object_size(obj: dict) -> int:
+
+    """Size of whole object from response to ranged GET request"""
+
+    # Content-Range: bytes 0-15/12345
+    _, _, total = obj.get("ContentRange", "").rpartition("/")
+    if total.isdigit():
+        return int(total)
+
+    return obj["ContentLength"]
+
+
 class StreamingDownload(IStreamingDownload):
 
-    _chunk_size: int = 4096
+    _chunk_size: int
     _stack: AsyncExitStack
     _stream: BinaryIO
 
-    def __init__(self):
+    def __init__(self, chunk_size: int):
+        self._chunk_size = chunk_size
         self._stack = AsyncExitStack()
         self._stream = None
 
     @staticmethod
-    async def create(s3_object):
-        _self = StreamingDownload()
+    async def create(s3_object, chunk_size: int):
+        _self = StreamingDownload(chunk_size)
         await _self._init(s3_object)
         return _self
 
@@ -78,6 +129,18 @@ class StreamingDownload(IStreamingDownload):
 
         return data
 
+    async def readinto(self, buffer: bytearray) -> int:
+
+        view = memoryview(buffer)
+        data: bytes = await self._stream.read(len(view))
+
+        if not data:
+            await self._stack.aclose()
+            return 0
+
+        view[: len(data)] = data
+        return len(data)
+
 
 class ObjectStorage(IObjectStorage):
 
@@ -89,6 +152,8 @@ class ObjectStorage(IObjectStorage):
 
     _bucket_fuzzers: BucketFuzzers
     _bucket_data: BucketData
+    _chunk_sizes: S3ChunkSizes
+    _input_cache: Optional[DiskCache]
 
     async def _init(self, settings):
 
@@ -104,8 +169,15 @@ class ObjectStorage(IObjectStorage):
         self._context_stack = initializer.context_stack
         self._bucket_fuzzers = initializer.bucket_fuzzers
         self._bucket_data = initializer.bucket_data
+        self._chunk_sizes = settings.object_storage.chunk_sizes
+        self._input_cache = None
         self._is_closed = False
 
+        if settings.input_cache.max_bytes > 0:
+            self._input_cache = DiskCache(settings.input_cache)
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._input_cache.evict)
+
     @staticmethod
     async def create(settings):
         _self = ObjectStorage()
@@ -160,9 +232,92 @@ class ObjectStorage(IObjectStorage):
         self,
         bucket_name: str,
         object_key: str,
+        chunk_size: int,
     ):
         obj = await self._client.get_object(Bucket=bucket_name, Key=object_key)
-        return await StreamingDownload.create(obj)
+        return await StreamingDownload.create(obj, chunk_size)
+
+    @maybe_unknown_error
+    @maybe_not_found
+    async def _download_cached(
+        self,
+        bucket_name: str,
+        object_key: str,
+        chunk_size: int,
+    ):
+        conditions = {}
+        loop = asyncio.get_event_loop()
+        cached = await loop.run_in_executor(
+            None, self._input_cache.open, bucket_name, object_key
+        )
+        if cached is not None:
+            conditions["IfNoneMatch"] = cached.etag
+
+        try:
+            obj = await self._client.get_object(
+                Bucket=bucket_name,
+                Key=object_key,
+                **conditions,
+            )
+        except BaseException as e:
+            if cached is not None:
+                if isinstance(e, ClientError) and is_not_modified(e):
+                    INPUT_CACHE_HITS.inc()
+                    INPUT_CACHE_BYTES_SAVED.inc(cached.size)
+                    return FileDownload(cached.file, chunk_size)
+                cached.file.close()
+            raise
+
+        if cached is not None:
+            cached.file.close()
+
+        INPUT_CACHE_MISSES.inc()
+        stream = await StreamingDownload.create(obj, chunk_size)
+        writer = self._input_cache.writer(bucket_name, object_key, obj["ETag"])
+        return CachingDownload(stream, writer)
+
+    @maybe_unknown_error
+    @maybe_not_found
+    async def _get_info(self, bucket_name: str, object_key: str):
+        head = await self._client.head_object(
+            Bucket=bucket_name,
+            Key=object_key,
+        )
+        return ObjectInfo(
+            size=head["ContentLength"],
+            etag=head["ETag"],
+            sha256=stored_sha256(head),
+        )
+
+    @maybe_unknown_error
+    @maybe_not_found
+    async def _download_range(
+        self,
+        bucket_name: str,
+        object_key: str,
+        size: int,
+    ):
+        try:
+            obj = await self._client.get_object(
+                Bucket=bucket_name,
+                Key=object_key,
+                Range=f"bytes=0-{size - 1}",
+            )
+        except ClientError as e:
+            # Empty object has no range to return
+            if not is_range_not_satisfiable(e):
+                raise
+            return ObjectHead(b"", await self._get_info(bucket_name, object_key))
+
+        async with obj["Body"] as stream:
+            data = await stream.read()
+
+        info = ObjectInfo(
+            size=object_size(obj),
+            etag=obj["ETag"],
+            sha256=stored_sha256(obj),
+        )
+        return ObjectHead(data, info)
 
     @maybe_unknown_error
     @maybe_not_found
@@ -172,7 +327,8 @@ class ObjectStorage(IObjectStorage):
         object_key: str,
     ):
         stream = BytesIO()
-        downloader = await self._download_file(bucket_name, object_key)
+        chunk_size = self._chunk_sizes.configs
+        downloader = await self._download_file(bucket_name, object_key, chunk_size)
 
         async for chunk in downloader:
             stream.write(chunk)
@@ -204,7 +360,7 @@ class ObjectStorage(IObjectStorage):
 
     async def download_fuzzer_binaries(self, fuzzer_id: str, fuzzer_rev: str):
         bucket, key = self._bucket_fuzzers.binaries(fuzzer_id, fuzzer_rev)
-        return await self._download_file(bucket, key)
+        return await self._download_file(bucket, key, self._chunk_sizes.binaries)
 
     async def upload_fuzzer_seeds(
         self,
@@ -218,10 +374,27 @@ class ObjectStorage(IObjectStorage):
 
     async def download_fuzzer_seeds(self, fuzzer_id: str, fuzzer_rev: str):
         bucket, key = self._bucket_fuzzers.seeds(fuzzer_id, fuzzer_rev)
-        return await self._download_file(bucket, key)
+        return await self._download_file(bucket, key, self._chunk_sizes.seeds)
 
     async def download_crash(
         self, fuzzer_id: str, fuzzer_rev: str, crash_id: str
     ) -> IStreamingDownload:
         bucket, key = self._bucket_data.crash(fuzzer_id, fuzzer_rev, crash_id)
-        return await self._download_file(bucket, key)
+        chunk_size = self._chunk_sizes.crashes
+
+        if self._input_cache is None:
+            return await self._download_file(bucket, key, chunk_size)
+
+        return await self._download_cached(bucket, key, chunk_size)
+
+    async def download_crash_head(
+        self, fuzzer_id: str, fuzzer_rev: str, crash_id: str, size: int
+    ) -> ObjectHead:
+        bucket, key = self._bucket_data.crash(fuzzer_id, fuzzer_rev, crash_id)
+        return await self._download_range(bucket, key, size)
+
+    async def download_crash_output(
+        self, fuzzer_id: str, fuzzer_rev: str, output_id: str
+    ) -> IStreamingDownload:
+        bucket, key = self._bucket_data.crash_output(fuzzer_id, fuzzer_rev, output_id)
+        return await self._download_file(bucket, key, self._chunk_sizes.outputs)
@@ -0,0 +1,233 @@
+"""
+On-demand profiling of running service. Routes are registered
+by `configure_web_server` only outside of production environment
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+
+from collections import Counter
+from io import StringIO
+import tracemalloc
+import threading
+import cProfile
+import logging
+import asyncio
+import marshal
+import pstats
+import sys
+
+from aiohttp import web
+
+MAX_DURATION = 600
+SAMPLING_INTERVAL = 0.005
+TRACEMALLOC_FRAMES = 25
+
+
+class ProfilingError(Exception):
+    pass
+
+
+class CProfileSession:
+
+    """Deterministic profiling of event loop thread"""
+
+    formats = ["pstats", "text"]
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def result(self, format: str) -> bytes:
+
+        stats = pstats.Stats(self._profile)
+        if format == "pstats":
+            return marshal.dumps(stats.stats)
+
+        stream = StringIO()
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(100)
+        return stream.getvalue().encode()
+
+
+class SamplingSession:
+
+    """Statistical profiling: stack of event loop thread is sampled
+    by another thread. Result is in collapsed stacks format of flamegraph"""
+
+    formats = ["collapsed"]
+
+    _stacks: Dict[str, int]
+
+    def __init__(self):
+        self._stacks = Counter()
+        self._target = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample,
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _sample(self):
+
+        while not self._stopped.wait(SAMPLING_INTERVAL):
+            frame = sys._current_frames().get(self._target)
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+
+            self._stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def result(self, format: str) -> bytes:
+        lines = [f"{stack} {count}" for stack, count in self._stacks.items()]
+        return "\n".join(lines).encode()
+
+
+class Profiler:
+
+    """Runs one time bounded profiling session at a time"""
+
+    sessions = {
+        "cprofile": CProfileSession,
+        "sampling": SamplingSession,
+    }
+
+    def __init__(self):
+        self._session = None
+        self._running = False
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._logger = logging.getLogger("profiler")
+
+    def start(self, mode: str, duration: float):
+
+        if self._running:
+            raise ProfilingError("Profiling session is already running")
+
+        if mode not in self.sessions:
+            raise ProfilingError(f"Unknown mode '{mode}'. Use one of {list(self.sessions)}")
+
+        if not 0 < duration <= MAX_DURATION:
+            raise ProfilingError(f"Duration must be in range (0, {MAX_DURATION}]")
+
+        self._session = self.sessions[mode]()
+        self._running = True
+
+        loop = asyncio.get_event_loop()
+        self._timer = loop.call_later(duration, self.stop)
+        self._logger.warning("Started %s profiling for %ss", mode, duration)
+
+    def stop(self):
+
+        if not self._running:
+            raise ProfilingError("Profiling session is not running")
+
+        self._timer.cancel()
+        self._session.stop()
+        self._running = False
+        self._logger.warning("Stopped profiling")
+
+    def result(self, format: str) -> bytes:
+
+        if self._session is None:
+            raise ProfilingError("No profiling session has been run")
+
+        if self._running:
+            raise ProfilingError("Profiling session is still running")
+
+        if format not in self._session.formats:
+            raise ProfilingError(f"Unknown format '{format}'. Use one of {self._session.formats}")
+
+        return self._session.result(format)
+
+
+class MemoryTracer:
+
+    """Reports memory allocated since previous snapshot"""
+
+    def __init__(self):
+        self._snapshot = None
+
+    def snapshot(self, limit: int) -> str:
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._snapshot = tracemalloc.take_snapshot()
+            return "Started tracing memory allocations. Take snapshot again to see diff\n"
+
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(self._snapshot, "lineno")
+        self._snapshot = snapshot
+
+        lines = [str(stat) for stat in stats[:limit]]
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        tracemalloc.stop()
+        self._snapshot = None
+
+
+def admin_routes() -> List[web.RouteDef]:
+
+    profiler = Profiler()
+    tracer = MemoryTracer()
+
+    async def profile_start(request: web.Request):
+        mode = request.query.get("mode", "sampling")
+        try:
+            duration = float(request.query.get("duration", 30))
+            profiler.start(mode, duration)
+        except (ProfilingError, ValueError) as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        return web.Response(text=f"Started {mode} profiling for {duration}s\n")
+
+    async def profile_stop(request: web.Request):
+        try:
+            profiler.stop()
+        except ProfilingError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        return web.Response(text="Stopped profiling\n")
+
+    async def profile_result(request: web.Request):
+        format = request.query.get("format", "collapsed")
+        try:
+            body = profiler.result(format)
+        except ProfilingError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        filename = f"profile.{format}"
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+        return web.Response(body=body, headers=headers)
+
+    async def tracemalloc_snapshot(request: web.Request):
+        try:
+            limit = int(request.query.get("limit", 50))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+        return web.Response(text=tracer.snapshot(limit))
+
+    async def tracemalloc_stop(request: web.Request):
+        tracer.stop()
+        return web.Response(text="Stopped tracing memory allocations\n")
+
+    return [
+        web.post("/admin/profile/start", profile_start),
+        web.post("/admin/profile/stop", profile_stop),
+        web.get("/admin/profile/result", profile_result),
+        web.post("/admin/tracemalloc/snapshot", tracemalloc_snapshot),
+        web.post("/admin/tracemalloc/stop", tracemalloc_stop),
+    ]
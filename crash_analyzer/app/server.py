@@ -4,7 +4,13 @@ from mqtransport import MQApp
 
 from .database.instance import db_init
 from .object_storage.instance import s3_init
+from .executor.instance import executor_init
 from .message_queue.instance import MQAppState, mq_init
+from .message_queue.coalescing import DuplicateCoalescer
+from .message_queue.scheduling import FairScheduler
+from .agents.memo import ParseMemo
+from .loop_monitor import LoopMonitor
+from .profiling import admin_routes
 
 from aiohttp import web
 from .settings import AppSettings
@@ -13,7 +19,7 @@ import prometheus_client
 import logging
 
 
-def configure_web_server():
+def configure_web_server(settings: AppSettings):
 
     logger = logging.getLogger("main")
     logger.info("Configuring web server...")
@@ -39,6 +45,11 @@ def configure_web_server():
         web.get("/metrics", metrics),
     ]
 
+    # Profiling routes must never be exposed in production
+    if settings.environment.name != "prod":
+        logger.warning("Admin routes enabled in '%s' environment", settings.environment.name)
+        routes.extend(admin_routes())
+
     app = web.Application()
     app.add_routes(routes)
 
@@ -48,16 +59,26 @@ def configure_web_server():
 
 def run(settings: AppSettings):
 
-    app = configure_web_server()
+    app = configure_web_server(settings)
     logger = logging.getLogger("main")
 
     async def server_init(app):
+        logger.info("Starting event loop monitor...")
+        app["loop_monitor"] = LoopMonitor(settings.loop_monitor)
+        app["loop_monitor"].start()
+        logger.info("Starting event loop monitor... OK")
+
         logger.info("Configuring message queue...")
         mq_app: MQApp = await mq_init(settings)
         logger.info("Configuring message queue... OK")
 
         state: MQAppState = mq_app.state
         state.settings = settings
+        state.duplicates = DuplicateCoalescer(
+            state.producers.duplicated_crash,
+            settings.crash_analyzer.duplicate_window_ms / 1000,
+        )
+        state.scheduler = FairScheduler(settings.fair_scheduler)
 
         logger.info("Configuring database...")
         state.db = await db_init(settings)
@@ -67,6 +88,12 @@ def run(settings: AppSettings):
         state.s3 = await s3_init(settings)
         logger.info("Configuring object storage... OK")        
 
+        logger.info("Configuring executor...")
+        state.executor = await executor_init(settings)
+        logger.info("Configuring executor... OK")
+
+        state.parse_memo = ParseMemo(settings.parse_memo)
+
         await mq_app.start()
         app["mq"] = mq_app
 
@@ -78,11 +105,28 @@ def run(settings: AppSettings):
         await state.s3.close()
         logger.info("Closing object storage... OK")
 
+        # Must be sent before producers are stopped
+        logger.info("Sending pending duplicates...")
+        await state.duplicates.flush()
+        logger.info("Sending pending duplicates... OK")
+
         logger.info("Closing message queue...")
         timeout = settings.environment.shutdown_timeout
         await mq_app.shutdown(timeout)
         logger.info("Closing message queue... OK")
 
+        logger.info("Closing executor...")
+        await state.executor.close()
+        logger.info("Closing executor... OK")
+
+        # Crashes are no longer found: write the buffered ones
+        try:
+            logger.info("Writing buffered crashes...")
+            await state.db.flush()
+            logger.info("Writing buffered crashes... OK")
+        except Exception:
+            logger.exception("Writing buffered crashes... FAILED")
+
         logger.info("Saving MQ unsent messages...")
         messages = mq_app.export_unsent_messages()
         await state.db.unsent_mq.save_unsent_messages(messages)
@@ -92,6 +136,10 @@ def run(settings: AppSettings):
         await state.db.close()
         logger.info("Closing database... OK")
 
+        logger.info("Stopping event loop monitor...")
+        await app["loop_monitor"].stop()
+        logger.info("Stopping event loop monitor... OK")
+
     app.on_startup.append(server_init)
     app.on_shutdown.append(server_exit)
 
@@ -58,6 +58,10 @@ class DatabaseSettings(BaseSettings):
     password: str
     name: str
 
+    # Drifted indexes fail startup unless rebuild is allowed explicitly:
+    # rebuilding index on large collection takes a long time
+    rebuild_drifted_indexes: bool = False
+
     class Config:
         env_prefix = "DB_"
 
@@ -101,11 +105,110 @@ class ServerSettings(BaseSettings):
 class CrashAnalyzerSettings(BaseSettings):
 
     preview_max_size: int
+    batch_size: int = Field(gt=0)
+    batch_linger_ms: int = Field(ge=0)
+    max_in_flight: int = Field(gt=0)
+    duplicate_window_ms: int = Field(ge=0)
 
     class Config:
         env_prefix = "CRASH_ANALYZER_"
 
 
+class FairSchedulerSettings(BaseSettings):
+
+    tenant: str = Field(regex=r"^(pool|project|user)$")
+    max_in_flight: int = Field(gt=0)
+    tenant_max_in_flight: int = Field(gt=0)
+    default_weight: float = Field(gt=0)
+    weights: Dict[str, float]
+    tenant_idle_ttl: float = Field(ge=0)
+
+    @root_validator(skip_on_failure=True)
+    def check_weights(cls, data: Dict[str, Any]):
+        for name, weight in data["weights"].items():
+            if weight <= 0:
+                raise ValueError(f"Weight of tenant '{name}' must be positive")
+        return data
+
+    class Config:
+        env_prefix = "FAIR_SCHEDULER_"
+
+
+class ExecutorSettings(BaseSettings):
+
+    mode: str = Field(regex=r"^(process|thread|sync)$")
+    workers: int = Field(gt=0)
+    max_pending: int = Field(gt=0)
+    max_tasks_per_worker: int = Field(ge=0)
+    timeout_ms: int = Field(gt=0)
+
+    class Config:
+        env_prefix = "EXECUTOR_"
+
+
+class DedupCacheSettings(BaseSettings):
+
+    max_entries: int = Field(ge=0)
+    max_bytes: int = Field(gt=0)
+    ttl: float = Field(ge=0)
+
+    class Config:
+        env_prefix = "DEDUP_CACHE_"
+
+
+class InputIndexSettings(BaseSettings):
+
+    # Index is kept in memory of each process only
+    enabled: bool
+    max_entries: int = Field(gt=0)
+
+    class Config:
+        env_prefix = "INPUT_INDEX_"
+
+
+class ParseMemoSettings(BaseSettings):
+
+    max_entries: int = Field(ge=0)
+    max_bytes: int = Field(gt=0)
+
+    class Config:
+        env_prefix = "PARSE_MEMO_"
+
+
+class WriteBehindSettings(BaseSettings):
+
+    # Buffered crash is not visible to other replicas, so each of
+    # them may report the same crash as unique. Keep it disabled
+    # unless service runs as a single replica.
+    # Message is acknowledged before its crash is written: crashes
+    # buffered when process is killed are lost (at most once). Up to
+    # `max_pending` crashes or `linger_ms` of them may be lost
+    enabled: bool
+    max_pending: int = Field(ge=0)
+    linger_ms: int = Field(gt=0)
+
+    class Config:
+        env_prefix = "WRITE_BEHIND_"
+
+
+class InputCacheSettings(BaseSettings):
+
+    path: str
+    max_bytes: int = Field(ge=0)
+
+    class Config:
+        env_prefix = "INPUT_CACHE_"
+
+
+class LoopMonitorSettings(BaseSettings):
+
+    interval_ms: int = Field(gt=0)
+    slow_callback_ms: int = Field(ge=0)
+
+    class Config:
+        env_prefix = "LOOP_MONITOR_"
+
+
 class S3Buckets(BaseSettings):
     fuzzers: str
     data: str
@@ -114,10 +217,22 @@ class S3Buckets(BaseSettings):
         env_prefix = "S3_BUCKET_"
 
 
+class S3ChunkSizes(BaseSettings):
+    crashes: int = Field(gt=0)
+    outputs: int = Field(gt=0)
+    binaries: int = Field(gt=0)
+    seeds: int = Field(gt=0)
+    configs: int = Field(gt=0)
+
+    class Config:
+        env_prefix = "S3_CHUNK_SIZE_"
+
+
 class ObjectStorageSettings(BaseSettings):
 
     url: AnyHttpUrl
     buckets: S3Buckets
+    chunk_sizes: S3ChunkSizes
     access_key: str
     secret_key: str
 
@@ -133,6 +248,14 @@ class AppSettings(BaseModel):
     database: DatabaseSettings
     server: ServerSettings
     crash_analyzer: CrashAnalyzerSettings
+    fair_scheduler: FairSchedulerSettings
+    executor: ExecutorSettings
+    dedup_cache: DedupCacheSettings
+    input_index: InputIndexSettings
+    parse_memo: ParseMemoSettings
+    write_behind: WriteBehindSettings
+    input_cache: InputCacheSettings
+    loop_monitor: LoopMonitorSettings
 
 
 _app_settings = None
@@ -146,11 +269,22 @@ def get_app_settings() -> AppSettings:
         _app_settings = AppSettings(
         database=DatabaseSettings(),
         collections=CollectionSettings(),
-        object_storage=ObjectStorageSettings(buckets=S3Buckets()),
+        object_storage=ObjectStorageSettings(
+            buckets=S3Buckets(),
+            chunk_sizes=S3ChunkSizes(),
+        ),
         message_queue=MessageQueueSettings(queues=MessageQueues()),
         environment=EnvironmentSettings(),
         server=ServerSettings(),
         crash_analyzer=CrashAnalyzerSettings(),
+        fair_scheduler=FairSchedulerSettings(),
+        executor=ExecutorSettings(),
+        dedup_cache=DedupCacheSettings(),
+        input_index=InputIndexSettings(),
+        parse_memo=ParseMemoSettings(),
+        write_behind=WriteBehindSettings(),
+        input_cache=InputCacheSettings(),
+        loop_monitor=LoopMonitorSettings(),
     )
 
     return _app_settings
@@ -0,0 +1,110 @@
+"""
+Compares lookup of a batch of crashes by single `get_many_by_hash`
+query with `get_by_hash` per crash: sequential and concurrent.
+Half of looked up crashes exist. Needs local docker-compose stack.
+Collections are truncated!
+
+Usage: python -m crash_analyzer.tests.benchmarks.bench_batch_lookup
+"""
+
+import asyncio
+import random
+import time
+
+from crash_analyzer.app.database.instance import db_init
+from crash_analyzer.app.settings import get_app_settings
+
+BATCH_SIZES = [1, 10, 50, 100, 250, 500]
+COLLECTION_SIZE = 100000
+ROUNDS = 20
+FUZZERS = 20
+REVISIONS = 5
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def hash_key(i: int):
+    return f"fuzzer-{i % FUZZERS}", f"rev-{i % REVISIONS}", f"hash-{i}"
+
+
+async def fill(db):
+    col = db._db[get_app_settings().collections.crashes]
+    docs = []
+    for i in range(COLLECTION_SIZE):
+        fuzzer_id, fuzzer_rev, unique_hash = hash_key(i)
+        docs.append(
+            {
+                "fuzzer_id": fuzzer_id,
+                "fuzzer_rev": fuzzer_rev,
+                "input_hash": f"input-{i}",
+                "unique_hash": unique_hash,
+            }
+        )
+    for i in range(0, len(docs), 5000):
+        await col.insert_many(docs[i : i + 5000])
+
+
+def make_batch(size: int):
+    # Keys beyond collection size are not found
+    return [hash_key(random.randrange(2 * COLLECTION_SIZE)) for _ in range(size)]
+
+
+async def measure(db, size: int):
+
+    samples = {"many": [], "sequential": [], "concurrent": []}
+
+    for _ in range(ROUNDS):
+        batch = make_batch(size)
+
+        started = time.perf_counter()
+        found = await db.crashes.get_many_by_hash(batch)
+        samples["many"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for key in batch:
+            await db.crashes.get_by_hash(*key)
+        samples["sequential"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[db.crashes.get_by_hash(*key) for key in batch])
+        samples["concurrent"].append(time.perf_counter() - started)
+
+        assert len(found) == len({r.key for r in results if r is not None})
+
+    return samples
+
+
+async def main():
+
+    settings = get_app_settings()
+
+    # Measure database, not caches in front of it
+    settings.dedup_cache.max_entries = 0
+    settings.write_behind.max_pending = 0
+
+    db = await db_init(settings)
+    await db.truncate_all_collections()
+
+    print(f"{'batch':>6} {'get_many_by_hash':>18} {'sequential':>18} {'concurrent':>18}  (p50/p99, ms)")
+
+    try:
+        await fill(db)
+        for size in BATCH_SIZES:
+            samples = await measure(db, size)
+            print(
+                f"{size:>6}"
+                + "".join(
+                    f" {percentile(s, 0.5) * 1000:>8.2f}/{percentile(s, 0.99) * 1000:<9.2f}"
+                    for s in samples.values()
+                )
+            )
+    finally:
+        await db.truncate_all_collections()
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
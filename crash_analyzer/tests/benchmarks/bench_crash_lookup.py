@@ -0,0 +1,109 @@
+"""
+Measures crash lookup latency against collection size
+with and without managed indexes. Needs local docker-compose stack.
+Collections are truncated!
+
+Usage: python -m crash_analyzer.tests.benchmarks.bench_crash_lookup
+"""
+
+import asyncio
+import random
+import time
+
+from crash_analyzer.app.database.arangodb.initializer import ArangoDBInitializer
+from crash_analyzer.app.database.instance import db_init
+from crash_analyzer.app.settings import get_app_settings
+
+SIZES = [1000, 10000, 100000]
+LOOKUPS = 200
+FUZZERS = 20
+REVISIONS = 5
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def fill(db, start: int, stop: int):
+    col = db._db[get_app_settings().collections.crashes]
+    docs = [
+        {
+            "fuzzer_id": f"fuzzer-{i % FUZZERS}",
+            "fuzzer_rev": f"rev-{i % REVISIONS}",
+            "input_hash": f"input-{i}",
+            "unique_hash": f"hash-{i}",
+        }
+        for i in range(start, stop)
+    ]
+    for i in range(0, len(docs), 5000):
+        await col.insert_many(docs[i : i + 5000])
+
+
+async def measure(db, size: int):
+    by_hash = []
+    by_revision = []
+
+    for _ in range(LOOKUPS):
+        i = random.randrange(size)
+
+        started = time.perf_counter()
+        await db.crashes.get_by_hash(
+            f"fuzzer-{i % FUZZERS}", f"rev-{i % REVISIONS}", f"hash-{i}"
+        )
+        by_hash.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await db.crashes.get_revision_crashes(f"fuzzer-{i % FUZZERS}", f"rev-{i % REVISIONS}")
+        by_revision.append(time.perf_counter() - started)
+
+    return by_hash, by_revision
+
+
+async def drop_indexes(db):
+    col = db._db[get_app_settings().collections.crashes]
+    for index in await col.indexes():
+        if index["type"] != "primary":
+            await col.delete_index(index["id"])
+
+
+async def main():
+
+    settings = get_app_settings()
+    db = await db_init(settings)
+    await db.truncate_all_collections()
+
+    print(f"{'docs':>8} {'indexes':>8} {'by hash p50/p99, ms':>22} {'revision p50/p99, ms':>22}")
+
+    try:
+        filled = 0
+        for size in SIZES:
+            await fill(db, filled, size)
+            filled = size
+
+            for indexed in [True, False]:
+                if indexed:
+                    initializer = await ArangoDBInitializer.create(settings)
+                    await initializer.do_init()
+                    await initializer.client.close()
+                else:
+                    await drop_indexes(db)
+
+                by_hash, by_revision = await measure(db, size)
+                print(
+                    f"{size:>8} {'yes' if indexed else 'no':>8}"
+                    f" {percentile(by_hash, 0.5) * 1000:>10.2f}/{percentile(by_hash, 0.99) * 1000:<11.2f}"
+                    f" {percentile(by_revision, 0.5) * 1000:>10.2f}/{percentile(by_revision, 0.99) * 1000:<11.2f}"
+                )
+    finally:
+        await db.truncate_all_collections()
+        await db.close()
+
+        # Restore indexes dropped by the last measurement
+        initializer = await ArangoDBInitializer.create(settings)
+        await initializer.do_init()
+        await initializer.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
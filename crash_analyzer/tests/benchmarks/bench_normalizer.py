@@ -0,0 +1,45 @@
+"""
+Compares single-scan output normalizer with the legacy four-pass cleaner.
+
+Usage: python -m crash_analyzer.tests.benchmarks.bench_normalizer
+"""
+
+import timeit
+
+from crash_analyzer.app.agents import libfuzzer
+from crash_analyzer.tests.corpus import load_corpus
+from crash_analyzer.tests.unit.test_normalizer import legacy_clean_generic_output
+
+
+def make_storm_output(size: int) -> str:
+
+    """Builds sanitizer output of roughly `size` bytes
+    by repeating stack frames of recorded reports"""
+
+    frames = []
+    for recorded in load_corpus():
+        if recorded.engine == "libfuzzer":
+            frames.extend(l for l in recorded.output.splitlines(True) if "#" in l)
+
+    body = "".join(frames)
+    header = "Running: storm\n==4127==ERROR: AddressSanitizer: heap-use-after-free\n"
+    footer = "SUMMARY: AddressSanitizer: heap-use-after-free\n"
+    return header + body * (size // len(body) + 1) + footer
+
+
+def main():
+
+    print(f"{'size':>10} {'legacy, ms':>12} {'single scan, ms':>16} {'speedup':>8}")
+
+    for size in [4 * 1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]:
+        output = make_storm_output(size)
+        assert libfuzzer._clean_generic_output(output) == legacy_clean_generic_output(output)
+
+        number = max(1, (1024 * 1024) // size)
+        legacy = min(timeit.repeat(lambda: legacy_clean_generic_output(output), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: libfuzzer._clean_generic_output(output), number=number, repeat=3)) / number
+        print(f"{len(output):>10} {legacy * 1000:>12.3f} {single * 1000:>16.3f} {legacy / single:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Measures crash parsing speed of every engine over recorded outputs,
+grown from their recorded size up to several megabytes in two ways:
+- log: fuzzer progress lines before the crash (long fuzzing sessions)
+- stack: longest block of stack frames repeated (deep recursion)
+
+Throughput is computed from the best run, p99 from all runs.
+Results are compared with stored baseline. Changed hash of any case
+fails the run. Throughput lower than baseline by more than tolerance
+is reported, and fails the run with --strict. Throughput depends
+on machine: save own baseline before changing parsers.
+
+Usage:
+    python -m crash_analyzer.tests.benchmarks.bench_parsers [--tolerance 0.3] [--strict]
+    python -m crash_analyzer.tests.benchmarks.bench_parsers --save
+"""
+
+from typing import Dict, List, Tuple
+import argparse
+import json
+import time
+import sys
+import os
+
+from crash_analyzer.app.agents import is_supported, parse_crash
+from crash_analyzer.app.models import EngineID
+from crash_analyzer.tests.corpus import RecordedOutput, load_corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "parsers.json")
+SIZES = [64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+TIME_BUDGET = 0.3
+MIN_RUNS = 5
+
+PROGRESS_LINE = (
+    "#{0}\tNEW    cov: {1} ft: {2} corp: 12/345b lim: 4096 "
+    "exec/s: 2048 rss: 64Mb L: 7/9 MS: 2 ChangeByte-CrossOver-\n"
+)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def grow_log(output: str, size: int) -> str:
+
+    lines = []
+    total = len(output)
+    while total < size:
+        n = len(lines)
+        lines.append(PROGRESS_LINE.format(n * 7, 100 + n, 200 + n))
+        total += len(lines[-1])
+
+    return "".join(lines) + output
+
+
+def grow_stack(output: str, size: int) -> str:
+
+    # Longest run of indented lines is stack (or part of it)
+    lines = output.splitlines(True)
+    best = (0, 0)
+    start = None
+
+    for i, line in enumerate(lines + ["end"]):
+        if line[:1] in (" ", "\t"):
+            start = i if start is None else start
+        elif start is not None:
+            best = max(best, (i - start, start), key=lambda run: run[0])
+            start = None
+
+    length, start = best
+    if length == 0:
+        return grow_log(output, size)
+
+    block = "".join(lines[start : start + length])
+    count = max(1, (size - len(output)) // len(block) + 1)
+    head = "".join(lines[:start])
+    tail = "".join(lines[start + length :])
+    return head + block * count + tail
+
+
+def make_cases(corpus: List[RecordedOutput]):
+
+    for recorded in corpus:
+        yield f"{recorded.name}:recorded", recorded, recorded.output
+
+        # Afl crashes are hashed by coverage map, output isn't read
+        if EngineID.is_afl(recorded.engine):
+            continue
+
+        for size in SIZES:
+            yield f"{recorded.name}:log:{size}", recorded, grow_log(recorded.output, size)
+            yield f"{recorded.name}:stack:{size}", recorded, grow_stack(recorded.output, size)
+
+
+def measure(recorded: RecordedOutput, output: str) -> Tuple[List[float], str]:
+
+    crash_dict = recorded.crash_dict(output)
+    samples = []
+    started = time.perf_counter()
+
+    while len(samples) < MIN_RUNS or time.perf_counter() - started < TIME_BUDGET:
+        t = time.perf_counter()
+        _, unique_hash = parse_crash(recorded.engine, recorded.lang, crash_dict)
+        samples.append(time.perf_counter() - t)
+
+    return samples, unique_hash
+
+
+def check_engines(corpus: List[RecordedOutput]):
+
+    recorded = {r.engine for r in corpus}
+    for engine in EngineID:
+        if engine in recorded:
+            continue
+
+        if not is_supported(engine):
+            print(f"{engine.value}: not supported by analyzer")
+        else:
+            print(f"{engine.value}: no recorded outputs, not measured")
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save", action="store_true", help="store results as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--strict", action="store_true", help="fail on slowdowns")
+    args = parser.parse_args()
+
+    baseline: Dict[str, dict] = {}
+    if os.path.exists(BASELINE_PATH) and not args.save:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    corpus = load_corpus()
+    check_engines(corpus)
+
+    results = {}
+    hash_changes = 0
+    slowdowns = 0
+
+    print(f"{'case':<52} {'MB':>7} {'MB/s':>9} {'p99, ms':>9} {'vs base':>8}")
+
+    for case, recorded, output in make_cases(corpus):
+        samples, unique_hash = measure(recorded, output)
+        size = len(output.encode())
+
+        # Best run is least affected by noise of other processes
+        result = {
+            "size": size,
+            "mb_per_s": round(size / min(samples) / 1024 / 1024, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+            "unique_hash": unique_hash,
+        }
+        results[case] = result
+
+        status = ""
+        ratio = "-"
+        base = baseline.get(case)
+        if base is not None:
+            ratio = f"{result['mb_per_s'] / base['mb_per_s']:.2f}x"
+            if base["unique_hash"] != unique_hash:
+                status = "HASH CHANGED"
+                hash_changes += 1
+            elif result["mb_per_s"] < base["mb_per_s"] * (1 - args.tolerance):
+                status = "SLOWER"
+                slowdowns += 1
+
+        print(
+            f"{case:<52} {size / 1024 / 1024:>7.2f} {result['mb_per_s']:>9.2f}"
+            f" {result['p99_ms']:>9.3f} {ratio:>8} {status}"
+        )
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if baseline:
+        print(f"{hash_changes} hashes changed, {slowdowns} cases slower than baseline")
+
+    if hash_changes or (args.strict and slowdowns):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
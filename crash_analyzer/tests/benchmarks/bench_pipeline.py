@@ -0,0 +1,284 @@
+"""
+End-to-end load test of MC_NewCrash. Real consumer, executor and parsers
+run against in-process stand-ins of database, object storage and producers.
+Crash stream is built from recorded outputs with configurable duplicate
+ratio, engine mix and input sizes. Reports messages/sec, latency
+percentiles of `consume` and peak RSS.
+
+Needs environment from local/dotenv. Example:
+    python -m crash_analyzer.tests.benchmarks.bench_pipeline \\
+        --messages 5000 --concurrency 64 --duplicates 0.8 \\
+        --engines libfuzzer=3,atheris=1,afl=1 --input-sizes 512,65536,1048576
+"""
+
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+import argparse
+import resource
+import logging
+import asyncio
+import base64
+import random
+import time
+
+from crash_analyzer.app.agents.memo import ParseMemo
+from crash_analyzer.app.database.cache import CachedCrashes
+from crash_analyzer.app.database.input_index import InputIndexCrashes
+from crash_analyzer.app.database.single_flight import SingleFlightCrashes
+from crash_analyzer.app.executor.executors import create_executor
+from crash_analyzer.app.message_queue.coalescing import DuplicateCoalescer
+from crash_analyzer.app.message_queue.scheduling import FairScheduler
+from crash_analyzer.app.message_queue.agent import MC_NewCrash
+from crash_analyzer.app.models import EngineID
+from crash_analyzer.app.settings import get_app_settings
+from crash_analyzer.tests.corpus import RecordedOutput, load_corpus
+from crash_analyzer.tests.memory_db import MemoryDatabase
+from crash_analyzer.tests.memory_storage import MemoryObjectStorage
+
+FUZZER_ID = "fuzzer"
+FUZZER_REV = "revision"
+
+
+class CountingProducer:
+
+    """Stand-in of MQ producer"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.produced = 0
+        self.crashes = 0
+
+    async def produce(self, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.produced += 1
+        self.crashes += kwargs.get("count", 1)
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def random_bytes(rnd: random.Random, size: int) -> bytes:
+    # Random.randbytes is not available before python 3.9
+    if size == 0:
+        return b""
+    return rnd.getrandbits(8 * size).to_bytes(size, "little")
+
+
+def parse_engines(text: str) -> Dict[EngineID, float]:
+    engines = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        engines[EngineID(name)] = float(weight or 1)
+    return engines
+
+
+def make_variant(recorded: RecordedOutput, variant: int) -> dict:
+
+    """Crash of the same kind as recorded, which differs by
+    stack frames, so it's hashed to another unique hash"""
+
+    lines = recorded.output.splitlines(True)
+    for i, line in enumerate(lines):
+        if line[:1] in (" ", "\t"):
+            lines[i] = line.rstrip("\n") + f" #variant-{variant}\n"
+
+    crash = recorded.crash_dict("".join(lines))
+    if recorded.showmap_hash is not None:
+        crash["showmap_hash"] = f"{recorded.showmap_hash}-{variant}"
+
+    return crash
+
+
+def make_messages(args, s3: MemoryObjectStorage) -> List[MC_NewCrash.Model]:
+
+    rnd = random.Random(args.seed)
+    engines = parse_engines(args.engines)
+    input_sizes = [int(size) for size in args.input_sizes.split(",")]
+
+    corpus: Dict[EngineID, List[RecordedOutput]] = {}
+    for recorded in load_corpus():
+        corpus.setdefault(recorded.engine, []).append(recorded)
+
+    missing = [e.value for e in engines if e not in corpus]
+    if missing:
+        raise ValueError(f"No recorded outputs for engines: {missing}")
+
+    # Inputs of the same size share content: only count matters.
+    # Known inputs: duplicate resends input of its variant, as if
+    # the same input was reproduced again
+    inputs = {size: random_bytes(rnd, size) for size in input_sizes}
+    variant_inputs: Dict[Tuple[str, int], bytes] = {}
+    variants: Dict[str, int] = {}
+    messages = []
+
+    for n in range(args.messages):
+        engine = rnd.choices(list(engines), weights=list(engines.values()))[0]
+        recorded = rnd.choice(corpus[engine])
+
+        count = variants.get(recorded.name, 0)
+        if count and rnd.random() < args.duplicates:
+            variant = rnd.randrange(count)
+        else:
+            variant = count
+            variants[recorded.name] = count + 1
+
+        crash = make_variant(recorded, variant)
+        if args.known_inputs:
+            key = (recorded.name, variant)
+            if key not in variant_inputs:
+                variant_inputs[key] = random_bytes(rnd, rnd.choice(input_sizes))
+            data = variant_inputs[key]
+        else:
+            data = inputs[rnd.choice(input_sizes)]
+
+        if rnd.random() < args.stored_outputs:
+            crash["output_id"] = f"output-{n}"
+            s3.put_output(FUZZER_ID, FUZZER_REV, crash["output_id"], crash["output"].encode())
+            crash["output"] = None
+
+        if len(data) <= args.inline_max:
+            crash["input"] = base64.b64encode(data).decode()
+        else:
+            crash["input"] = None
+            crash["input_id"] = f"input-{n}"
+            checksum = rnd.random() < args.checksums
+            s3.put_crash(FUZZER_ID, FUZZER_REV, crash["input_id"], data, checksum)
+
+        messages.append(
+            MC_NewCrash.Model(
+                user_id="user",
+                project_id="project",
+                pool_id=f"pool-{rnd.randrange(args.tenants)}",
+                fuzzer_id=FUZZER_ID,
+                fuzzer_rev=FUZZER_REV,
+                fuzzer_engine=engine,
+                fuzzer_lang=recorded.lang,
+                crash=crash,
+                created="2026-01-01T00:00:00Z",
+            )
+        )
+
+    return messages
+
+
+async def run(args):
+
+    settings = get_app_settings()
+    settings.executor.mode = args.executor
+    settings.executor.workers = args.workers
+    settings.crash_analyzer.batch_size = args.batch_size
+    settings.parse_memo.max_entries = args.parse_memo
+
+    # Inputs shared by unrelated crashes would be taken for duplicates
+    settings.input_index.enabled = args.known_inputs
+
+    db = MemoryDatabase(latency=args.db_latency_ms / 1000)
+    s3 = MemoryObjectStorage(latency=args.s3_latency_ms / 1000)
+    unique = CountingProducer(args.mq_latency_ms / 1000)
+    duplicated = CountingProducer(args.mq_latency_ms / 1000)
+
+    # Same stack as in database
+    crashes = db.crashes
+    if settings.dedup_cache.max_entries > 0:
+        crashes = CachedCrashes(crashes, settings.dedup_cache)
+    crashes = SingleFlightCrashes(crashes)
+    if settings.input_index.enabled:
+        crashes = InputIndexCrashes(crashes, settings.input_index)
+
+    state = SimpleNamespace(
+        settings=settings,
+        db=SimpleNamespace(crashes=crashes),
+        s3=s3,
+        executor=create_executor(settings.executor),
+        producers=SimpleNamespace(unique_crash=unique, duplicated_crash=duplicated),
+        duplicates=DuplicateCoalescer(duplicated, args.duplicate_window_ms / 1000),
+        scheduler=FairScheduler(settings.fair_scheduler),
+        parse_memo=ParseMemo(settings.parse_memo),
+    )
+    app = SimpleNamespace(state=state)
+    consumer = MC_NewCrash()
+
+    print(f"Generating {args.messages} messages...")
+    messages = make_messages(args, s3)
+    queue = asyncio.Queue()
+    for msg in messages:
+        queue.put_nowait(msg)
+
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            msg = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await consumer.consume(msg, app)
+            except Exception:
+                logging.exception("Failed to consume message")
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    finally:
+        elapsed = time.perf_counter() - started
+        await state.duplicates.flush()
+        await state.executor.close()
+
+    # Linux reports maxrss in kilobytes
+    rss_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    rss_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"messages:     {len(messages)} in {elapsed:.2f}s, {errors} failed")
+    print(f"throughput:   {len(messages) / elapsed:.1f} msg/s")
+    print(
+        "latency, ms:  "
+        + " ".join(
+            f"p{int(p * 100)}={percentile(latencies, p) * 1000:.2f}"
+            for p in [0.5, 0.9, 0.99]
+        )
+        + f" max={max(latencies) * 1000:.2f}"
+    )
+    print(f"outcomes:     {unique.produced} unique, {duplicated.crashes} duplicate")
+    print(f"messages out: {unique.produced + duplicated.produced}")
+    print(f"db calls:     {db.crashes.calls}")
+    print(f"s3 calls:     {s3.calls}")
+    print(f"parse memo:   {len(state.parse_memo)} results, {state.parse_memo.size} bytes")
+    print(f"peak RSS, MB: {rss_self:.1f} (largest worker process: {rss_children:.1f})")
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64, help="messages consumed at a time")
+    parser.add_argument("--duplicates", type=float, default=0.8, help="share of duplicate crashes")
+    parser.add_argument("--engines", default="libfuzzer=3,go-fuzz-libfuzzer=1,atheris=1,afl=1")
+    parser.add_argument("--input-sizes", default="512,8192,262144", help="bytes, chosen uniformly")
+    parser.add_argument("--inline-max", type=int, default=4096, help="larger inputs go to storage")
+    parser.add_argument("--stored-outputs", type=float, default=0, help="share of outputs sent by reference")
+    parser.add_argument("--known-inputs", action="store_true", help="duplicates resend input, index is used")
+    parser.add_argument("--checksums", type=float, default=0.5, help="share of stored inputs with checksum")
+    parser.add_argument("--db-latency-ms", type=float, default=1)
+    parser.add_argument("--s3-latency-ms", type=float, default=5)
+    parser.add_argument("--mq-latency-ms", type=float, default=1)
+    parser.add_argument("--executor", default="process", choices=["process", "thread", "sync"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--tenants", type=int, default=4, help="pools sending crashes")
+    parser.add_argument("--parse-memo", type=int, default=10000, help="memoized parse results, 0 disables")
+    parser.add_argument("--duplicate-window-ms", type=float, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measures crash input download throughput for different chunk sizes,
+iterating chunks versus reading into reused buffer. Objects are served
+by local HTTP server standing in for S3, so network is not involved.
+
+Usage: python -m crash_analyzer.tests.benchmarks.bench_streaming_download
+"""
+
+from aiohttp import web
+import aiohttp
+import asyncio
+import time
+import os
+
+from crash_analyzer.app.object_storage.storage import StreamingDownload
+from crash_analyzer.app.inputs import InputDigest
+
+OBJECT_SIZES = [64 * 1024, 4 * 1024 * 1024, 64 * 1024 * 1024]
+CHUNK_SIZES = [4096, 64 * 1024, 1024 * 1024]
+PORT = 18765
+
+
+class LocalBody:
+
+    """Body of object served by local server. Behaves like
+    aiobotocore StreamingBody: async context manager with read(n)"""
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self._response.release()
+
+    async def read(self, size: int = -1) -> bytes:
+        return await self._response.content.read(size)
+
+
+async def get_object(session, size: int):
+    response = await session.get(f"http://127.0.0.1:{PORT}/{size}")
+    return {"Body": LocalBody(response)}
+
+
+async def iterate(session, size: int, chunk_size: int):
+    digest = InputDigest(1024)
+    stream = await StreamingDownload.create(await get_object(session, size), chunk_size)
+    async for chunk in stream:
+        digest.update(chunk)
+    assert digest.size == size
+
+
+async def read_into(session, size: int, chunk_size: int):
+    digest = InputDigest(1024)
+    stream = await StreamingDownload.create(await get_object(session, size), chunk_size)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        n = await stream.readinto(buffer)
+        if n == 0:
+            break
+        digest.update(view[:n])
+    assert digest.size == size
+
+
+async def measure(func, session, size: int, chunk_size: int):
+    repeat = max(3, (256 * 1024 * 1024) // size // 8)
+    best = float("inf")
+    for _ in range(min(repeat, 50)):
+        started = time.perf_counter()
+        await func(session, size, chunk_size)
+        best = min(best, time.perf_counter() - started)
+    return size / best / 1024 / 1024
+
+
+async def main():
+
+    objects = {size: os.urandom(size) for size in OBJECT_SIZES}
+
+    async def serve(request: web.Request):
+        return web.Response(body=objects[int(request.match_info["size"])])
+
+    app = web.Application()
+    app.router.add_get("/{size}", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    print(f"{'object':>10} {'chunk':>8} {'iterate, MB/s':>14} {'readinto, MB/s':>15}")
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            for size in OBJECT_SIZES:
+                for chunk_size in CHUNK_SIZES:
+                    iterated = await measure(iterate, session, size, chunk_size)
+                    read = await measure(read_into, session, size, chunk_size)
+                    print(f"{size:>10} {chunk_size:>8} {iterated:>14.1f} {read:>15.1f}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import List, NamedTuple, Optional
+
+import json
+import os
+
+from crash_analyzer.app.models import EngineID, LangID
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "data", "outputs")
+
+
+class RecordedOutput(NamedTuple):
+    name: str
+    engine: EngineID
+    lang: LangID
+    output: str
+    brief: Optional[str]
+    unique_hash: str
+    showmap_hash: Optional[str] = None
+
+    def crash_dict(self, output: Optional[str] = None) -> dict:
+
+        crash = {
+            "type": "crash",
+            "input": "",
+            "output": self.output if output is None else output,
+            "reproduced": True,
+        }
+
+        # Afl crashes are told apart by coverage map
+        if self.showmap_hash is not None:
+            crash["showmap_hash"] = self.showmap_hash
+
+        return crash
+
+
+def load_corpus() -> List[RecordedOutput]:
+
+    """Loads recorded crash outputs along with
+    brief and unique hash they must be parsed to"""
+
+    with open(os.path.join(CORPUS_DIR, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    corpus = []
+    for name, info in manifest.items():
+        with open(os.path.join(CORPUS_DIR, name)) as f:
+            output = f.read()
+
+        corpus.append(
+            RecordedOutput(
+                name=name,
+                engine=EngineID(info["engine"]),
+                lang=LangID(info["lang"]),
+                output=output,
+                brief=info["brief"],
+                unique_hash=info["unique_hash"],
+                showmap_hash=info.get("showmap_hash"),
+            )
+        )
+
+    return corpus
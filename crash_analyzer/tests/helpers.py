@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from crash_analyzer.app.database.cache import CachedCrashes
+from crash_analyzer.app.database.input_index import InputIndexCrashes
+from crash_analyzer.app.database.orm import ORMCrashInfo
+from crash_analyzer.app.database.write_behind import WriteBehindCrashes
+from crash_analyzer.app.object_storage.storage import ObjectStorage
+from crash_analyzer.app.settings import (
+    DedupCacheSettings,
+    InputIndexSettings,
+    WriteBehindSettings,
+)
+from crash_analyzer.tests.memory_db import MemoryCrashes
+
+
+def make_crash(unique_hash="h1", input_hash="input", fuzzer_rev="rev"):
+    return ORMCrashInfo.from_kwargs(
+        fuzzer_id="fuzzer",
+        fuzzer_rev=fuzzer_rev,
+        input_hash=input_hash,
+        unique_hash=unique_hash,
+    )
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+class FakeProducer:
+
+    """Records produced messages"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def produce(self, **kwargs):
+        self.messages.append(kwargs)
+
+
+class FakeCursor:
+    def __init__(self, result):
+        self._result = result
+
+    def pop(self):
+        return self._result
+
+
+class FakeBody:
+
+    """Mimics body of S3 object returned by get_object"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.closed = True
+
+    async def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = len(self.data) - self.offset
+        chunk = self.data[self.offset : self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+def arango_error(error_type, error_code):
+    resp = SimpleNamespace(
+        error_message="request failed",
+        error_code=error_code,
+        status_code=409,
+        status_text="Conflict",
+        url="",
+        method="post",
+        headers={},
+    )
+    return error_type(resp, None)
+
+
+# Factories of crash layers return the layer and
+# crashes below it (in-memory ones, unless given)
+
+
+def make_dedup_cache(crashes=None, max_entries=100, max_bytes=1024 * 1024, ttl=0.0):
+    crashes = MemoryCrashes() if crashes is None else crashes
+    settings = DedupCacheSettings(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    return CachedCrashes(crashes, settings), crashes
+
+
+def make_input_index(crashes=None, max_entries=100):
+    crashes = MemoryCrashes() if crashes is None else crashes
+    settings = InputIndexSettings(enabled=True, max_entries=max_entries)
+    return InputIndexCrashes(crashes, settings), crashes
+
+
+def make_write_behind(crashes=None, max_pending=10, linger_ms=50):
+    crashes = MemoryCrashes() if crashes is None else crashes
+    settings = WriteBehindSettings(enabled=True, max_pending=max_pending, linger_ms=linger_ms)
+    return WriteBehindCrashes(crashes, settings), crashes
+
+
+def make_storage(client):
+
+    """Object storage over fake S3 client"""
+
+    storage = ObjectStorage()
+    storage._is_closed = True
+    storage._client = client
+    return storage
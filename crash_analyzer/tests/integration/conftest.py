@@ -0,0 +1,18 @@
+import pytest_asyncio
+
+from crash_analyzer.app.database.instance import db_init
+from crash_analyzer.app.settings import get_app_settings
+
+
+@pytest_asyncio.fixture
+async def db():
+
+    """Database from local docker-compose stack with all collections cleared"""
+
+    db = await db_init(get_app_settings())
+    await db.truncate_all_collections()
+
+    try:
+        yield db
+    finally:
+        await db.close()
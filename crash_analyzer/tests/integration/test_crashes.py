@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from crash_analyzer.tests.helpers import make_crash
+
+
+@pytest.mark.asyncio
+async def test_get_or_insert_new_and_existing(db):
+
+    crash, existed = await db.crashes.get_or_insert(make_crash(input_hash="i1"))
+    assert not existed
+    assert crash.key is not None
+
+    same, existed = await db.crashes.get_or_insert(make_crash(input_hash="i2"))
+    assert existed
+    assert same.key == crash.key
+    assert same.input_hash == "i1"
+
+
+@pytest.mark.asyncio
+async def test_get_or_insert_under_contention(db):
+
+    results = await asyncio.gather(
+        *[db.crashes.get_or_insert(make_crash(input_hash=f"i{i}")) for i in range(50)]
+    )
+
+    inserted = [crash for crash, existed in results if not existed]
+    assert len(inserted) == 1
+    assert {crash.key for crash, _ in results} == {inserted[0].key}
+
+    stored = [c async for c in await db.crashes.get_revision_crashes("fuzzer", "rev")]
+    assert len(stored) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_hash(db):
+
+    first, _ = await db.crashes.get_or_insert(make_crash("h1", fuzzer_rev="rev-1"))
+    second, _ = await db.crashes.get_or_insert(make_crash("h2", fuzzer_rev="rev-1"))
+    third, _ = await db.crashes.get_or_insert(make_crash("h1", fuzzer_rev="rev-2"))
+
+    found = await db.crashes.get_many_by_hash(
+        [
+            ("fuzzer", "rev-1", "h1"),
+            ("fuzzer", "rev-1", "h2"),
+            ("fuzzer", "rev-2", "h1"),
+            ("fuzzer", "rev-2", "h2"),  # hash of another revision
+            ("fuzzer", "rev-1", "missing"),
+            ("fuzzer", "rev-1", "h1"),  # repeated key
+        ]
+    )
+
+    assert {key: crash.key for key, crash in found.items()} == {
+        ("fuzzer", "rev-1", "h1"): first.key,
+        ("fuzzer", "rev-1", "h2"): second.key,
+        ("fuzzer", "rev-2", "h1"): third.key,
+    }
+    assert await db.crashes.get_many_by_hash([]) == {}
@@ -0,0 +1,161 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import asyncio
+
+from crash_analyzer.app.database.abstract import (
+    ICrashes,
+    IDatabase,
+    IDBCrashIterator,
+    IUnsentMessages,
+)
+from crash_analyzer.app.database.orm import ORMCrashInfo
+
+HashKey = Tuple[str, str, str]
+
+
+class MemoryCrashIterator(IDBCrashIterator):
+    def __init__(self, crashes: List[ORMCrashInfo]):
+        self._crashes = iter(crashes)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ORMCrashInfo:
+        try:
+            return next(self._crashes)
+        except StopIteration:
+            raise StopAsyncIteration()
+
+
+class MemoryCrashes(ICrashes):
+
+    """In-memory ICrashes. Counts calls to measure database round trips.
+    Optional latency is added to each call to imitate network"""
+
+    def __init__(self, latency: float = 0):
+        self._crashes: Dict[str, ORMCrashInfo] = {}
+        self._by_hash: Dict[HashKey, str] = {}
+        self._latency = latency
+        self.calls: Dict[str, int] = {}
+
+    async def _count(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+    @staticmethod
+    def _hash_key(crash: ORMCrashInfo) -> HashKey:
+        return crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash
+
+    def _find(self, fuzzer_id, fuzzer_rev, unique_hash) -> Optional[ORMCrashInfo]:
+        key = self._by_hash.get((fuzzer_id, fuzzer_rev, unique_hash))
+        return self._crashes[key].copy() if key is not None else None
+
+    def _store(self, crash: ORMCrashInfo):
+
+        old = self._crashes.get(crash.key)
+        if old is not None:
+            del self._by_hash[self._hash_key(old)]
+
+        self._crashes[crash.key] = crash.copy()
+        self._by_hash[self._hash_key(crash)] = crash.key
+
+    async def get(self, key: str) -> Optional[ORMCrashInfo]:
+        await self._count("get")
+        crash = self._crashes.get(key)
+        return crash.copy() if crash else None
+
+    async def get_by_hash(self, fuzzer_id, fuzzer_rev, unique_hash):
+        await self._count("get_by_hash")
+        return self._find(fuzzer_id, fuzzer_rev, unique_hash)
+
+    async def get_many_by_hash(self, keys: Iterable[HashKey]):
+        await self._count("get_many_by_hash")
+        found = {key: self._find(*key) for key in keys}
+        return {key: crash for key, crash in found.items() if crash is not None}
+
+    async def insert(self, crash: ORMCrashInfo) -> None:
+        await self._count("insert")
+        crash.key = str(len(self._crashes) + 1)
+        self._store(crash)
+
+    async def insert_many(self, crashes: List[ORMCrashInfo]) -> List[ORMCrashInfo]:
+        await self._count("insert_many")
+        rejected = []
+        for crash in crashes:
+            exists = self._find(crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash)
+            if exists is not None or crash.key in self._crashes:
+                rejected.append(crash)
+                continue
+            if crash.key is None:
+                crash.key = str(len(self._crashes) + 1)
+            self._store(crash)
+        return rejected
+
+    async def get_or_insert(self, crash: ORMCrashInfo) -> Tuple[ORMCrashInfo, bool]:
+        await self._count("get_or_insert")
+        existing = self._find(crash.fuzzer_id, crash.fuzzer_rev, crash.unique_hash)
+        if existing is not None:
+            return existing, True
+
+        crash = crash.copy()
+        crash.key = str(len(self._crashes) + 1)
+        self._store(crash)
+        return crash, False
+
+    async def update(self, crash: ORMCrashInfo) -> None:
+        await self._count("update")
+        self._store(crash)
+
+    async def get_revision_crashes(self, fuzzer_id, revision) -> IDBCrashIterator:
+        await self._count("get_revision_crashes")
+        crashes = [
+            c.copy()
+            for c in self._crashes.values()
+            if c.fuzzer_id == fuzzer_id and c.fuzzer_rev == revision
+        ]
+        return MemoryCrashIterator(crashes)
+
+
+class MemoryUnsentMessages(IUnsentMessages):
+    def __init__(self):
+        self._messages: Dict[str, list] = {}
+
+    async def save_unsent_messages(self, messages: Dict[str, list]):
+        self._messages = dict(messages)
+
+    async def load_unsent_messages(self) -> Dict[str, list]:
+        messages, self._messages = self._messages, {}
+        return messages
+
+
+class MemoryDatabase(IDatabase):
+
+    """In-memory IDatabase for tests and load harness"""
+
+    def __init__(self, latency: float = 0):
+        self._crashes = MemoryCrashes(latency)
+        self._unsent_mq = MemoryUnsentMessages()
+
+    @classmethod
+    async def create(cls, settings=None):
+        return cls()
+
+    async def close(self) -> None:
+        pass
+
+    @property
+    def crashes(self) -> MemoryCrashes:
+        return self._crashes
+
+    @property
+    def unsent_mq(self) -> MemoryUnsentMessages:
+        return self._unsent_mq
+
+    async def flush(self) -> None:
+        pass
+
+    async def truncate_all_collections(self) -> None:
+        self._crashes = MemoryCrashes(self._crashes._latency)
+        self._unsent_mq = MemoryUnsentMessages()
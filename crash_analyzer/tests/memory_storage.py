@@ -0,0 +1,134 @@
+from __future__ import annotations
+from typing import BinaryIO, Dict, Tuple
+
+from hashlib import sha256, md5
+import asyncio
+
+from crash_analyzer.app.object_storage.abstract import (
+    IObjectStorage,
+    IStreamingDownload,
+    ObjectHead,
+    ObjectInfo,
+)
+from crash_analyzer.app.object_storage.errors import ObjectNotFoundError
+
+ObjectKey = Tuple[str, str, str]
+
+
+class MemoryDownload(IStreamingDownload):
+    def __init__(self, data: bytes, chunk_size: int):
+        self._data = memoryview(data)
+        self._chunk_size = chunk_size
+        self._offset = 0
+
+    def __aiter__(self) -> IStreamingDownload:
+        return self
+
+    async def __anext__(self) -> bytes:
+        chunk = self._data[self._offset : self._offset + self._chunk_size]
+        if not chunk:
+            raise StopAsyncIteration()
+        self._offset += len(chunk)
+        return bytes(chunk)
+
+    async def readinto(self, buffer: bytearray) -> int:
+        view = memoryview(buffer)
+        chunk = self._data[self._offset : self._offset + len(view)]
+        view[: len(chunk)] = chunk
+        self._offset += len(chunk)
+        return len(chunk)
+
+
+class MemoryObjectStorage(IObjectStorage):
+
+    """
+    In-memory IObjectStorage holding crash inputs and outputs only.
+    Optional latency is added to each request to imitate network.
+    Inputs put with `checksum=True` report their SHA-256, like
+    objects uploaded with checksum do
+    """
+
+    def __init__(self, latency: float = 0, chunk_size: int = 65536):
+        self._crashes: Dict[ObjectKey, Tuple[bytes, bool]] = {}
+        self._outputs: Dict[ObjectKey, bytes] = {}
+        self._latency = latency
+        self._chunk_size = chunk_size
+        self.calls: Dict[str, int] = {}
+
+    async def _count(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+    def put_crash(
+        self,
+        fuzzer_id: str,
+        fuzzer_rev: str,
+        crash_id: str,
+        data: bytes,
+        checksum: bool = False,
+    ):
+        self._crashes[(fuzzer_id, fuzzer_rev, crash_id)] = (data, checksum)
+
+    def put_output(self, fuzzer_id: str, fuzzer_rev: str, output_id: str, data: bytes):
+        self._outputs[(fuzzer_id, fuzzer_rev, output_id)] = data
+
+    def _get_crash(self, fuzzer_id: str, fuzzer_rev: str, crash_id: str):
+        try:
+            return self._crashes[(fuzzer_id, fuzzer_rev, crash_id)]
+        except KeyError:
+            raise ObjectNotFoundError() from None
+
+    async def upload_fuzzer_config(self, fuzzer_id: str, fuzzer_rev: str, config_encoded: bytes):
+        raise NotImplementedError()
+
+    async def download_fuzzer_config(self, fuzzer_id: str, fuzzer_rev: str) -> bytes:
+        raise NotImplementedError()
+
+    async def upload_fuzzer_binaries(
+        self, fuzzer_id: str, fuzzer_rev: str, stream: BinaryIO, upload_limit: int = 0
+    ):
+        raise NotImplementedError()
+
+    async def download_fuzzer_binaries(self, fuzzer_id: str, fuzzer_rev: str):
+        raise NotImplementedError()
+
+    async def upload_fuzzer_seeds(
+        self, fuzzer_id: str, fuzzer_rev: str, stream: BinaryIO, upload_limit: int = 0
+    ):
+        raise NotImplementedError()
+
+    async def download_fuzzer_seeds(self, fuzzer_id: str, fuzzer_rev: str):
+        raise NotImplementedError()
+
+    async def download_crash(
+        self, fuzzer_id: str, fuzzer_rev: str, crash_id: str
+    ) -> IStreamingDownload:
+        await self._count("download_crash")
+        data, _ = self._get_crash(fuzzer_id, fuzzer_rev, crash_id)
+        return MemoryDownload(data, self._chunk_size)
+
+    async def download_crash_head(
+        self, fuzzer_id: str, fuzzer_rev: str, crash_id: str, size: int
+    ) -> ObjectHead:
+        await self._count("download_crash_head")
+        data, checksum = self._get_crash(fuzzer_id, fuzzer_rev, crash_id)
+        info = ObjectInfo(
+            size=len(data),
+            etag=f'"{md5(data).hexdigest()}"',
+            sha256=sha256(data).hexdigest() if checksum else None,
+        )
+        return ObjectHead(data[:size], info)
+
+    async def download_crash_output(
+        self, fuzzer_id: str, fuzzer_rev: str, output_id: str
+    ) -> IStreamingDownload:
+        await self._count("download_crash_output")
+        try:
+            data = self._outputs[(fuzzer_id, fuzzer_rev, output_id)]
+        except KeyError:
+            raise ObjectNotFoundError() from None
+        return MemoryDownload(data, self._chunk_size)
+
+    async def close(self) -> None:
+        pass
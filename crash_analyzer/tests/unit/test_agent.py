@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+import asyncio
+import threading
+import base64
+
+import pytest
+
+# MC_NewCrash is a consumer of message queue transport
+pytest.importorskip("mqtransport")
+
+from crash_analyzer.app.agents.memo import (
+    LOOP_DIGEST_MAX_SIZE,
+    ParseMemo,
+    output_digest,
+)
+from crash_analyzer.app.database.single_flight import SingleFlightCrashes
+from crash_analyzer.app.executor.executors import create_executor
+from crash_analyzer.app.message_queue import agent
+from crash_analyzer.app.message_queue.agent import MC_NewCrash
+from crash_analyzer.app.message_queue.coalescing import DuplicateCoalescer
+from crash_analyzer.app.models import EngineID
+from crash_analyzer.app.settings import ExecutorSettings, ParseMemoSettings
+from crash_analyzer.tests.corpus import load_corpus
+from crash_analyzer.tests.helpers import (
+    FakeProducer,
+    make_dedup_cache,
+    make_input_index,
+)
+from crash_analyzer.tests.memory_db import MemoryCrashes
+
+
+def make_app(crashes: MemoryCrashes, batch_size=1):
+
+    # Same order as in database: cache, single flight, index
+    cache, _ = make_dedup_cache(crashes)
+    stack, _ = make_input_index(SingleFlightCrashes(cache))
+
+    executor_settings = ExecutorSettings(
+        mode="sync", workers=1, max_pending=1, max_tasks_per_worker=0, timeout_ms=60000
+    )
+
+    unique, duplicated = FakeProducer(), FakeProducer()
+    state = SimpleNamespace(
+        settings=SimpleNamespace(
+            crash_analyzer=SimpleNamespace(
+                preview_max_size=16,
+                batch_size=batch_size,
+                batch_linger_ms=50,
+                max_in_flight=100,
+            ),
+            dedup_cache=SimpleNamespace(max_entries=100),
+            input_index=SimpleNamespace(enabled=True),
+        ),
+        db=SimpleNamespace(crashes=stack),
+        executor=create_executor(executor_settings),
+        producers=SimpleNamespace(unique_crash=unique),
+        duplicates=DuplicateCoalescer(duplicated, window=0),
+        parse_memo=ParseMemo(ParseMemoSettings(max_entries=0, max_bytes=1)),
+    )
+    return SimpleNamespace(state=state), unique, duplicated
+
+
+def make_message(data: bytes, fuzzer_rev="rev"):
+
+    recorded = next(r for r in load_corpus() if r.engine == EngineID.libfuzzer)
+    crash = recorded.crash_dict()
+    crash["input"] = base64.b64encode(data).decode()
+
+    return MC_NewCrash.Model(
+        user_id="user",
+        project_id="project",
+        pool_id="pool",
+        fuzzer_id="fuzzer",
+        fuzzer_rev=fuzzer_rev,
+        fuzzer_engine=recorded.engine,
+        fuzzer_lang=recorded.lang,
+        crash=crash,
+        created="2026-01-01T00:00:00Z",
+    )
+
+
+@pytest.mark.asyncio
+async def test_inputs_of_single_flight_followers_indexed():
+
+    crashes = MemoryCrashes(latency=0.01)
+    app, unique, duplicated = make_app(crashes)
+    consumer = MC_NewCrash()
+    messages = [make_message(f"input-{i}".encode()) for i in range(5)]
+
+    # Concurrent messages of the same crash share single query
+    await asyncio.gather(*[consumer._process(msg, app) for msg in messages])
+    assert crashes.calls["get_or_insert"] == 1
+    assert len(unique.messages) == 1
+    assert len(duplicated.messages) == 4
+
+    # Every input, followers included, is answered without parsing
+    await asyncio.gather(*[consumer._process(msg, app) for msg in messages])
+    assert crashes.calls["get_or_insert"] == 1
+    assert len(duplicated.messages) == 9
+
+
+@pytest.mark.asyncio
+async def test_batch_looks_up_crashes_by_single_query():
+
+    crashes = MemoryCrashes()
+    app, _, _ = make_app(crashes)
+    for rev in ["rev-1", "rev-2"]:
+        await MC_NewCrash()._process(make_message(b"stored", rev), app)
+
+    # Cold cache: stored crashes of the batch are found by one query
+    app, unique, duplicated = make_app(crashes, batch_size=10)
+    consumer = MC_NewCrash()
+    messages = [make_message(f"input-{i}".encode(), f"rev-{i % 3}") for i in range(6)]
+    await asyncio.gather(*[consumer._process(msg, app) for msg in messages])
+
+    assert crashes.calls["get_many_by_hash"] == 1
+    assert crashes.calls["get_or_insert"] == 3
+    assert len(unique.messages) == 1
+    assert len(duplicated.messages) == 5
+
+
+@pytest.mark.asyncio
+async def test_large_output_hashed_outside_event_loop(monkeypatch):
+
+    threads = []
+
+    def record_digest(output):
+        threads.append(threading.current_thread())
+        return output_digest(output)
+
+    monkeypatch.setattr(agent, "output_digest", record_digest)
+    app, unique, _ = make_app(MemoryCrashes())
+
+    msg = make_message(b"input")
+    msg.crash["output"] += "\n" * LOOP_DIGEST_MAX_SIZE
+    await MC_NewCrash()._process(msg, app)
+
+    assert len(unique.messages) == 1
+    assert threads and threading.main_thread() not in threads
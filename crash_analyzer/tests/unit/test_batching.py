@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from crash_analyzer.app.message_queue.batching import BatchProcessor
+
+
+@pytest.mark.asyncio
+async def test_items_batched_and_results_routed():
+
+    batches = []
+
+    async def handler(batch):
+        batches.append(list(batch))
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in batch]
+
+    batcher = BatchProcessor(handler, batch_size=4, max_in_flight=8, linger=0.01)
+    results = await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+
+    assert results == [i * 2 for i in range(10)]
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert batcher.in_flight == 0 and batcher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_in_flight_bounded():
+
+    running = 0
+    max_running = 0
+
+    async def handler(batch):
+        nonlocal running, max_running
+        running += len(batch)
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= len(batch)
+        return batch
+
+    batcher = BatchProcessor(handler, batch_size=4, max_in_flight=3, linger=0)
+    await asyncio.gather(*[batcher.submit(i) for i in range(20)])
+
+    assert max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_routed_to_own_submitter():
+
+    async def handler(batch):
+        return [ValueError(i) if i % 2 else i for i in batch]
+
+    batcher = BatchProcessor(handler, batch_size=4, max_in_flight=4, linger=0)
+    results = await asyncio.gather(
+        *[batcher.submit(i) for i in range(4)], return_exceptions=True
+    )
+
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[3], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_handler_failure_fails_whole_batch():
+
+    async def handler(batch):
+        raise RuntimeError("db is down")
+
+    batcher = BatchProcessor(handler, batch_size=2, max_in_flight=2, linger=0)
+    results = await asyncio.gather(
+        *[batcher.submit(i) for i in range(2)], return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.in_flight == 0
+
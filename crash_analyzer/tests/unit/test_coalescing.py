@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from crash_analyzer.app.message_queue.coalescing import DuplicateCoalescer
+from crash_analyzer.tests.helpers import FakeProducer
+
+
+@pytest.mark.asyncio
+async def test_duplicates_coalesced_within_window():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=0.05)
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:02Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:01Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:03Z")
+    assert producer.messages == []
+    assert coalescer.pending == 1
+
+    await asyncio.sleep(0.1)
+    assert producer.messages == [
+        {
+            "fuzzer_id": "fuzzer",
+            "fuzzer_rev": "rev",
+            "input_hash": "hash",
+            "count": 3,
+            "first_seen": "2026-01-01T00:00:01Z",
+            "last_seen": "2026-01-01T00:00:03Z",
+        }
+    ]
+    assert coalescer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_different_crashes_not_merged():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=0.05)
+
+    await coalescer.add("fuzzer", "rev-1", "hash", "2026-01-01T00:00:00Z")
+    await coalescer.add("fuzzer", "rev-2", "hash", "2026-01-01T00:00:00Z")
+    await coalescer.add("fuzzer", "rev-1", "other", "2026-01-01T00:00:00Z")
+
+    await asyncio.sleep(0.1)
+    assert len(producer.messages) == 3
+    assert all(m["count"] == 1 for m in producer.messages)
+
+
+@pytest.mark.asyncio
+async def test_flush_sends_pending_and_disables_window():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=60)
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:00Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:05Z")
+    await coalescer.flush()
+
+    assert [m["count"] for m in producer.messages] == [2]
+    assert coalescer.pending == 0
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:10Z")
+    assert [m["count"] for m in producer.messages] == [2, 1]
+    assert producer.messages[1]["first_seen"] == producer.messages[1]["last_seen"]
+
+
+class SlowProducer(FakeProducer):
+    async def produce(self, **kwargs):
+        await asyncio.sleep(0.05)
+        await super().produce(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_for_sending_windows():
+
+    producer = SlowProducer()
+    coalescer = DuplicateCoalescer(producer, window=0.01)
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:00Z")
+    await asyncio.sleep(0.02)
+    assert coalescer.pending == 0 and producer.messages == []
+
+    # Window has ended, but its message is still being sent
+    await coalescer.flush()
+    assert [m["count"] for m in producer.messages] == [1]
+
+
+@pytest.mark.asyncio
+async def test_zero_window_sends_immediately():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=0)
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:00Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:00Z")
+    assert [m["count"] for m in producer.messages] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_time_formats_ordered():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=0.05)
+
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:01.5Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T03:00:00.123456789+0300")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:02.1234Z")
+
+    await asyncio.sleep(0.1)
+    assert producer.messages[0]["first_seen"] == "2026-01-01T03:00:00.123456789+0300"
+    assert producer.messages[0]["last_seen"] == "2026-01-01T00:00:02.1234Z"
+
+
+@pytest.mark.asyncio
+async def test_malformed_time_counted():
+
+    producer = FakeProducer()
+    coalescer = DuplicateCoalescer(producer, window=0.05)
+
+    await coalescer.add("fuzzer", "rev", "hash", "yesterday")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:02Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-13-01T00:00:00Z")
+    await coalescer.add("fuzzer", "rev", "hash", "2026-01-01T00:00:01Z")
+
+    await asyncio.sleep(0.1)
+    assert producer.messages[0]["count"] == 4
+    assert producer.messages[0]["first_seen"] == "2026-01-01T00:00:01Z"
+    assert producer.messages[0]["last_seen"] == "2026-01-01T00:00:02Z"
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+from aioarangodb.errno import UNIQUE_CONSTRAINT_VIOLATED
+from aioarangodb.exceptions import AQLQueryExecuteError
+
+from crash_analyzer.app.database.arangodb.interfaces.crashes import (
+    DBCrashes,
+    QUERY_GET_OR_INSERT_CRASH,
+)
+from crash_analyzer.app.database.errors import DatabaseError
+from crash_analyzer.tests.helpers import FakeCursor, arango_error, make_crash
+
+
+def query_error(error_code):
+    return arango_error(AQLQueryExecuteError, error_code)
+
+
+class ScriptedAQL:
+
+    """Returns results (or raises errors) in given order"""
+
+    def __init__(self, results):
+        self._results = list(results)
+        self.queries = []
+
+    async def execute(self, query, bind_vars):
+        self.queries.append(query)
+        result = self._results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return FakeCursor(result)
+
+
+def make_crashes(results):
+    crashes = DBCrashes.__new__(DBCrashes)
+    crashes._col_crashes = SimpleNamespace(name="Crashes")
+    aql = ScriptedAQL(results)
+    crashes._db = SimpleNamespace(_db=SimpleNamespace(aql=aql))
+    return crashes, aql
+
+
+def stored(key="1"):
+    return {"_key": key, **make_crash().dict(exclude={"key"})}
+
+
+@pytest.mark.asyncio
+async def test_get_or_insert_single_query():
+
+    crashes, aql = make_crashes([{"doc": stored(), "existed": False}])
+
+    crash, existed = await crashes.get_or_insert(make_crash())
+    assert crash.key == "1" and not existed
+    assert aql.queries == [QUERY_GET_OR_INSERT_CRASH]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_insert_retried_once():
+
+    crashes, aql = make_crashes(
+        [query_error(UNIQUE_CONSTRAINT_VIOLATED), {"doc": stored("2"), "existed": True}]
+    )
+
+    crash, existed = await crashes.get_or_insert(make_crash())
+    assert crash.key == "2" and existed
+    assert len(aql.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_repeated_violation_not_retried_again():
+
+    error = query_error(UNIQUE_CONSTRAINT_VIOLATED)
+    crashes, aql = make_crashes([error, error])
+
+    with pytest.raises(DatabaseError):
+        await crashes.get_or_insert(make_crash())
+    assert len(aql.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_other_errors_not_retried():
+
+    crashes, aql = make_crashes([query_error(1)])
+
+    with pytest.raises(DatabaseError):
+        await crashes.get_or_insert(make_crash())
+    assert len(aql.queries) == 1
@@ -0,0 +1,148 @@
+import pytest
+from aioarangodb.errno import UNIQUE_CONSTRAINT_VIOLATED
+from aioarangodb.exceptions import IndexCreateError
+
+from crash_analyzer.app.database.arangodb.initializer import ArangoDBInitializer
+from crash_analyzer.app.database.errors import DatabaseError
+from crash_analyzer.app.settings import CollectionSettings
+from crash_analyzer.tests.helpers import FakeCursor, arango_error
+
+UNIQUE_HASH_FIELDS = ["fuzzer_id", "fuzzer_rev", "unique_hash"]
+
+
+class FakeCollection:
+    name = "Crashes"
+
+    def __init__(self, indexes, error_code=None):
+        self._error_code = error_code
+        self._indexes = [{"id": "0", "name": "primary", "type": "primary", "fields": ["_key"]}]
+        self._indexes.extend(indexes)
+        self.created = []
+        self.deleted = []
+
+    async def indexes(self):
+        return list(self._indexes)
+
+    async def add_persistent_index(self, fields, unique, sparse, name, in_background):
+        if self._error_code is not None:
+            raise arango_error(IndexCreateError, self._error_code)
+
+        self.created.append(name)
+        index = {"id": name, "name": name, "type": "persistent"}
+        index.update(fields=fields, unique=unique, sparse=sparse)
+        self._indexes.append(index)
+
+    async def delete_index(self, index_id):
+        self.deleted.append(index_id)
+        self._indexes = [i for i in self._indexes if i["id"] != index_id]
+
+
+class FakeAQL:
+    def __init__(self, result):
+        self._result = result
+        self.queries = []
+
+    async def execute(self, query, bind_vars):
+        self.queries.append(bind_vars)
+        return FakeCursor(self._result)
+
+
+class FakeDatabase(dict):
+    def __init__(self, collections, query_result=None):
+        super().__init__(collections)
+        self.aql = FakeAQL(query_result)
+
+
+def make_initializer(indexes, error_code=None, query_result=None, rebuild=False):
+    initializer = ArangoDBInitializer()
+    initializer._collections = CollectionSettings()
+    initializer._rebuild_drifted_indexes = rebuild
+    collection = FakeCollection(indexes, error_code)
+    initializer._db = FakeDatabase(
+        {initializer._collections.crashes: collection}, query_result
+    )
+    return initializer, collection
+
+
+def persistent_index(name, fields, unique):
+    return {
+        "id": f"id-{name}",
+        "name": name,
+        "type": "persistent",
+        "fields": fields,
+        "unique": unique,
+        "sparse": False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_missing_index_created():
+    initializer, collection = make_initializer([])
+    await initializer._add_indexes()
+    assert collection.created == ["crashes_unique_hash"]
+
+
+@pytest.mark.asyncio
+async def test_matching_index_kept():
+    index = persistent_index("crashes_unique_hash", UNIQUE_HASH_FIELDS, True)
+    initializer, collection = make_initializer([index])
+    await initializer._add_indexes()
+    assert collection.created == [] and collection.deleted == []
+
+
+@pytest.mark.asyncio
+async def test_unnamed_index_adopted():
+    index = persistent_index("idx_1720", UNIQUE_HASH_FIELDS, True)
+    initializer, collection = make_initializer([index])
+    await initializer._add_indexes()
+    assert collection.created == [] and collection.deleted == []
+
+
+@pytest.mark.asyncio
+async def test_drifted_index_fails():
+    index = persistent_index("crashes_unique_hash", UNIQUE_HASH_FIELDS, False)
+    initializer, collection = make_initializer([index])
+
+    with pytest.raises(DatabaseError):
+        await initializer._add_indexes()
+
+    assert collection.created == [] and collection.deleted == []
+
+
+@pytest.mark.asyncio
+async def test_drifted_index_recreated_when_allowed():
+    index = persistent_index("crashes_unique_hash", UNIQUE_HASH_FIELDS, False)
+    initializer, collection = make_initializer([index], rebuild=True)
+    await initializer._add_indexes()
+    assert collection.deleted == ["id-crashes_unique_hash"]
+    assert collection.created == ["crashes_unique_hash"]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_reported_on_unique_index_conflict():
+    duplicates = {
+        "total": 2,
+        "sample": [{"key": ["fuzzer", "rev", "hash"], "count": 3}],
+    }
+    initializer, _ = make_initializer(
+        [], UNIQUE_CONSTRAINT_VIOLATED, duplicates
+    )
+
+    with pytest.raises(DatabaseError) as exc:
+        await initializer._add_indexes()
+
+    msg = str(exc.value)
+    assert "has 2 groups" in msg
+    assert "['fuzzer', 'rev', 'hash'] x3" in msg
+    assert "Remove duplicates" in msg
+    assert initializer._db.aql.queries[0]["fields"] == UNIQUE_HASH_FIELDS
+
+
+@pytest.mark.asyncio
+async def test_other_index_errors_not_analyzed():
+    initializer, _ = make_initializer([], error_code=1)
+
+    with pytest.raises(DatabaseError):
+        await initializer._add_indexes()
+
+    assert initializer._db.aql.queries == []
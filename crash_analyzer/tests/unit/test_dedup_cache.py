@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from crash_analyzer.tests.helpers import make_crash, make_dedup_cache, sample
+
+
+@pytest.mark.asyncio
+async def test_duplicates_answered_from_cache():
+
+    cache, crashes = make_dedup_cache()
+    hits = sample("crash_analyzer_dedup_cache_hits_total")
+
+    crash, existed = await cache.get_or_insert(make_crash())
+    assert not existed
+
+    for _ in range(5):
+        dup, existed = await cache.get_or_insert(make_crash())
+        assert existed and dup.key == crash.key
+
+    assert crashes.calls == {"get_or_insert": 1}
+    assert sample("crash_analyzer_dedup_cache_hits_total") - hits == 5
+
+
+@pytest.mark.asyncio
+async def test_insert_written_through():
+
+    cache, crashes = make_dedup_cache()
+    await cache.insert(make_crash())
+
+    assert await cache.get_by_hash("fuzzer", "rev", "h1") is not None
+    assert "get_by_hash" not in crashes.calls
+
+
+@pytest.mark.asyncio
+async def test_misses_not_cached():
+
+    cache, crashes = make_dedup_cache()
+    assert await cache.get_by_hash("fuzzer", "rev", "h1") is None
+    assert await cache.get_by_hash("fuzzer", "rev", "h1") is None
+    assert crashes.calls["get_by_hash"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_by_count():
+
+    cache, crashes = make_dedup_cache(max_entries=2)
+    evictions = sample("crash_analyzer_dedup_cache_evictions_total", {"reason": "size"})
+
+    for h in ["h1", "h2"]:
+        await cache.insert(make_crash(h))
+
+    await cache.get_by_hash("fuzzer", "rev", "h1")  # h2 becomes LRU
+    await cache.insert(make_crash("h3"))
+
+    assert len(cache) == 2
+    await cache.get_by_hash("fuzzer", "rev", "h1")
+    await cache.get_by_hash("fuzzer", "rev", "h3")
+    assert "get_by_hash" not in crashes.calls
+
+    await cache.get_by_hash("fuzzer", "rev", "h2")
+    assert crashes.calls["get_by_hash"] == 1
+
+    delta = sample("crash_analyzer_dedup_cache_evictions_total", {"reason": "size"}) - evictions
+    assert delta == 2
+
+
+@pytest.mark.asyncio
+async def test_eviction_by_size():
+
+    cache, _ = make_dedup_cache(max_bytes=1)
+    await cache.insert(make_crash())
+
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry():
+
+    cache, crashes = make_dedup_cache(ttl=0.01)
+    await cache.insert(make_crash())
+    time.sleep(0.02)
+
+    await cache.get_by_hash("fuzzer", "rev", "h1")
+    assert crashes.calls["get_by_hash"] == 1
+
+
+@pytest.mark.asyncio
+async def test_new_revision_does_not_see_old_entries():
+
+    cache, crashes = make_dedup_cache()
+    crash = make_crash()
+    await cache.insert(crash)
+
+    new_revision = make_crash(fuzzer_rev="rev2")
+
+    assert await cache.get_by_hash("fuzzer", "rev2", "h1") is None
+    assert crashes.calls["get_by_hash"] == 1
+
+    _, existed = await cache.get_or_insert(new_revision)
+    assert not existed
+    assert (await cache.get_by_hash("fuzzer", "rev", "h1")).key == crash.key
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_hash_queries_only_misses():
+
+    cache, crashes = make_dedup_cache()
+    await cache.insert(make_crash("h1"))
+    await crashes.insert(make_crash("h2"))
+
+    keys = [("fuzzer", "rev", h) for h in ["h1", "h2", "h3"]]
+    found = await cache.get_many_by_hash(keys)
+
+    assert sorted(k[2] for k in found) == ["h1", "h2"]
+    assert crashes.calls["get_many_by_hash"] == 1
+
+    # Found crash is cached now
+    found = await cache.get_many_by_hash(keys[:2])
+    assert len(found) == 2
+    assert crashes.calls["get_many_by_hash"] == 1
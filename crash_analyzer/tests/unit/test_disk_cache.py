@@ -0,0 +1,228 @@
+from botocore.exceptions import ClientError
+from types import SimpleNamespace
+import threading
+import pytest
+import os
+
+from crash_analyzer.app.object_storage.disk_cache import (
+    CachingDownload,
+    DiskCache,
+    FileDownload,
+)
+from crash_analyzer.app.object_storage.storage import ObjectStorage, StreamingDownload
+from crash_analyzer.tests.helpers import FakeBody, make_storage
+
+
+def make_cache(tmp_path, max_bytes=1024 * 1024):
+    cache = DiskCache(SimpleNamespace(path=str(tmp_path), max_bytes=max_bytes))
+    cache.evict()
+    return cache
+
+
+def put(cache: DiskCache, key: str, data: bytes, etag="etag"):
+    writer = cache.writer("bucket", key, etag)
+    writer.write(data)
+    writer.commit()
+
+
+def read(cache: DiskCache, key: str):
+    cached = cache.open("bucket", key)
+    if cached is None:
+        return None
+    with cached.file:
+        return cached.etag, cached.file.read()
+
+
+def test_committed_object_is_readable(tmp_path):
+
+    cache = make_cache(tmp_path)
+    put(cache, "a", b"data", etag="v1")
+
+    assert read(cache, "a") == ("v1", b"data")
+    assert read(cache, "b") is None
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_same_content_stored_once(tmp_path):
+
+    cache = make_cache(tmp_path)
+    put(cache, "a", b"data")
+    put(cache, "b", b"data")
+
+    assert len(os.listdir(tmp_path / "blobs")) == 1
+    assert read(cache, "b") == ("etag", b"data")
+
+
+def test_aborted_object_is_not_visible(tmp_path):
+
+    cache = make_cache(tmp_path)
+    writer = cache.writer("bucket", "a", "etag")
+    writer.write(b"data")
+    writer.abort()
+
+    assert read(cache, "a") is None
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_least_recently_used_evicted(tmp_path):
+
+    cache = make_cache(tmp_path, max_bytes=2500)
+    put(cache, "a", b"a" * 1000)
+    put(cache, "b", b"b" * 1000)
+
+    # Make all files old, then use "a"
+    for directory in ["blobs", "keys"]:
+        for name in os.listdir(tmp_path / directory):
+            os.utime(tmp_path / directory / name, (1, 1))
+    read(cache, "a")
+
+    put(cache, "c", b"c" * 1000)
+
+    assert read(cache, "a") is not None
+    assert read(cache, "b") is None
+    assert read(cache, "c") is not None
+    assert cache.size <= 2500
+
+
+def test_cache_size_restored_on_start(tmp_path):
+
+    put(make_cache(tmp_path), "a", b"a" * 1000)
+    assert make_cache(tmp_path).size > 1000
+
+
+@pytest.mark.asyncio
+async def test_caching_download_commits_at_end(tmp_path):
+
+    cache = make_cache(tmp_path)
+    data = os.urandom(10000)
+
+    stream = await StreamingDownload.create({"Body": FakeBody(data)}, 4096)
+    download = CachingDownload(stream, cache.writer("bucket", "a", "etag"))
+    buffer = bytearray(4096)
+    result = bytearray()
+
+    while True:
+        size = await download.readinto(buffer)
+        if size == 0:
+            break
+        result += buffer[:size]
+
+    assert result == data
+    assert read(cache, "a") == ("etag", data)
+
+
+@pytest.mark.asyncio
+async def test_partial_download_not_cached(tmp_path):
+
+    cache = make_cache(tmp_path)
+    stream = await StreamingDownload.create({"Body": FakeBody(b"x" * 10000)}, 4096)
+    download = CachingDownload(stream, cache.writer("bucket", "a", "etag"))
+
+    await download.__anext__()
+    del download
+
+    assert read(cache, "a") is None
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+@pytest.mark.asyncio
+async def test_commit_leaves_event_loop(tmp_path):
+
+    cache = make_cache(tmp_path, max_bytes=100)
+    threads = []
+    evict = cache.evict
+
+    def record_evict():
+        threads.append(threading.current_thread())
+        evict()
+
+    cache.evict = record_evict
+    stream = await StreamingDownload.create({"Body": FakeBody(b"x" * 1000)}, 4096)
+    download = CachingDownload(stream, cache.writer("bucket", "a", "etag"))
+
+    async for _ in download:
+        pass
+
+    assert threads and threading.main_thread() not in threads
+
+
+class RecordingFile:
+
+    def __init__(self, file):
+        self.file = file
+        self.threads = []
+
+    def read(self, size):
+        self.threads.append(threading.current_thread())
+        return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+
+
+@pytest.mark.asyncio
+async def test_cached_file_read_outside_event_loop(tmp_path):
+
+    cache = make_cache(tmp_path)
+    put(cache, "a", b"data")
+
+    file = RecordingFile(cache.open("bucket", "a").file)
+    download = FileDownload(file, 2)
+
+    assert b"".join([chunk async for chunk in download]) == b"data"
+    assert file.threads and threading.main_thread() not in file.threads
+
+
+def test_failed_write_keeps_original_error(tmp_path):
+
+    cache = make_cache(tmp_path)
+    path = str(tmp_path / "missing" / "key")
+
+    # Temporary file is removed, error of rename is not replaced
+    with pytest.raises(FileNotFoundError) as e:
+        cache._write_atomic(path, b"data")
+
+    assert e.value.filename == path or e.value.filename2 == path
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+class FakeClient:
+
+    def __init__(self, data: bytes, etag: str):
+        self.data = data
+        self.etag = etag
+        self.requests = []
+
+    async def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.requests.append(IfNoneMatch)
+        if IfNoneMatch == self.etag:
+            error = {"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}
+            raise ClientError(error, "GetObject")
+        return {"Body": FakeBody(self.data), "ETag": self.etag}
+
+
+def make_cached_storage(tmp_path, client):
+    storage = make_storage(client)
+    storage._input_cache = make_cache(tmp_path)
+    return storage
+
+
+async def download(storage: ObjectStorage):
+    stream = await storage._download_cached("bucket", "a", 4096)
+    return type(stream), b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_download_validated_by_etag(tmp_path):
+
+    client = FakeClient(b"data", '"v1"')
+    storage = make_cached_storage(tmp_path, client)
+
+    assert await download(storage) == (CachingDownload, b"data")
+    assert await download(storage) == (FileDownload, b"data")
+
+    client.data, client.etag = b"changed", '"v2"'
+    assert await download(storage) == (CachingDownload, b"changed")
+    assert await download(storage) == (FileDownload, b"changed")
+
+    assert client.requests == [None, '"v1"', '"v1"', '"v2"']
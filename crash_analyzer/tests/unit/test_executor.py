@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from crash_analyzer.app.agents import UnsupportedEngineError, parse_crash
+from crash_analyzer.app.executor.errors import ExecutorError
+from crash_analyzer.app.executor.executors import create_executor
+from crash_analyzer.app.settings import ExecutorSettings
+from crash_analyzer.tests.corpus import load_corpus
+
+
+def make_settings(mode: str, **kwargs):
+    values = dict(workers=2, max_pending=4, max_tasks_per_worker=0, timeout_ms=60000)
+    values.update(kwargs)
+    return ExecutorSettings(mode=mode, **values)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["sync", "thread", "process"])
+async def test_parse_crash_in_executor(mode):
+
+    executor = create_executor(make_settings(mode))
+    corpus = load_corpus()
+
+    try:
+        results = await asyncio.gather(
+            *[
+                executor.run(parse_crash, r.engine, r.lang, r.crash_dict())
+                for r in corpus
+            ]
+        )
+    finally:
+        await executor.close()
+
+    assert results == [(r.brief, r.unique_hash) for r in corpus]
+
+
+@pytest.mark.asyncio
+async def test_process_errors_propagated():
+
+    executor = create_executor(make_settings("process"))
+
+    try:
+        with pytest.raises(UnsupportedEngineError):
+            await executor.run(parse_crash, "unknown", "cpp", {})
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_killed_worker_fails_task():
+
+    executor = create_executor(make_settings("process", timeout_ms=1000))
+
+    try:
+        sleeping = asyncio.ensure_future(executor.run(time.sleep, 30))
+        with pytest.raises(ExecutorError):
+            await executor.run(os._exit, 1)
+
+        # Task of replaced pool fails too, new tasks run in new pool
+        with pytest.raises(ExecutorError):
+            await asyncio.wait_for(sleeping, 1)
+        assert await executor.run(os.getpid) != os.getpid()
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_process_workers_recycled():
+
+    settings = make_settings("process", workers=1, max_tasks_per_worker=1)
+    executor = create_executor(settings)
+
+    try:
+        pids = [await executor.run(os.getpid) for _ in range(3)]
+    finally:
+        await executor.close()
+
+    assert len(set(pids)) == 3
+
+
+@pytest.mark.asyncio
+async def test_pending_calls_bounded():
+
+    executor = create_executor(make_settings("thread", workers=4, max_pending=2))
+    running = 0
+    max_running = 0
+
+    def task():
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        time.sleep(0.05)
+        running -= 1
+
+    try:
+        await asyncio.gather(*[executor.run(task) for _ in range(8)])
+    finally:
+        await executor.close()
+
+    assert max_running <= 2
+
+
+@pytest.mark.asyncio
+async def test_closed_executor_rejects_calls():
+
+    executor = create_executor(make_settings("sync"))
+    await executor.close()
+
+    with pytest.raises(ExecutorError):
+        await executor.run(os.getpid)
@@ -0,0 +1,66 @@
+import pytest
+
+from crash_analyzer.tests.helpers import make_crash, make_input_index, sample
+
+
+@pytest.mark.asyncio
+async def test_inputs_of_duplicates_indexed():
+
+    index, crashes = make_input_index()
+    hits = sample("crash_analyzer_input_index_hits_total")
+
+    crash, _ = await index.get_or_insert(make_crash(input_hash="i1"))
+    dup, existed = await index.get_or_insert(make_crash(input_hash="i2"))
+    assert existed and dup.key == crash.key
+
+    for input_hash in ["i1", "i2"]:
+        found = await index.get_by_input_hash("fuzzer", "rev", input_hash)
+        assert found.key == crash.key
+
+    assert crashes.calls == {"get_or_insert": 2}
+    assert sample("crash_analyzer_input_index_hits_total") - hits == 2
+
+
+@pytest.mark.asyncio
+async def test_inputs_not_seen_by_process_missed():
+
+    index, crashes = make_input_index()
+    await crashes.insert(make_crash(input_hash="i1"))
+    misses = sample("crash_analyzer_input_index_misses_total")
+
+    # Crash stored by another replica: its input is analyzed again
+    assert await index.get_by_input_hash("fuzzer", "rev", "i1") is None
+    assert crashes.calls == {"insert": 1}
+
+    await index.get_or_insert(make_crash(input_hash="i2"))
+    assert await index.get_by_input_hash("fuzzer", "other", "i2") is None
+    assert sample("crash_analyzer_input_index_misses_total") - misses == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_evicted():
+
+    index, _ = make_input_index(max_entries=2)
+
+    for input_hash in ["i1", "i2", "i3", "i4"]:
+        await index.get_or_insert(make_crash(input_hash=input_hash))
+
+    assert len(index) == 2
+    assert sample("crash_analyzer_input_index_entries") == 2
+
+    assert await index.get_by_input_hash("fuzzer", "rev", "i2") is None
+    assert (await index.get_by_input_hash("fuzzer", "rev", "i4")).unique_hash == "h1"
+
+
+@pytest.mark.asyncio
+async def test_updated_crash_replaced():
+
+    index, _ = make_input_index()
+    crash, _ = await index.get_or_insert(make_crash(input_hash="i1"))
+
+    crash = crash.copy()
+    crash.unique_hash = "h2"
+    await index.update(crash)
+
+    assert (await index.get_by_input_hash("fuzzer", "rev", "i1")).unique_hash == "h2"
+
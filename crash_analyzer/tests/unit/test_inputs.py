@@ -0,0 +1,35 @@
+from hashlib import sha256
+import os
+
+from crash_analyzer.app.inputs import InputDigest
+
+
+def test_chunked_digest_matches_whole_input():
+
+    data = os.urandom(100 * 1024 + 7)
+    digest = InputDigest(preview_max_size=1024)
+
+    for i in range(0, len(data), 4096):
+        digest.update(data[i : i + 4096])
+
+    assert digest.hash == sha256(data).hexdigest()
+    assert digest.preview == data[:1024]
+    assert digest.size == len(data)
+
+
+def test_preview_spanning_chunks():
+
+    digest = InputDigest(preview_max_size=5)
+    for chunk in [b"ab", b"cd", b"efgh"]:
+        digest.update(chunk)
+
+    assert digest.preview == b"abcde"
+
+
+def test_input_shorter_than_preview():
+
+    digest = InputDigest(preview_max_size=1024)
+    digest.update(b"abc")
+
+    assert digest.preview == b"abc"
+    assert digest.hash == sha256(b"abc").hexdigest()
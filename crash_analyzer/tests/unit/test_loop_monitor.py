@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+import logging
+import asyncio
+import time
+
+import pytest
+
+from crash_analyzer.app.loop_monitor import LoopMonitor, annotate_task
+
+
+def block_loop(seconds: float):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_blocking_task_reported(caplog):
+
+    settings = SimpleNamespace(interval_ms=10, slow_callback_ms=100)
+    monitor = LoopMonitor(settings)
+    monitor.start()
+
+    with caplog.at_level(logging.WARNING, logger="loop"):
+        with annotate_task(fuzzer_id="fuzzer-1", engine="libfuzzer"):
+            await asyncio.sleep(0.05)
+            block_loop(0.4)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    reports = [r.getMessage() for r in caplog.records]
+    assert len(reports) == 1
+    assert "fuzzer_id=fuzzer-1 engine=libfuzzer" in reports[0]
+    assert "block_loop" in reports[0]
+
+
+@pytest.mark.asyncio
+async def test_no_reports_for_fast_callbacks(caplog):
+
+    settings = SimpleNamespace(interval_ms=10, slow_callback_ms=200)
+    monitor = LoopMonitor(settings)
+    monitor.start()
+
+    with caplog.at_level(logging.WARNING, logger="loop"):
+        for _ in range(10):
+            block_loop(0.01)
+            await asyncio.sleep(0.01)
+        await monitor.stop()
+
+    assert caplog.records == []
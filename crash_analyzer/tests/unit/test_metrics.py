@@ -0,0 +1,30 @@
+import pytest
+
+from crash_analyzer.app.metrics import measure_stage
+from crash_analyzer.tests.helpers import sample
+
+
+def test_stage_duration_observed():
+
+    labels = {"stage": "test", "engine": "libfuzzer", "lang": "cpp"}
+    count = sample("crash_analyzer_stage_duration_seconds_count", labels)
+
+    with measure_stage("test", "libfuzzer", "cpp"):
+        pass
+
+    assert sample("crash_analyzer_stage_duration_seconds_count", labels) == count + 1
+    assert sample("crash_analyzer_stage_errors_total", labels) == 0
+
+
+def test_failed_stage_counted():
+
+    labels = {"stage": "test", "engine": "afl", "lang": "rust"}
+    errors = sample("crash_analyzer_stage_errors_total", labels)
+    count = sample("crash_analyzer_stage_duration_seconds_count", labels)
+
+    with pytest.raises(RuntimeError):
+        with measure_stage("test", "afl", "rust"):
+            raise RuntimeError()
+
+    assert sample("crash_analyzer_stage_errors_total", labels) == errors + 1
+    assert sample("crash_analyzer_stage_duration_seconds_count", labels) == count + 1
@@ -0,0 +1,53 @@
+import random
+import re
+
+import pytest
+
+from crash_analyzer.app.agents import libfuzzer, parse_crash
+from crash_analyzer.app.agents.normalizer import NormalizationRule, OutputNormalizer
+from crash_analyzer.tests.corpus import load_corpus
+
+
+def legacy_clean_generic_output(output: str) -> str:
+    """Four-pass cleaner the normalizer has replaced. Kept as a reference"""
+    cleaned = libfuzzer.truncate_llvm_log(output)
+    cleaned = re.sub(r"==\d+==", "==??==", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"([^\w+])0x[0-9a-f]+", r"\g<1>0x??", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"(\s)(?!0x)\d+", r"\g<1>??", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"thread T\d+", "thread T?", cleaned, flags=re.IGNORECASE)
+    return cleaned
+
+
+@pytest.mark.parametrize("recorded", load_corpus(), ids=lambda r: r.name)
+def test_parity_on_recorded_corpus(recorded):
+    expected = legacy_clean_generic_output(recorded.output)
+    assert libfuzzer._clean_generic_output(recorded.output) == expected
+
+
+@pytest.mark.parametrize("recorded", load_corpus(), ids=lambda r: r.name)
+def test_recorded_hashes_are_stable(recorded):
+    brief, unique_hash = parse_crash(
+        recorded.engine, recorded.lang, recorded.crash_dict()
+    )
+    assert brief == recorded.brief
+    assert unique_hash == recorded.unique_hash
+
+
+def test_parity_on_random_outputs():
+
+    tokens = [
+        "=", "==", "0", "1", "9", "0x", "0X", "x", "a", "F", "g", " ", "\t",
+        "\n", "+", "_", "?", "-", "#", "T", "thread T", "Thread t", "THREAD T",
+        "٣", "٠", "ſ", "K", "Running: ", "SUMMARY: ",
+    ]
+
+    rnd = random.Random(0)
+    for _ in range(20000):
+        text = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 40)))
+        expected = legacy_clean_generic_output(text)
+        assert libfuzzer._clean_generic_output(text) == expected, repr(text)
+
+
+def test_rules_with_groups_rejected():
+    with pytest.raises(ValueError):
+        OutputNormalizer([NormalizationRule("a", r"(b)", "c")])
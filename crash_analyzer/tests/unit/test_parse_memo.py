@@ -0,0 +1,85 @@
+from crash_analyzer.app.agents import parse_crash
+from crash_analyzer.app.agents.memo import ParseMemo, output_digest
+from crash_analyzer.app.models import EngineID, LangID
+from crash_analyzer.app.settings import ParseMemoSettings
+from crash_analyzer.tests.corpus import load_corpus
+from crash_analyzer.tests.helpers import sample
+
+
+def make_memo(max_entries=100, max_bytes=1024 * 1024):
+    return ParseMemo(ParseMemoSettings(max_entries=max_entries, max_bytes=max_bytes))
+
+
+def make_key(output, engine=EngineID.libfuzzer, lang=LangID.cpp):
+    return engine, lang, output_digest(output)
+
+
+def test_identical_outputs_parsed_once():
+
+    memo = make_memo()
+    hits = sample("crash_analyzer_parse_memo_hits_total")
+    misses = sample("crash_analyzer_parse_memo_misses_total")
+
+    for recorded in load_corpus():
+        key = make_key(recorded.output, recorded.engine, recorded.lang)
+        assert memo.get(key) is None
+
+        result = parse_crash(recorded.engine, recorded.lang, recorded.crash_dict(recorded.output))
+        memo.put(key, result)
+
+        same = make_key(recorded.output, recorded.engine, recorded.lang)
+        assert memo.get(same) == result
+
+    count = len(load_corpus())
+    assert sample("crash_analyzer_parse_memo_hits_total") - hits == count
+    assert sample("crash_analyzer_parse_memo_misses_total") - misses == count
+
+
+def test_key_depends_on_engine_lang_and_output():
+
+    memo = make_memo()
+    memo.put(make_key("output"), ("brief", "hash"))
+
+    assert memo.get(make_key("output ")) is None
+    assert memo.get(make_key("output", engine=EngineID.jazzer)) is None
+    assert memo.get(make_key("output", lang=LangID.rust)) is None
+    assert memo.get(make_key("output")) == ("brief", "hash")
+
+
+def test_digest_of_any_text():
+    assert output_digest("\ud800") != output_digest("")
+    assert len(output_digest("a" * 1000000)) == 32
+
+
+def test_least_recently_used_evicted():
+
+    memo = make_memo(max_entries=2)
+    evictions = sample("crash_analyzer_parse_memo_evictions_total")
+
+    memo.put(make_key("1"), (None, "1"))
+    memo.put(make_key("2"), (None, "2"))
+    memo.get(make_key("1"))
+    memo.put(make_key("3"), (None, "3"))
+
+    assert len(memo) == 2
+    assert memo.get(make_key("2")) is None
+    assert memo.get(make_key("1")) == (None, "1")
+    assert sample("crash_analyzer_parse_memo_evictions_total") - evictions == 1
+
+
+def test_memory_budget():
+
+    memo = make_memo(max_entries=1000, max_bytes=4096)
+    for i in range(100):
+        memo.put(make_key(str(i)), ("brief " * 10, f"hash{i}"))
+
+    assert 0 < len(memo) < 100
+    assert memo.size <= 4096
+    assert sample("crash_analyzer_parse_memo_size_bytes") == memo.size
+
+
+def test_disabled():
+    memo = make_memo(max_entries=0)
+    memo.put(make_key("1"), (None, "1"))
+    assert memo.get(make_key("1")) is None
+    assert memo.size == 0
@@ -0,0 +1,92 @@
+from aiohttp.test_utils import TestClient, TestServer
+from aiohttp import web
+import marshal
+import asyncio
+import pytest
+
+from crash_analyzer.app.profiling import admin_routes
+
+
+def busy_function():
+    return sum(i * i for i in range(200000))
+
+
+async def make_client():
+    app = web.Application()
+    app.add_routes(admin_routes())
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_cprofile_session():
+
+    client = await make_client()
+    try:
+        resp = await client.post("/admin/profile/start?mode=cprofile&duration=10")
+        assert resp.status == 200
+
+        busy_function()
+
+        resp = await client.get("/admin/profile/result?format=pstats")
+        assert resp.status == 400  # still running
+
+        assert (await client.post("/admin/profile/stop")).status == 200
+
+        resp = await client.get("/admin/profile/result?format=pstats")
+        stats = marshal.loads(await resp.read())
+        assert any(func[2] == "busy_function" for func in stats)
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_sampling_session_is_time_bounded():
+
+    client = await make_client()
+    try:
+        resp = await client.post("/admin/profile/start?mode=sampling&duration=0.3")
+        assert resp.status == 200
+
+        for _ in range(10):
+            busy_function()
+        await asyncio.sleep(0.4)
+
+        resp = await client.get("/admin/profile/result?format=collapsed")
+        assert resp.status == 200
+        assert "busy_function" in await resp.text()
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_invalid_requests():
+
+    client = await make_client()
+    try:
+        assert (await client.post("/admin/profile/stop")).status == 400
+        assert (await client.post("/admin/profile/start?mode=other")).status == 400
+        assert (await client.post("/admin/profile/start?duration=1e6")).status == 400
+        assert (await client.get("/admin/profile/result")).status == 400
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_tracemalloc_diff():
+
+    client = await make_client()
+    try:
+        resp = await client.post("/admin/tracemalloc/snapshot")
+        assert "Started" in await resp.text()
+
+        leak = [bytearray(1000) for _ in range(1000)]
+
+        resp = await client.post("/admin/tracemalloc/snapshot?limit=5")
+        assert "test_profiling.py" in await resp.text()
+        del leak
+
+        assert (await client.post("/admin/tracemalloc/stop")).status == 200
+    finally:
+        await client.close()
@@ -0,0 +1,78 @@
+import sys
+
+import pytest
+
+from crash_analyzer.app.agents import (
+    UnsupportedEngineError,
+    get_parser,
+    is_supported,
+    parse_crash,
+    register_parser,
+)
+from crash_analyzer.app.agents import registry
+from crash_analyzer.app.agents.afl import AflParser
+from crash_analyzer.app.agents.libfuzzer import GoFuzzParser, LibfuzzerParser
+from crash_analyzer.app.models import EngineID, LangID
+
+
+class FakeParser(LibfuzzerParser):
+    def parse_crash(self, lang, crash_dict):
+        return "fake", crash_dict["output"]
+
+
+@pytest.fixture
+def restore_registry():
+    paths = dict(registry._paths)
+    parsers = dict(registry._parsers)
+    yield
+    registry._paths.clear()
+    registry._paths.update(paths)
+    registry._parsers.clear()
+    registry._parsers.update(parsers)
+
+
+def test_every_engine_dispatched():
+
+    for engine in EngineID:
+        if engine == EngineID.sharpfuzz_libfuzzer:
+            assert not is_supported(engine)
+            continue
+
+        parser = get_parser(engine)
+        assert get_parser(engine) is parser
+        if EngineID.is_afl(engine):
+            assert isinstance(parser, AflParser)
+            assert parser.stacktrace_reader() is None
+        else:
+            assert isinstance(parser, LibfuzzerParser)
+            assert parser.stacktrace_reader() is not None
+
+    assert isinstance(get_parser(EngineID.go_fuzz_libfuzzer), GoFuzzParser)
+
+
+def test_unsupported_engine_fails_fast():
+
+    crash = {"type": "crash", "input": "", "output": "", "reproduced": True}
+    with pytest.raises(UnsupportedEngineError):
+        parse_crash(EngineID.sharpfuzz_libfuzzer, LangID.cpp, crash)
+
+
+def test_parser_registered_by_class(restore_registry):
+
+    register_parser(EngineID.sharpfuzz_libfuzzer, f"{__name__}:FakeParser")
+    assert is_supported(EngineID.sharpfuzz_libfuzzer)
+
+    crash = {"type": "crash", "input": "", "output": "hash", "reproduced": True}
+    assert parse_crash(EngineID.sharpfuzz_libfuzzer, LangID.cpp, crash) == ("fake", "hash")
+
+
+def test_module_imported_on_first_use(restore_registry, monkeypatch):
+
+    module = "crash_analyzer.tests.unit.lazy_parser"
+    monkeypatch.delitem(sys.modules, module, raising=False)
+
+    register_parser(EngineID.sharpfuzz_libfuzzer, f"{module}:LazyParser")
+    assert module not in sys.modules
+
+    with pytest.raises(ModuleNotFoundError):
+        get_parser(EngineID.sharpfuzz_libfuzzer)
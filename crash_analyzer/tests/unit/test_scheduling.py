@@ -0,0 +1,159 @@
+from types import SimpleNamespace
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from crash_analyzer.app.message_queue.scheduling import FairScheduler
+
+
+def make_scheduler(
+    max_in_flight=1, tenant_max_in_flight=1, weights=None, tenant_idle_ttl=60
+):
+    settings = SimpleNamespace(
+        max_in_flight=max_in_flight,
+        tenant_max_in_flight=tenant_max_in_flight,
+        default_weight=1.0,
+        weights=weights or {},
+        tenant_idle_ttl=tenant_idle_ttl,
+    )
+    return FairScheduler(settings)
+
+
+async def run_all(scheduler, tenants, order, hold=0.001):
+
+    async def process(tenant):
+        async with scheduler.slot(tenant):
+            order.append(tenant)
+            await asyncio.sleep(hold)
+
+    await asyncio.gather(*[process(t) for t in tenants])
+
+
+@pytest.mark.asyncio
+async def test_storm_of_one_tenant_does_not_delay_others():
+
+    scheduler = make_scheduler()
+    order = []
+
+    # Noisy tenant has sent lots of messages before others
+    tenants = ["noisy"] * 50 + ["quiet-1", "quiet-2"]
+    await run_all(scheduler, tenants, order)
+
+    assert order.index("quiet-1") <= 3
+    assert order.index("quiet-2") <= 3
+    assert scheduler.in_flight == 0 and scheduler.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_slots_shared_by_weight():
+
+    scheduler = make_scheduler(weights={"heavy": 3})
+    order = []
+
+    await run_all(scheduler, ["heavy"] * 30 + ["light"] * 30, order)
+
+    # While both tenants are busy, heavy gets 3 slots for each of light.
+    # First heavy message is started before light ones arrive
+    first = order[1:21]
+    assert first.count("heavy") == 15
+    assert first.count("light") == 5
+
+
+@pytest.mark.asyncio
+async def test_tenant_in_flight_cap():
+
+    scheduler = make_scheduler(max_in_flight=10, tenant_max_in_flight=2)
+    running = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def process(tenant):
+        async with scheduler.slot(tenant):
+            running[tenant] += 1
+            peak[tenant] = max(peak[tenant], running[tenant])
+            await asyncio.sleep(0.005)
+            running[tenant] -= 1
+
+    await asyncio.gather(*[process(t) for t in ["a"] * 10 + ["b"] * 10])
+    assert peak == {"a": 2, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_nothing():
+
+    scheduler = make_scheduler()
+    await scheduler.acquire("a")
+
+    waiter = asyncio.ensure_future(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    assert scheduler.pending == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.pending == 0
+    scheduler.release("a")
+    assert scheduler.in_flight == 0
+
+    await asyncio.wait_for(scheduler.acquire("c"), 1)
+    scheduler.release("c")
+
+
+@pytest.mark.asyncio
+async def test_metrics():
+
+    scheduler = make_scheduler(tenant_idle_ttl=0.05)
+    waits = REGISTRY.get_sample_value(
+        "crash_analyzer_tenant_wait_seconds_count", {"tenant": "metered"}
+    ) or 0
+
+    await scheduler.acquire("other")
+    waiter = asyncio.ensure_future(scheduler.acquire("metered"))
+    await asyncio.sleep(0)
+
+    depth = REGISTRY.get_sample_value(
+        "crash_analyzer_tenant_queue_depth", {"tenant": "metered"}
+    )
+    assert depth == 1
+
+    scheduler.release("other")
+    await waiter
+
+    assert REGISTRY.get_sample_value(
+        "crash_analyzer_tenant_wait_seconds_count", {"tenant": "metered"}
+    ) == waits + 1
+    assert REGISTRY.get_sample_value(
+        "crash_analyzer_tenant_queue_depth", {"tenant": "metered"}
+    ) == 0
+
+    # Series of idle tenant are kept until it has been idle for ttl
+    scheduler.release("metered")
+    assert REGISTRY.get_sample_value(
+        "crash_analyzer_tenant_in_flight", {"tenant": "metered"}
+    ) == 0
+
+    await asyncio.sleep(0.1)
+    async with scheduler.slot("other"):
+        pass
+
+    for name in [
+        "crash_analyzer_tenant_wait_seconds_count",
+        "crash_analyzer_tenant_queue_depth",
+        "crash_analyzer_tenant_in_flight",
+    ]:
+        assert REGISTRY.get_sample_value(name, {"tenant": "metered"}) is None
+
+
+@pytest.mark.asyncio
+async def test_idle_tenant_forgotten_after_ttl():
+
+    scheduler = make_scheduler(tenant_idle_ttl=0.05)
+
+    await run_all(scheduler, ["a"], [])
+    await run_all(scheduler, ["b"], [])
+    assert set(scheduler._tenants) == {"a", "b"}
+
+    await asyncio.sleep(0.1)
+    await run_all(scheduler, ["b"], [])
+    assert set(scheduler._tenants) == {"b"}
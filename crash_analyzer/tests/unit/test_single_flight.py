@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from crash_analyzer.app.database.single_flight import SingleFlightCrashes
+from crash_analyzer.tests.helpers import make_crash, sample
+from crash_analyzer.tests.memory_db import MemoryCrashes
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_or_insert_single_query():
+
+    crashes = MemoryCrashes(latency=0.01)
+    single_flight = SingleFlightCrashes(crashes)
+    labels = {"method": "get_or_insert"}
+    shared = sample("crash_analyzer_dedup_single_flight_shared_total", labels)
+
+    results = await asyncio.gather(
+        *[single_flight.get_or_insert(make_crash(input_hash=str(i))) for i in range(10)]
+    )
+
+    assert crashes.calls == {"get_or_insert": 1}
+    assert [existed for _, existed in results].count(False) == 1
+    assert len({crash.key for crash, _ in results}) == 1
+    assert single_flight.in_flight == 0
+    assert sample("crash_analyzer_dedup_single_flight_shared_total", labels) - shared == 9
+
+
+@pytest.mark.asyncio
+async def test_different_hashes_not_coalesced():
+
+    crashes = MemoryCrashes(latency=0.01)
+    single_flight = SingleFlightCrashes(crashes)
+
+    results = await asyncio.gather(
+        single_flight.get_or_insert(make_crash("h1")),
+        single_flight.get_or_insert(make_crash("h2")),
+    )
+
+    assert crashes.calls == {"get_or_insert": 2}
+    assert not any(existed for _, existed in results)
+
+
+@pytest.mark.asyncio
+async def test_sequential_lookups_not_coalesced():
+
+    crashes = MemoryCrashes()
+    single_flight = SingleFlightCrashes(crashes)
+
+    _, existed = await single_flight.get_or_insert(make_crash())
+    assert not existed
+    _, existed = await single_flight.get_or_insert(make_crash())
+    assert existed
+
+    assert crashes.calls == {"get_or_insert": 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_by_hash():
+
+    crashes = MemoryCrashes(latency=0.01)
+    single_flight = SingleFlightCrashes(crashes)
+    await crashes.insert(make_crash())
+
+    results = await asyncio.gather(
+        *[single_flight.get_by_hash("fuzzer", "rev", "h1") for _ in range(5)]
+    )
+
+    assert all(crash.key == results[0].key for crash in results)
+    assert crashes.calls["get_by_hash"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others():
+
+    crashes = MemoryCrashes(latency=0.05)
+    single_flight = SingleFlightCrashes(crashes)
+
+    first = asyncio.ensure_future(single_flight.get_or_insert(make_crash()))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(single_flight.get_or_insert(make_crash()))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    crash, existed = await second
+
+    assert existed and crash.key is not None
+    assert crashes.calls == {"get_or_insert": 1}
+
+
+@pytest.mark.asyncio
+async def test_errors_shared_and_not_remembered():
+
+    class FailingCrashes(MemoryCrashes):
+        async def get_or_insert(self, crash):
+            await self._count("get_or_insert")
+            raise RuntimeError("db is down")
+
+    crashes = FailingCrashes(latency=0.01)
+    single_flight = SingleFlightCrashes(crashes)
+
+    results = await asyncio.gather(
+        *[single_flight.get_or_insert(make_crash()) for _ in range(3)],
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert crashes.calls == {"get_or_insert": 1}
+
+    with pytest.raises(RuntimeError):
+        await single_flight.get_or_insert(make_crash())
+    assert crashes.calls == {"get_or_insert": 2}
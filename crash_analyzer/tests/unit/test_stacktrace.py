@@ -0,0 +1,111 @@
+import random
+import re
+
+import pytest
+
+from crash_analyzer.app.agents import libfuzzer
+from crash_analyzer.tests.corpus import load_corpus
+
+
+# Line-by-line readers replaced by search over whole output. Kept as a reference
+
+
+def legacy_read_until(output, header_re, stop):
+    in_stacktrace = False
+    res = []
+    for line in output.splitlines(True):
+        if not in_stacktrace:
+            if header_re.match(line):
+                in_stacktrace = True
+                res.append(line)
+        else:
+            if stop(line) == "before":
+                break
+            res.append(line)
+            if stop(line) == "after":
+                break
+
+    return "\n".join(res)
+
+
+def has_marker(line):
+    return "before" if "=========" in line or "== ERROR: " in line else None
+
+
+def legacy_read_libfuzzer(output):
+    header_re = re.compile(r"^==[0-9]+==ERROR: .*$")
+    stop = lambda line: "after" if line.startswith("SUMMARY: ") else None
+    return legacy_read_until(output, header_re, stop)
+
+
+def legacy_read_jazzer(output):
+    header_re = re.compile(r"^== Java Exception: .*$")
+    stop = lambda line: "before" if line.startswith("DEDUP_TOKEN:") else None
+    return legacy_read_until(output, header_re, stop)
+
+
+def legacy_read_cargo_fuzz(output):
+    header_re = re.compile(r"^thread '.*' panicked at '.*', .*$")
+    return legacy_read_until(output, header_re, has_marker)
+
+
+def legacy_read_atheris(output):
+    header_re = re.compile(r"^\s*=== Uncaught Python exception: ===$")
+    return legacy_read_until(output, header_re, has_marker)
+
+
+def legacy_read_go_fuzz(output):
+    res = []
+    for line in output.splitlines(True):
+        if line.startswith("panic: "):
+            res = [line]
+        else:
+            res.append(line)
+
+    for i in range(len(res)):
+        if "=========" in res[i] or "== ERROR: " in res[i]:
+            res = res[0:i]
+            break
+
+    return "\n".join(res)
+
+
+READERS = [
+    (legacy_read_libfuzzer, libfuzzer._read_libfuzzer_stacktrace),
+    (legacy_read_jazzer, libfuzzer._read_jazzer_stacktrace),
+    (legacy_read_cargo_fuzz, libfuzzer._read_cargo_fuzz_stacktrace),
+    (legacy_read_atheris, libfuzzer._read_atheris_stacktrace),
+    (legacy_read_go_fuzz, libfuzzer._read_go_fuzz_stacktrace),
+]
+
+
+@pytest.mark.parametrize("recorded", load_corpus(), ids=lambda r: r.name)
+@pytest.mark.parametrize("legacy, reader", READERS, ids=lambda r: r.__name__)
+def test_parity_on_recorded_corpus(recorded, legacy, reader):
+    assert reader(recorded.output) == legacy(recorded.output)
+
+
+@pytest.mark.parametrize("legacy, reader", READERS, ids=lambda r: r.__name__)
+def test_parity_on_random_outputs(legacy, reader):
+
+    tokens = [
+        "\n", "\r", "\r\n", "\x0b", "\x1c", "\x85", " ", " ", "\t", "=",
+        "==", "12", "==12==ERROR: ", "==ERROR: ", "SUMMARY: ", "== Java Exception: ",
+        "DEDUP_TOKEN:", "thread '", "' panicked at '", "', ", "'",
+        "=== Uncaught Python exception: ===", "=========", "== ERROR: ",
+        "panic: ", "a", "#0 0x1",
+    ]
+
+    rnd = random.Random(0)
+    for _ in range(20000):
+        text = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 30)))
+        assert reader(text) == legacy(text), repr(text)
+
+
+def test_report_after_long_log():
+
+    log = "#1\tNEW    cov: 1 ft: 1 corp: 1/1b\n" * 100000
+    report = "==1==ERROR: AddressSanitizer: heap-buffer-overflow\n#0 0x1 in f\nSUMMARY: x\n"
+
+    stacktrace = libfuzzer._read_libfuzzer_stacktrace(log + report + log)
+    assert stacktrace == legacy_read_libfuzzer(report)
@@ -0,0 +1,80 @@
+from hashlib import sha256
+import base64
+
+import pytest
+from botocore.exceptions import ClientError
+
+from crash_analyzer.app.object_storage.storage import stored_sha256
+from crash_analyzer.tests.helpers import FakeBody, make_storage
+
+DIGEST = sha256(b"crash input").digest()
+
+
+def test_checksum_from_user_metadata():
+    head = {"Metadata": {"sha256": DIGEST.hex().upper()}}
+    assert stored_sha256(head) == DIGEST.hex()
+
+
+def test_checksum_computed_by_storage_is_ignored():
+    head = {"Metadata": {}, "ChecksumSHA256": base64.b64encode(DIGEST).decode()}
+    assert stored_sha256(head) is None
+
+
+def test_no_or_malformed_checksum():
+    assert stored_sha256({}) is None
+    assert stored_sha256({"Metadata": {}}) is None
+    assert stored_sha256({"Metadata": {"sha256": "not a hash"}}) is None
+
+
+class RangeClient:
+
+    """Answers ranged GET like S3 does. Empty object has no range"""
+
+    def __init__(self, data: bytes, metadata: dict):
+        self.data = data
+        self.metadata = metadata
+        self.requests = []
+
+    async def get_object(self, Bucket, Key, Range):
+        self.requests.append("get")
+        if not self.data:
+            error = {
+                "Error": {"Code": "InvalidRange"},
+                "ResponseMetadata": {"HTTPStatusCode": 416},
+            }
+            raise ClientError(error, "GetObject")
+
+        end = min(int(Range.rpartition("-")[2]), len(self.data) - 1)
+        return {
+            "Body": FakeBody(self.data[: end + 1]),
+            "ContentLength": end + 1,
+            "ContentRange": f"bytes 0-{end}/{len(self.data)}",
+            "ETag": '"etag"',
+            "Metadata": self.metadata,
+        }
+
+    async def head_object(self, Bucket, Key):
+        self.requests.append("head")
+        return {"ContentLength": len(self.data), "ETag": '"etag"', "Metadata": self.metadata}
+
+
+@pytest.mark.asyncio
+async def test_head_read_from_ranged_get():
+
+    client = RangeClient(b"crash input", {"sha256": DIGEST.hex()})
+    head = await make_storage(client)._download_range("bucket", "key", 5)
+
+    assert head.data == b"crash"
+    assert head.info.size == len(b"crash input")
+    assert head.info.sha256 == DIGEST.hex()
+    assert client.requests == ["get"]
+
+
+@pytest.mark.asyncio
+async def test_head_of_empty_object():
+
+    client = RangeClient(b"", {})
+    head = await make_storage(client)._download_range("bucket", "key", 5)
+
+    assert head.data == b"" and head.info.size == 0
+    assert client.requests == ["get", "head"]
@@ -0,0 +1,115 @@
+from hashlib import sha256
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from crash_analyzer.app.agents import get_parser, parse_crash, parse_stacktrace
+from crash_analyzer.app.models import EngineID, LangID, LibfuzzerCrash
+from crash_analyzer.tests.corpus import load_corpus
+
+ENGINES = [
+    EngineID.libfuzzer,
+    EngineID.jazzer,
+    EngineID.atheris,
+    EngineID.cargo_fuzz,
+    EngineID.go_fuzz_libfuzzer,
+]
+
+
+def read_chunked(engine, data: bytes, rnd: random.Random, max_chunk: int):
+
+    reader = get_parser(engine).stacktrace_reader()
+    offset = 0
+
+    while offset < len(data):
+        size = rnd.randint(1, max_chunk)
+        reader.feed(data[offset : offset + size])
+        offset += size
+
+    return reader
+
+
+def read_whole(engine, data: bytes):
+    output = data.decode(errors="replace")
+    return get_parser(engine).read_stacktrace(output)
+
+
+@pytest.mark.parametrize("recorded", load_corpus(), ids=lambda r: r.name)
+def test_parity_on_recorded_corpus(recorded):
+
+    if recorded.engine not in ENGINES:
+        pytest.skip("Output is not parsed")
+
+    data = recorded.output.encode()
+    rnd = random.Random(0)
+
+    for max_chunk in [1, 7, 64, 4096, len(data)]:
+        reader = read_chunked(recorded.engine, data, rnd, max_chunk)
+        stacktrace = reader.stacktrace()
+
+        assert stacktrace == read_whole(recorded.engine, data)
+        assert reader.hash == sha256(data).hexdigest()
+        assert reader.size == len(data)
+
+        expected = parse_crash(recorded.engine, recorded.lang, recorded.crash_dict(recorded.output))
+        assert parse_stacktrace(recorded.engine, recorded.lang, stacktrace) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda e: e.value)
+def test_parity_on_random_outputs(engine):
+
+    tokens = [
+        "\n", "\r", "\r\n", "\x0b", "\x1c", "\x85", " ", " ", "\t", "=",
+        "==12==ERROR: ", "SUMMARY: ", "== Java Exception: ", "DEDUP_TOKEN:",
+        "thread 'main' panicked at 'x', src/lib.rs:1\n",
+        "=== Uncaught Python exception: ===", "=========", "== ERROR: ",
+        "panic: ", "a", "#0 0x1", "é",
+    ]
+
+    rnd = random.Random(0)
+    for _ in range(3000):
+        text = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 40)))
+        data = text.encode()
+        reader = read_chunked(engine, data, rnd, 8)
+        assert reader.stacktrace() == read_whole(engine, data), repr(text)
+
+
+def test_invalid_utf8_replaced():
+
+    data = b"==1==ERROR: AddressSanitizer: \xff\xfe\n#0 0x1 in f\nSUMMARY: x\n"
+    reader = read_chunked(EngineID.libfuzzer, data, random.Random(0), 1)
+    assert reader.stacktrace() == read_whole(EngineID.libfuzzer, data)
+    assert "�" in read_whole(EngineID.libfuzzer, data)
+
+
+def test_only_report_kept():
+
+    log = b"#1\tNEW    cov: 1 ft: 1 corp: 1/1b\n" * 2000
+    report = b"==1==ERROR: AddressSanitizer: heap-buffer-overflow\n#0 0x1 in f\nSUMMARY: x\n"
+
+    reader = get_parser(EngineID.libfuzzer).stacktrace_reader()
+    for _ in range(10):
+        reader.feed(log)
+        assert not reader._report
+    reader.feed(report)
+    reader.feed(log)
+
+    assert reader.stacktrace() == read_whole(EngineID.libfuzzer, report)
+    assert reader.size == len(log) * 11 + len(report)
+
+
+def test_stored_output_not_parsed_inline():
+
+    crash = {"type": "crash", "input": "", "output_id": "output", "reproduced": True}
+    with pytest.raises(ValueError):
+        parse_crash(EngineID.libfuzzer, LangID.cpp, crash)
+
+
+def test_output_or_output_id_required():
+
+    LibfuzzerCrash(type="crash", input="", output_id="output", reproduced=True)
+    LibfuzzerCrash(type="crash", input="", output="", reproduced=True)
+
+    with pytest.raises(ValidationError):
+        LibfuzzerCrash(type="crash", input="", reproduced=True)
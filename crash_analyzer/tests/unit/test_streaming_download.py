@@ -0,0 +1,52 @@
+import pytest
+import os
+
+from crash_analyzer.app.object_storage.storage import StreamingDownload
+from crash_analyzer.tests.helpers import FakeBody
+
+
+@pytest.mark.asyncio
+async def test_iteration_uses_chunk_size():
+
+    data = os.urandom(10000)
+    body = FakeBody(data)
+    stream = await StreamingDownload.create({"Body": body}, chunk_size=4096)
+
+    chunks = [chunk async for chunk in stream]
+
+    assert [len(chunk) for chunk in chunks] == [4096, 4096, 1808]
+    assert b"".join(chunks) == data
+    assert body.closed
+
+
+@pytest.mark.asyncio
+async def test_readinto_reuses_buffer():
+
+    data = os.urandom(10000)
+    body = FakeBody(data)
+    stream = await StreamingDownload.create({"Body": body}, chunk_size=4096)
+
+    buffer = bytearray(3000)
+    result = bytearray()
+
+    while True:
+        size = await stream.readinto(buffer)
+        if size == 0:
+            break
+        result += buffer[:size]
+
+    assert result == data
+    assert body.closed
+
+
+@pytest.mark.asyncio
+async def test_readinto_memoryview():
+
+    body = FakeBody(b"abcdef")
+    stream = await StreamingDownload.create({"Body": body}, chunk_size=4096)
+
+    buffer = bytearray(8)
+    size = await stream.readinto(memoryview(buffer)[2:6])
+
+    assert size == 4
+    assert buffer == b"\0\0abcd\0\0"
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from crash_analyzer.tests.helpers import make_crash, make_write_behind
+from crash_analyzer.tests.memory_db import MemoryCrashes
+
+
+@pytest.mark.asyncio
+async def test_buffered_crash_visible_to_dedup():
+
+    buffer, crashes = make_write_behind()
+
+    crash, existed = await buffer.get_or_insert(make_crash())
+    assert not existed and crash.key is not None
+
+    dup, existed = await buffer.get_or_insert(make_crash())
+    assert existed and dup.key == crash.key
+    assert (await buffer.get_by_hash("fuzzer", "rev", "h1")).key == crash.key
+    assert (await buffer.get(crash.key)).key == crash.key
+
+    assert "insert_many" not in crashes.calls
+    assert buffer.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_written_when_full():
+
+    buffer, crashes = make_write_behind(max_pending=3)
+    for h in ["h1", "h2", "h3"]:
+        await buffer.get_or_insert(make_crash(h))
+
+    await asyncio.sleep(0.01)
+    assert crashes.calls["insert_many"] == 1
+    assert buffer.pending == 0
+    assert await crashes.get_by_hash("fuzzer", "rev", "h2") is not None
+
+
+@pytest.mark.asyncio
+async def test_written_after_linger():
+
+    buffer, crashes = make_write_behind(linger_ms=20)
+    crash, _ = await buffer.get_or_insert(make_crash())
+
+    await asyncio.sleep(0.05)
+    assert buffer.pending == 0
+    assert (await crashes.get(crash.key)).unique_hash == "h1"
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_everything():
+
+    buffer, crashes = make_write_behind(max_pending=2, linger_ms=60000)
+
+    # Background write is started, but not run yet
+    for h in ["h1", "h2", "h3"]:
+        await buffer.insert(make_crash(h))
+
+    await buffer.flush()
+    assert buffer.pending == 0
+    assert crashes.calls["insert_many"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_write_retried():
+
+    class FlakyCrashes(MemoryCrashes):
+        fail = True
+
+        async def insert_many(self, crashes):
+            if self.fail:
+                raise RuntimeError("db is down")
+            return await super().insert_many(crashes)
+
+    buffer, crashes = make_write_behind(FlakyCrashes(), linger_ms=60000)
+    await buffer.get_or_insert(make_crash())
+
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    # Still visible while not written
+    assert buffer.pending == 1
+    _, existed = await buffer.get_or_insert(make_crash())
+    assert existed
+
+    crashes.fail = False
+    await buffer.flush()
+    assert buffer.pending == 0
+    assert await crashes.get_by_hash("fuzzer", "rev", "h1") is not None
+
+
+@pytest.mark.asyncio
+async def test_crash_stored_by_other_replica_dropped():
+
+    buffer, crashes = make_write_behind(linger_ms=60000)
+    await buffer.insert(make_crash())
+    await crashes.insert(make_crash())
+
+    await buffer.flush()
+    assert buffer.pending == 0
+    assert crashes.calls["insert_many"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_hash_sees_buffered():
+
+    buffer, crashes = make_write_behind(linger_ms=60000)
+    await buffer.insert(make_crash("h1"))
+    await crashes.insert(make_crash("h2"))
+
+    keys = [("fuzzer", "rev", h) for h in ["h1", "h2", "h3"]]
+    found = await buffer.get_many_by_hash(keys)
+    assert sorted(k[2] for k in found) == ["h1", "h2"]